@@ -1,3 +1,3 @@
-from app.api import channels, play, epg, favorites
+from app.api import channels, play, epg, favorites, events
 
-__all__ = ["channels", "play", "epg", "favorites"]
+__all__ = ["channels", "play", "epg", "favorites", "events"]
@@ -1,35 +1,53 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import Optional
-from app.models import ChannelResponse, ChannelGroupsResponse, Channel
-from app.services import channel_service
+from app.models import ChannelResponse, ChannelGroupsResponse, ChannelRefreshJob, RefreshStatus, Channel
+from app.services import channel_service, ChannelCatalog
 from app.core import get_logger
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/api/channels", tags=["channels"])
 
 
+def _resolve_catalog(version: Optional[int]) -> ChannelCatalog:
+    catalog = channel_service.get_catalog(version)
+    if catalog is None:
+        raise HTTPException(status_code=410, detail=f"Catalog version {version} is no longer available")
+    return catalog
+
+
 @router.get("", response_model=ChannelResponse)
 async def list_channels(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(50, ge=1, le=200, description="Items per page"),
-    group: Optional[str] = Query(None, description="Filter by group")
+    group: Optional[str] = Query(None, description="Filter by group"),
+    language: Optional[str] = Query(None, description="Filter by language"),
+    country: Optional[str] = Query(None, description="Filter by country code"),
+    astro: Optional[bool] = Query(None, description="Filter Astro / non-Astro channels"),
+    radio: Optional[bool] = Query(None, description="Filter radio / TV channels"),
+    version: Optional[int] = Query(None, description="Catalog version to page through")
 ):
     try:
-        if group:
-            filtered_channels = channel_service.get_channels_by_group(group)
-            start = (page - 1) * page_size
-            end = start + page_size
-            channels = filtered_channels[start:end]
-            total = len(filtered_channels)
-        else:
-            channels, total = channel_service.get_all_channels(page, page_size)
+        catalog = _resolve_catalog(version)
+        channels, total = channel_service.filter_channels(
+            page,
+            page_size,
+            catalog,
+            group=group,
+            language=language,
+            country=country,
+            astro=astro,
+            radio=radio
+        )
         
         return ChannelResponse(
             channels=channels,
             total=total,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            catalog_version=catalog.version
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing channels: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve channels")
@@ -39,20 +57,23 @@ async def list_channels(
 async def search_channels(
     q: str = Query(..., min_length=1, description="Search query"),
     page: int = Query(1, ge=1, description="Page number"),
-    page_size: int = Query(50, ge=1, le=200, description="Items per page")
+    page_size: int = Query(50, ge=1, le=200, description="Items per page"),
+    version: Optional[int] = Query(None, description="Catalog version to page through")
 ):
     try:
-        all_results = channel_service.search_channels(q)
-        start = (page - 1) * page_size
-        end = start + page_size
-        channels = all_results[start:end]
+        catalog = _resolve_catalog(version)
+        channels, total, total_exact = channel_service.search_channels_page(q, page, page_size, catalog)
         
         return ChannelResponse(
             channels=channels,
-            total=len(all_results),
+            total=total,
+            total_exact=total_exact,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            catalog_version=catalog.version
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error searching channels: {e}")
         raise HTTPException(status_code=500, detail="Failed to search channels")
@@ -74,20 +95,22 @@ async def list_groups():
 @router.get("/astro", response_model=ChannelResponse)
 async def list_astro_channels(
     page: int = Query(1, ge=1, description="Page number"),
-    page_size: int = Query(50, ge=1, le=200, description="Items per page")
+    page_size: int = Query(50, ge=1, le=200, description="Items per page"),
+    version: Optional[int] = Query(None, description="Catalog version to page through")
 ):
     try:
-        astro_channels = channel_service.get_astro_channels()
-        start = (page - 1) * page_size
-        end = start + page_size
-        channels = astro_channels[start:end]
+        catalog = _resolve_catalog(version)
+        channels, total = channel_service.filter_channels(page, page_size, catalog, astro=True)
         
         return ChannelResponse(
             channels=channels,
-            total=len(astro_channels),
+            total=total,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            catalog_version=catalog.version
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing Astro channels: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve Astro channels")
@@ -107,11 +130,33 @@ async def get_channel(channel_id: str):
         raise HTTPException(status_code=500, detail="Failed to retrieve channel")
 
 
-@router.post("/refresh")
+@router.post("/refresh", response_model=ChannelRefreshJob, status_code=202)
 async def refresh_channels():
     try:
-        await channel_service.refresh_channels()
-        return {"message": "Channels refreshed successfully", "total": len(channel_service.channels)}
+        return channel_service.start_refresh_job()
     except Exception as e:
-        logger.error(f"Error refreshing channels: {e}")
+        logger.error(f"Error starting channel refresh: {e}")
         raise HTTPException(status_code=500, detail="Failed to refresh channels")
+
+
+@router.get("/refresh/status", response_model=RefreshStatus)
+async def get_refresh_status():
+    try:
+        return channel_service.get_refresh_status()
+    except Exception as e:
+        logger.error(f"Error getting channel refresh status: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve refresh status")
+
+
+@router.get("/refresh/{job_id}", response_model=ChannelRefreshJob)
+async def get_refresh_job(job_id: str):
+    try:
+        job = channel_service.get_refresh_job(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Refresh job not found")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting refresh job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve refresh job")
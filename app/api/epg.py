@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
-from app.models import EPGResponse, EPGChannelPrograms
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from datetime import datetime, timedelta
+from typing import List, Optional
+from app.models import EPGResponse, EPGChannelPrograms, EPGGridResponse, NowNext, RefreshStatus, EPGSourceStatus
 from app.services import epg_service, channel_service
-from app.core import get_logger
+from app.parsers.epg_parser import as_utc
+from app.core import settings, get_logger
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/api/epg", tags=["epg"])
@@ -24,6 +26,118 @@ async def get_all_epg(
         raise HTTPException(status_code=500, detail="Failed to retrieve EPG data")
 
 
+@router.get("/sources", response_model=List[EPGSourceStatus])
+async def get_epg_sources():
+    try:
+        return epg_service.get_source_statuses()
+    except Exception as e:
+        logger.error(f"Error getting EPG source status: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve EPG source status")
+
+
+@router.get("/grid", response_model=EPGGridResponse)
+async def get_epg_grid(
+    start: Optional[datetime] = Query(None, description="Window start, defaults to now"),
+    end: Optional[datetime] = Query(None, description="Window end, defaults to three hours after start"),
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: int = Query(50, ge=1, le=200, description="Channels per page"),
+    group: Optional[str] = Query(None, description="Filter channels by group"),
+    version: Optional[int] = Query(None, description="Catalog version to page through")
+):
+    try:
+        start = as_utc(start)
+        end = as_utc(end) if end else start + timedelta(hours=3)
+        if end <= start:
+            raise HTTPException(status_code=400, detail="end must be after start")
+        if end - start > timedelta(hours=settings.epg_grid_max_hours):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Grid window is limited to {settings.epg_grid_max_hours} hours"
+            )
+        
+        catalog = channel_service.get_catalog(version)
+        if catalog is None:
+            raise HTTPException(status_code=410, detail=f"Catalog version {version} is no longer available")
+        
+        channels, total = channel_service.filter_channels(page, page_size, catalog, group=group)
+        return EPGGridResponse(
+            start=start,
+            end=end,
+            channels=epg_service.get_grid(channels, start, end),
+            total=total,
+            page=page,
+            page_size=page_size,
+            catalog_version=catalog.version
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error building EPG grid: {e}")
+        raise HTTPException(status_code=500, detail="Failed to build EPG grid")
+
+
+@router.get("/now-next")
+async def get_now_next(request: Request):
+    # The table keeps the whole response pre-serialised, so this is a
+    # buffer write rather than a per-request model dump
+    try:
+        table = epg_service.now_next
+        headers = {"ETag": table.etag, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == table.etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=table.payload, media_type="application/json", headers=headers)
+    except Exception as e:
+        logger.error(f"Error getting now/next table: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve now/next table")
+
+
+@router.get("/now-next/{channel_id}", response_model=NowNext)
+async def get_channel_now_next(channel_id: str):
+    try:
+        entry = epg_service.now_next.get(channel_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Channel not found")
+        return entry
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting now/next for channel {channel_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve now/next")
+
+
+@router.get("/search", response_model=EPGResponse)
+async def search_programs(
+    q: str = Query(..., min_length=1, description='Search query: words, prefix* or "exact phrase"'),
+    channel_id: Optional[str] = Query(None, description="Only programmes of this channel"),
+    category: Optional[str] = Query(None, description="Only programmes in this category"),
+    start: Optional[datetime] = Query(None, description="Only programmes still running after this time"),
+    end: Optional[datetime] = Query(None, description="Only programmes starting before this time"),
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: int = Query(50, ge=1, le=200, description="Items per page")
+):
+    try:
+        epg_id = channel_id
+        if channel_id:
+            channel = channel_service.get_channel_by_id(channel_id)
+            if channel and channel.epg_id:
+                epg_id = channel.epg_id
+        
+        programs, total, total_exact = epg_service.search_programs(
+            q, page, page_size, channel_id=epg_id, category=category, start=start, end=end
+        )
+        return EPGResponse(
+            programs=programs,
+            channel_id=channel_id,
+            total=total,
+            total_exact=total_exact,
+            page=page,
+            page_size=page_size
+        )
+    except Exception as e:
+        logger.error(f"Error searching programs: {e}")
+        raise HTTPException(status_code=500, detail="Failed to search programs")
+
+
 @router.get("/{channel_id}", response_model=EPGChannelPrograms)
 async def get_channel_epg(channel_id: str):
     try:
@@ -45,10 +159,10 @@ async def get_channel_epg(channel_id: str):
 @router.post("/refresh")
 async def refresh_epg():
     try:
-        await epg_service.refresh_epg()
+        refreshed = await epg_service.refresh_epg()
         total_channels = len(epg_service.parser.epg_data)
         return {
-            "message": "EPG data refreshed successfully",
+            "message": "EPG data refreshed successfully" if refreshed else "EPG data was refreshed recently, skipped",
             "total_channels": total_channels
         }
     except Exception as e:
@@ -56,6 +170,15 @@ async def refresh_epg():
         raise HTTPException(status_code=500, detail="Failed to refresh EPG data")
 
 
+@router.get("/refresh/status", response_model=RefreshStatus)
+async def get_refresh_status():
+    try:
+        return epg_service.get_refresh_status()
+    except Exception as e:
+        logger.error(f"Error getting EPG refresh status: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve refresh status")
+
+
 @router.post("/sources")
 async def add_epg_source(url: str = Query(..., description="EPG XML URL")):
     try:
@@ -64,17 +187,3 @@ async def add_epg_source(url: str = Query(..., description="EPG XML URL")):
     except Exception as e:
         logger.error(f"Error adding EPG source: {e}")
         raise HTTPException(status_code=500, detail="Failed to add EPG source")
-
-
-@router.get("/search", response_model=EPGResponse)
-async def search_programs(q: str = Query(..., min_length=1, description="Search query")):
-    try:
-        programs = epg_service.search_programs(q)
-        return EPGResponse(
-            programs=programs,
-            channel_id=None,
-            total=len(programs)
-        )
-    except Exception as e:
-        logger.error(f"Error searching programs: {e}")
-        raise HTTPException(status_code=500, detail="Failed to search programs")
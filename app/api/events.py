@@ -0,0 +1,42 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.services import event_broadcaster
+from app.services.events import KEEPALIVE_MESSAGE
+from app.core import settings, get_logger
+
+logger = get_logger(__name__)
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+
+@router.get("")
+async def stream_events(request: Request):
+    if event_broadcaster.full:
+        raise HTTPException(status_code=503, detail="Too many event subscribers")
+    
+    subscription = event_broadcaster.subscribe()
+    
+    async def stream():
+        try:
+            yield event_broadcaster.hello()
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        subscription.queue.get(),
+                        timeout=settings.sse_heartbeat_interval
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    message = KEEPALIVE_MESSAGE
+                yield message
+        except Exception as e:
+            logger.error(f"Error streaming events: {e}")
+        finally:
+            event_broadcaster.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
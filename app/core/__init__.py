@@ -1,4 +1,10 @@
 from app.core.config import settings
 from app.core.logging import setup_logging, get_logger
+from app.core.http import http_client
+from app.core.singleflight import SingleFlight
+from app.core.executor import parse_executor
+from app.core.circuit import CircuitBreaker
 
-__all__ = ["settings", "setup_logging", "get_logger"]
+__all__ = [
+    "settings", "setup_logging", "get_logger", "http_client", "SingleFlight", "parse_executor", "CircuitBreaker"
+]
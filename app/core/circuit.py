@@ -0,0 +1,62 @@
+import time
+from typing import Optional
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    # Closed until failure_threshold consecutive failures, then open for
+    # reset_timeout seconds. After that one half-open probe is let through:
+    # success closes the circuit, failure reopens it with the timeout doubled
+    # up to max_timeout.
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 300, max_timeout: float = 3600):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.max_timeout = max(reset_timeout, max_timeout)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.timeout = reset_timeout
+        self._opened_until: Optional[float] = None
+    
+    def allow(self) -> bool:
+        if self.state == OPEN:
+            if time.monotonic() < self._opened_until:
+                return False
+            self.state = HALF_OPEN
+            logger.info(f"Circuit for {self.name} half-open, probing")
+        return True
+    
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.timeout = self.reset_timeout
+        self._opened_until = None
+    
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            self.timeout = min(self.timeout * 2, self.max_timeout)
+            self._open()
+        elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open()
+    
+    def _open(self):
+        self.state = OPEN
+        self.trips += 1
+        self._opened_until = time.monotonic() + self.timeout
+        logger.warning(f"Circuit for {self.name} open for {self.timeout:.0f}s after {self.consecutive_failures} failures")
+    
+    @property
+    def retry_in(self) -> Optional[float]:
+        if self.state != OPEN:
+            return None
+        return max(0.0, self._opened_until - time.monotonic())
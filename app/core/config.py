@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 import os
 
 
@@ -21,12 +21,50 @@ class Settings(BaseSettings):
         "./data/example_channels.m3u8"
     ]
     
+    channel_auto_refresh_enabled: bool = True
+    channel_refresh_interval: int = 3600
+    channel_refresh_jitter: int = 300
+    channel_refresh_retry_delay: int = 60
+    channel_refresh_max_backoff: int = 3600
+    channel_refresh_min_interval: int = 30
+    
+    catalog_retained_versions: int = 4
+    
+    m3u8_fetch_concurrency: int = 4
+    m3u8_source_timeout: float = 30.0
+    
+    parse_strategy: str = "inline"
+    parse_workers: int = 0
+    parse_chunk_size: int = 4 * 1024 * 1024
+    
+    http_pool_size: int = 100
+    http_pool_size_per_host: int = 10
+    http_dns_cache_ttl: int = 300
+    
     epg_refresh_interval: int = 3600
     epg_cache_enabled: bool = True
+    epg_refresh_min_interval: int = 60
+    epg_fetch_concurrency: int = 4
+    epg_grid_max_hours: int = 24
+    epg_source_timeout: float = 60.0
+    epg_breaker_failure_threshold: int = 3
+    epg_breaker_reset_timeout: int = 300
+    epg_breaker_max_timeout: int = 3600
+    epg_retention_past: int = 21600
+    epg_retention_future: int = 1209600
+    epg_filter_to_catalog: bool = True
+    epg_id_suffixes: List[str] = [".my"]
+    epg_id_aliases: Dict[str, str] = {}
+    
+    sse_queue_size: int = 32
+    sse_heartbeat_interval: int = 15
+    sse_max_subscribers: int = 1000
     
     data_dir: str = "./data"
     favorites_file: str = "./data/favorites.json"
     channels_cache_file: str = "./data/channels_cache.json"
+    channels_snapshot_file: str = "./data/channels_cache.bin"
+    epg_snapshot_file: str = "./data/epg_cache.bin"
     
     class Config:
         env_file = ".env"
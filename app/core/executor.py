@@ -0,0 +1,92 @@
+import os
+import asyncio
+import multiprocessing
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Iterable, List, Optional
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+PARSE_STRATEGIES = ("inline", "thread", "process")
+
+
+class ParseExecutor:
+    # Runs CPU-bound parse work according to settings.parse_strategy:
+    # "inline" on the event loop, "thread" on a thread pool, "process" on a
+    # process pool. Pools are created on first use.
+    def __init__(self):
+        self._pool: Optional[Executor] = None
+        self._pool_strategy: Optional[str] = None
+    
+    @property
+    def strategy(self) -> str:
+        strategy = settings.parse_strategy
+        if strategy not in PARSE_STRATEGIES:
+            logger.warning(f"Unknown parse strategy {strategy!r}, parsing inline")
+            return "inline"
+        return strategy
+    
+    @property
+    def offloaded(self) -> bool:
+        return self.strategy != "inline"
+    
+    @property
+    def workers(self) -> int:
+        return settings.parse_workers or os.cpu_count() or 1
+    
+    def _get_pool(self, strategy: str) -> Executor:
+        if self._pool is None or self._pool_strategy != strategy:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+            workers = self.workers
+            if strategy == "process":
+                # Spawned workers do not inherit the event loop or open sockets
+                self._pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parse")
+            self._pool_strategy = strategy
+            logger.info(f"Started {strategy} parse pool with {workers} workers")
+        return self._pool
+    
+    async def run(self, func: Callable, *args) -> Any:
+        strategy = self.strategy
+        if strategy == "inline":
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_pool(strategy), func, *args)
+    
+    async def map(self, func: Callable, items: Iterable, *args) -> List[Any]:
+        # Results come back in input order; args are passed after each item
+        return list(await asyncio.gather(*(self.run(func, item, *args) for item in items)))
+    
+    async def imap(self, func: Callable, items: AsyncIterable, *args) -> AsyncIterator[Any]:
+        # Submits items as they arrive and yields results in input order. At
+        # most workers + 1 items are in flight, so a slow consumer or a fast
+        # download never queues up the whole input.
+        pending = deque()
+        limit = self.workers + 1
+        try:
+            async for item in items:
+                pending.append(asyncio.ensure_future(self.run(func, item, *args)))
+                while len(pending) >= limit:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            logger.info(f"Stopped {self._pool_strategy} parse pool")
+        self._pool = None
+        self._pool_strategy = None
+
+
+parse_executor = ParseExecutor()
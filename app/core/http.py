@@ -0,0 +1,35 @@
+import aiohttp
+from typing import Optional
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class HTTPClient:
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.http_pool_size,
+                limit_per_host=settings.http_pool_size_per_host,
+                ttl_dns_cache=settings.http_dns_cache_ttl
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+    
+    async def start(self):
+        session = self.session
+        logger.info(f"Started shared HTTP client (pool size {session.connector.limit})")
+    
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("Closed shared HTTP client")
+        self._session = None
+
+
+http_client = HTTPClient()
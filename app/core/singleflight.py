@@ -0,0 +1,83 @@
+import time
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+from app.core.logging import get_logger
+from app.models.refresh import RefreshStatus
+
+logger = get_logger(__name__)
+
+
+class SingleFlight:
+    # Runs at most one refresh at a time. Callers arriving while one is in
+    # flight await the same task instead of starting their own, and new runs
+    # are refused until min_interval seconds after the previous one ended.
+    def __init__(self, name: str, min_interval: float = 0):
+        self.name = name
+        self.min_interval = min_interval
+        self.runs = 0
+        self.coalesced_callers = 0
+        self.skipped = 0
+        self.last_started_at: Optional[datetime] = None
+        self.last_finished_at: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._finished_monotonic: Optional[float] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    async def run(self, func: Callable[[], Awaitable[None]], force: bool = False) -> bool:
+        if self.running:
+            self.coalesced_callers += 1
+            logger.debug(f"Joining in-flight {self.name} refresh")
+            await asyncio.shield(self._task)
+            return True
+        
+        if (not force and self.min_interval and self._finished_monotonic is not None and
+                time.monotonic() - self._finished_monotonic < self.min_interval):
+            self.skipped += 1
+            logger.info(f"Skipping {self.name} refresh, last one finished under {self.min_interval}s ago")
+            return False
+        
+        self._task = asyncio.create_task(self._execute(func))
+        await asyncio.shield(self._task)
+        return True
+    
+    async def _execute(self, func: Callable[[], Awaitable[None]]):
+        self.runs += 1
+        self.last_started_at = datetime.utcnow()
+        started = time.monotonic()
+        try:
+            await func()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        finally:
+            self._finished_monotonic = time.monotonic()
+            self.last_duration = self._finished_monotonic - started
+            self.last_finished_at = datetime.utcnow()
+    
+    async def cancel(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+    
+    def status(self) -> RefreshStatus:
+        return RefreshStatus(
+            name=self.name,
+            running=self.running,
+            runs=self.runs,
+            coalesced_callers=self.coalesced_callers,
+            skipped=self.skipped,
+            last_started_at=self.last_started_at,
+            last_finished_at=self.last_finished_at,
+            last_duration=self.last_duration,
+            last_error=self.last_error
+        )
@@ -5,9 +5,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 from contextlib import asynccontextmanager
 
-from app.core import settings, setup_logging, get_logger
-from app.services import channel_service, epg_service, favorite_service
-from app.api import channels, play, epg, favorites
+from app.core import settings, setup_logging, get_logger, http_client, parse_executor
+from app.services import channel_service, epg_service, favorite_service, event_broadcaster
+from app.api import channels, play, epg, favorites, events
 
 setup_logging("INFO" if not settings.debug else "DEBUG")
 logger = get_logger(__name__)
@@ -17,19 +17,33 @@ logger = get_logger(__name__)
 async def lifespan(app: FastAPI):
     logger.info("Starting Malaysian IPTV application...")
     
+    await http_client.start()
+    
+    channel_service.add_catalog_listener(epg_service.on_catalog_published)
+    channel_service.add_catalog_listener(event_broadcaster.on_catalog_published)
+    epg_service.now_next.add_listener(event_broadcaster.on_now_next_changed)
     await channel_service.load_channels()
     logger.info(f"Loaded {len(channel_service.channels)} channels")
     
+    await channel_service.start_auto_refresh()
+    
     await favorite_service.load_favorites()
     logger.info("Loaded favorites")
     
+    await epg_service.load_snapshot()
     await epg_service.start_auto_refresh()
     logger.info("Started EPG auto-refresh")
     
+    epg_service.now_next.start()
+    
     yield
     
     logger.info("Shutting down Malaysian IPTV application...")
+    await epg_service.now_next.stop()
     await epg_service.stop_auto_refresh()
+    await channel_service.stop_auto_refresh()
+    await http_client.close()
+    parse_executor.shutdown()
 
 
 app = FastAPI(
@@ -54,6 +68,7 @@ app.include_router(channels.router)
 app.include_router(play.router)
 app.include_router(epg.router)
 app.include_router(favorites.router)
+app.include_router(events.router)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -68,7 +83,8 @@ async def health_check():
         "app_name": settings.app_name,
         "version": settings.app_version,
         "channels_loaded": len(channel_service.channels),
-        "groups_available": len(channel_service.get_all_groups()),
+        "catalog_version": channel_service.catalog.version,
+        "groups_available": channel_service.get_group_count(),
         "epg_channels": len(epg_service.parser.epg_data)
     }
 
@@ -79,7 +95,7 @@ async def app_info():
         "app_name": settings.app_name,
         "version": settings.app_version,
         "total_channels": len(channel_service.channels),
-        "total_groups": len(channel_service.get_all_groups()),
+        "total_groups": channel_service.get_group_count(),
         "m3u8_sources": settings.m3u8_sources,
         "epg_enabled": settings.epg_cache_enabled,
         "features": [
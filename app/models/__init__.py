@@ -2,12 +2,16 @@ from app.models.channel import (
     Channel,
     ChannelResponse,
     ChannelSearchRequest,
-    ChannelGroupsResponse
+    ChannelGroupsResponse,
+    ChannelRefreshJob
 )
 from app.models.epg import (
     EPGProgram,
     EPGResponse,
-    EPGChannelPrograms
+    EPGChannelPrograms,
+    EPGGridChannel,
+    EPGGridResponse,
+    NowNext
 )
 from app.models.favorite import (
     Favorite,
@@ -15,17 +19,26 @@ from app.models.favorite import (
     FavoriteResponse,
     FavoriteListsResponse
 )
+from app.models.source import SourceFetchState, EPGSourceStatus
+from app.models.refresh import RefreshStatus
 
 __all__ = [
     "Channel",
     "ChannelResponse",
     "ChannelSearchRequest",
     "ChannelGroupsResponse",
+    "ChannelRefreshJob",
     "EPGProgram",
     "EPGResponse",
     "EPGChannelPrograms",
+    "EPGGridChannel",
+    "EPGGridResponse",
+    "NowNext",
     "Favorite",
     "FavoriteRequest",
     "FavoriteResponse",
-    "FavoriteListsResponse"
+    "FavoriteListsResponse",
+    "SourceFetchState",
+    "EPGSourceStatus",
+    "RefreshStatus"
 ]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, HttpUrl
-from typing import Optional, List
+from typing import Any, Optional, List, Dict
 from datetime import datetime
 
 
@@ -16,6 +16,21 @@ class Channel(BaseModel):
     tvg_name: Optional[str] = Field(None, description="TVG Name")
     radio: bool = Field(default=False, description="Is radio channel")
     is_astro: bool = Field(default=False, description="Is Astro channel")
+    attributes: Dict[str, str] = Field(default_factory=dict, description="Extra EXTINF attributes (tvg-shift, catchup, user-agent, ...)")
+    
+    @classmethod
+    def from_trusted(cls, data: Dict[str, Any]) -> "Channel":
+        # Fast path for internal producers (the M3U8 parser and the channel
+        # cache) whose rows are already complete and correctly typed.
+        # Anything else still goes through full validation.
+        if data.keys() != cls.model_fields.keys():
+            return cls.model_validate(data)
+        channel = cls.__new__(cls)
+        object.__setattr__(channel, '__dict__', data)
+        object.__setattr__(channel, '__pydantic_fields_set__', set(data))
+        object.__setattr__(channel, '__pydantic_extra__', None)
+        object.__setattr__(channel, '__pydantic_private__', None)
+        return channel
     
     class Config:
         json_schema_extra = {
@@ -38,12 +53,23 @@ class ChannelResponse(BaseModel):
     total: int
     page: int
     page_size: int
+    catalog_version: int = Field(0, description="Catalog version the page was served from; pass it back as `version` to keep paging the same catalog")
+    total_exact: bool = Field(True, description="False when a search stopped counting matches; total is then a lower bound")
     
     
 class ChannelSearchRequest(BaseModel):
     query: str = Field(..., min_length=1, description="Search query")
     
 
+class ChannelRefreshJob(BaseModel):
+    job_id: str = Field(..., description="Refresh job identifier")
+    status: str = Field(..., description="running, succeeded, skipped or failed")
+    started_at: datetime = Field(..., description="When the refresh started")
+    finished_at: Optional[datetime] = Field(None, description="When the refresh finished")
+    total: Optional[int] = Field(None, description="Channels in the catalog after the refresh")
+    error: Optional[str] = Field(None, description="Failure reason")
+
+
 class ChannelGroupsResponse(BaseModel):
     groups: List[str]
     total: int
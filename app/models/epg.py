@@ -33,6 +33,9 @@ class EPGResponse(BaseModel):
     programs: List[EPGProgram]
     channel_id: Optional[str] = None
     total: int
+    page: Optional[int] = None
+    page_size: Optional[int] = None
+    total_exact: bool = Field(True, description="False when a search stopped counting matches; total is then a lower bound")
 
 
 class EPGChannelPrograms(BaseModel):
@@ -40,3 +43,27 @@ class EPGChannelPrograms(BaseModel):
     channel_name: str
     current_program: Optional[EPGProgram] = None
     upcoming_programs: List[EPGProgram] = []
+
+
+class EPGGridChannel(BaseModel):
+    channel_id: str
+    channel_name: str
+    logo: Optional[str] = None
+    programs: List[EPGProgram] = []
+
+
+class EPGGridResponse(BaseModel):
+    start: datetime
+    end: datetime
+    channels: List[EPGGridChannel]
+    total: int
+    page: int
+    page_size: int
+    catalog_version: int
+
+
+class NowNext(BaseModel):
+    channel_id: str
+    channel_name: str
+    current_program: Optional[EPGProgram] = None
+    next_program: Optional[EPGProgram] = None
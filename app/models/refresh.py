@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class RefreshStatus(BaseModel):
+    name: str = Field(..., description="What is being refreshed")
+    running: bool = Field(..., description="Whether a refresh is in flight")
+    runs: int = Field(0, description="Refreshes started since startup")
+    coalesced_callers: int = Field(0, description="Callers that joined an in-flight refresh instead of starting one")
+    skipped: int = Field(0, description="Requests skipped because of the minimum refresh interval")
+    last_started_at: Optional[datetime] = Field(None, description="When the last refresh started")
+    last_finished_at: Optional[datetime] = Field(None, description="When the last refresh finished")
+    last_duration: Optional[float] = Field(None, description="Duration of the last refresh in seconds")
+    last_error: Optional[str] = Field(None, description="Error raised by the last refresh, if any")
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class SourceFetchState(BaseModel):
+    etag: Optional[str] = Field(None, description="ETag returned by the last successful fetch")
+    last_modified: Optional[str] = Field(None, description="Last-Modified returned by the last successful fetch")
+    digest: Optional[str] = Field(None, description="SHA-256 of the raw source body")
+    mtime: Optional[float] = Field(None, description="Local file modification time")
+    size: Optional[int] = Field(None, description="Local file size in bytes")
+    fetched_at: Optional[datetime] = Field(None, description="When the source was last fetched")
+
+
+class EPGSourceStatus(BaseModel):
+    url: str = Field(..., description="EPG source URL or path")
+    priority: int = Field(..., description="Merge priority, 0 is highest")
+    state: str = Field("closed", description="Circuit breaker state: closed, open or half_open")
+    consecutive_failures: int = Field(0, description="Failures since the last success")
+    trips: int = Field(0, description="Times the circuit breaker has opened")
+    retry_in: Optional[float] = Field(None, description="Seconds until an open circuit lets a probe through")
+    skipped: int = Field(0, description="Refreshes that skipped this source because its circuit was open")
+    last_success_at: Optional[datetime] = Field(None, description="When the source last fetched and parsed successfully")
+    last_failure_at: Optional[datetime] = Field(None, description="When the source last failed")
+    last_error: Optional[str] = Field(None, description="Error from the last failure")
+    fetch_seconds: Optional[float] = Field(None, description="Time spent downloading in the last attempt")
+    parse_seconds: Optional[float] = Field(None, description="Time spent parsing in the last attempt")
+    channels: int = Field(0, description="Channels in the last successful guide")
+    programmes: int = Field(0, description="Programmes in the last successful guide")
@@ -0,0 +1,109 @@
+import lzma
+import zlib
+from typing import AsyncIterator, Iterator, Optional
+
+GZIP_MAGIC = b"\x1f\x8b"
+XZ_MAGIC = b"\xfd7zXZ\x00"
+MAGIC_LENGTH = len(XZ_MAGIC)
+
+GZIP_EXTENSIONS = (".gz", ".gzip")
+XZ_EXTENSIONS = (".xz",)
+
+# Upper bound on a single decompressed piece, so a highly compressible input
+# never expands into one huge buffer
+MAX_OUTPUT_CHUNK = 1024 * 1024
+
+
+def detect_compression(source: str, head: bytes) -> Optional[str]:
+    # Magic bytes win over the name: servers often decode Content-Encoding
+    # themselves, leaving plain text behind a .gz URL.
+    if head.startswith(GZIP_MAGIC):
+        return "gzip"
+    if head.startswith(XZ_MAGIC):
+        return "xz"
+    if len(head) >= MAGIC_LENGTH:
+        return None
+    
+    path = source.split('?', 1)[0].lower()
+    if path.endswith(GZIP_EXTENSIONS):
+        return "gzip"
+    if path.endswith(XZ_EXTENSIONS):
+        return "xz"
+    return None
+
+
+class StreamDecompressor:
+    # Incremental gzip/xz decoder; concatenated members or streams are
+    # decoded back to back, as gzip and xz tools do.
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._decoder = self._new_decoder()
+    
+    def _new_decoder(self):
+        if self.kind == "gzip":
+            return zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        return lzma.LZMADecompressor()
+    
+    def decompress(self, data: bytes) -> Iterator[bytes]:
+        while data:
+            if self._decoder.eof:
+                if self.kind == "xz":
+                    data = data.lstrip(b"\x00")
+                    if not data:
+                        break
+                self._decoder = self._new_decoder()
+            
+            decoder = self._decoder
+            piece = decoder.decompress(data, MAX_OUTPUT_CHUNK)
+            yield piece
+            if self.kind == "gzip":
+                while not decoder.eof and (decoder.unconsumed_tail or len(piece) == MAX_OUTPUT_CHUNK):
+                    piece = decoder.decompress(decoder.unconsumed_tail, MAX_OUTPUT_CHUNK)
+                    yield piece
+            else:
+                while not decoder.needs_input and not decoder.eof:
+                    yield decoder.decompress(b"", MAX_OUTPUT_CHUNK)
+            data = decoder.unused_data if decoder.eof else b""
+    
+    def close(self) -> None:
+        if not self._decoder.eof:
+            raise EOFError(f"Truncated {self.kind} stream")
+
+
+def _decode(decompressor: Optional[StreamDecompressor], chunk: bytes) -> Iterator[bytes]:
+    if decompressor is None:
+        yield chunk
+        return
+    for piece in decompressor.decompress(chunk):
+        if piece:
+            yield piece
+
+
+def _open_decompressor(source: str, head: bytes) -> Optional[StreamDecompressor]:
+    kind = detect_compression(source, head)
+    return StreamDecompressor(kind) if kind else None
+
+
+async def decompress_chunks(chunks: AsyncIterator[bytes], source: str) -> AsyncIterator[bytes]:
+    # Raw chunks in, plain chunks out; only the first few bytes are buffered
+    # to sniff the format
+    head: Optional[bytes] = b""
+    decompressor = None
+    
+    async for chunk in chunks:
+        if head is not None:
+            head += chunk
+            if len(head) < MAGIC_LENGTH:
+                continue
+            chunk, head = head, None
+            decompressor = _open_decompressor(source, chunk)
+        for piece in _decode(decompressor, chunk):
+            yield piece
+    
+    if head:
+        decompressor = _open_decompressor(source, head)
+        for piece in _decode(decompressor, head):
+            yield piece
+    
+    if decompressor is not None:
+        decompressor.close()
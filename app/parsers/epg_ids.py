@@ -0,0 +1,58 @@
+from typing import Dict, FrozenSet, Iterable, Optional
+from app.core import settings
+
+
+class EPGIdMatcher:
+    # Maps guide and catalog channel ids to one comparison key: trimmed,
+    # case-folded, one configured suffix removed (".my" in "TV3.my"), then
+    # passed through the alias table.
+    def __init__(self, aliases: Optional[Dict[str, str]] = None, suffixes: Iterable[str] = ()):
+        self.suffixes = tuple(suffix.casefold() for suffix in suffixes if suffix)
+        self.aliases = {
+            self._base_key(alias): self._base_key(canonical)
+            for alias, canonical in (aliases or {}).items()
+        }
+        self._keys: Dict[str, str] = {}
+    
+    @classmethod
+    def from_settings(cls) -> "EPGIdMatcher":
+        return cls(settings.epg_id_aliases, settings.epg_id_suffixes)
+    
+    def _base_key(self, epg_id: str) -> str:
+        key = epg_id.strip().casefold()
+        for suffix in self.suffixes:
+            if key.endswith(suffix) and len(key) > len(suffix):
+                return key[:-len(suffix)]
+        return key
+    
+    def normalize(self, epg_id: str) -> str:
+        # Uncached, for ids from requests; remembering those would let any
+        # client grow the memo with made-up ids
+        key = self._base_key(epg_id)
+        return self.aliases.get(key, key)
+    
+    def key(self, epg_id: str) -> str:
+        # Memoized, only for ids from the guide or the channel catalog
+        key = self._keys.get(epg_id)
+        if key is None:
+            key = self._keys[epg_id] = self.normalize(epg_id)
+        return key
+
+
+class EPGIdFilter:
+    # Set of catalog EPG ids, tested against guide channel ids before a
+    # programme is decoded. Guides repeat a few thousand ids many times, so
+    # each verdict is remembered.
+    def __init__(self, ids: Iterable[str], matcher: EPGIdMatcher):
+        self.matcher = matcher
+        self.keys: FrozenSet[str] = frozenset(matcher.key(epg_id) for epg_id in ids if epg_id)
+        self._verdicts: Dict[str, bool] = {}
+    
+    def __contains__(self, channel_id: str) -> bool:
+        verdict = self._verdicts.get(channel_id)
+        if verdict is None:
+            verdict = self._verdicts[channel_id] = self.matcher.key(channel_id) in self.keys
+        return verdict
+    
+    def __len__(self) -> int:
+        return len(self.keys)
@@ -1,117 +1,348 @@
+import re
+import time
+import codecs
+import asyncio
 import aiohttp
 from lxml import etree
-from typing import List, Dict
-from datetime import datetime
+from functools import lru_cache
+from typing import AsyncIterator, List, Dict, Optional, Sequence, Tuple, Union
+from datetime import datetime, timedelta, timezone
 from dateutil import parser as date_parser
 from app.models import EPGProgram
-from app.core import get_logger
+from app.parsers.compression import decompress_chunks
+from app.parsers.epg_ids import EPGIdFilter, EPGIdMatcher
+from app.parsers.epg_schedule import ChannelSchedule, ScheduleRow, to_epoch
+from app.parsers.fetch import STREAM_CHUNK_SIZE, FetchTimings, is_remote_source, read_file_chunks
+from app.storage.binary import StringTable, NO_STRING
+from app.core import settings, get_logger, http_client, parse_executor
 
 logger = get_logger(__name__)
 
+PROGRAMME_END = b"</programme>"
+
+_OFFSETS: Dict[str, timedelta] = {}
+_XMLTV_TIME_RE = re.compile(
+    r"(\d{4})(\d\d)(\d\d)(\d\d)(\d\d)(\d\d)?(?:\.\d+)?\s*(?:(?P<sign>[+-])(?P<hh>\d\d):?(?P<mm>\d\d)|Z|UTC|GMT)?$"
+)
+
+
+def _utc_offset(offset: str) -> timedelta:
+    delta = _OFFSETS.get(offset)
+    if delta is None:
+        sign, hours, minutes = offset[0], offset[1:3], offset[-2:]
+        delta = timedelta(hours=int(hours), minutes=int(minutes))
+        if sign == '-':
+            delta = -delta
+        _OFFSETS[offset] = delta
+    return delta
+
+
+@lru_cache(maxsize=65536)
+def parse_xmltv_time(value: str) -> datetime:
+    # XMLTV times are `YYYYMMDDhhmmss +hhmm`; everything is returned as an
+    # aware UTC datetime so guides from different sources compare correctly.
+    # Programmes share a limited set of slot times, hence the cache.
+    if len(value) == 20 and value[14] == ' ' and value[15] in '+-':
+        moment = datetime(
+            int(value[0:4]), int(value[4:6]), int(value[6:8]),
+            int(value[8:10]), int(value[10:12]), int(value[12:14]),
+            tzinfo=timezone.utc
+        )
+        return moment - _utc_offset(value[15:])
+    
+    match = _XMLTV_TIME_RE.match(value.strip())
+    if match is None:
+        # Named zones and other non-standard forms; no offset means UTC
+        moment = date_parser.parse(value)
+        return as_utc(moment)
+    
+    year, month, day, hour, minute, second = match.groups()[:6]
+    moment = datetime(
+        int(year), int(month), int(day), int(hour), int(minute), int(second or 0),
+        tzinfo=timezone.utc
+    )
+    if match.group('sign'):
+        moment -= _utc_offset(f"{match.group('sign')}{match.group('hh')}{match.group('mm')}")
+    return moment
+
+
+def as_utc(moment: Optional[datetime] = None) -> datetime:
+    if moment is None:
+        return datetime.now(timezone.utc)
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
 
 class EPGParser:
-    def __init__(self):
-        self.epg_data: Dict[str, List[EPGProgram]] = {}
+    def __init__(self, id_filter: Optional[EPGIdFilter] = None):
+        self.epg_data: Dict[str, ChannelSchedule] = {}
+        self.id_filter = id_filter
+        self.id_matcher = id_filter.matcher if id_filter is not None else EPGIdMatcher.from_settings()
+        self._keys: Dict[str, str] = {}
     
-    def parse_xmltv(self, content: str) -> Dict[str, List[EPGProgram]]:
+    def parse_xmltv(self, content: Union[str, bytes]) -> Dict[str, ChannelSchedule]:
         try:
-            root = etree.fromstring(content.encode('utf-8'))
-            programs_by_channel = {}
-            
-            for programme in root.xpath('//programme'):
-                try:
-                    channel_id = programme.get('channel')
-                    start = programme.get('start')
-                    stop = programme.get('stop')
-                    
-                    if not all([channel_id, start, stop]):
-                        continue
-                    
-                    title_elem = programme.find('title')
-                    title = title_elem.text if title_elem is not None and title_elem.text else "Unknown"
-                    
-                    desc_elem = programme.find('desc')
-                    description = desc_elem.text if desc_elem is not None and desc_elem.text else None
-                    
-                    category_elem = programme.find('category')
-                    category = category_elem.text if category_elem is not None and category_elem.text else None
-                    
-                    icon_elem = programme.find('icon')
-                    icon = icon_elem.get('src') if icon_elem is not None else None
-                    
-                    start_time = self._parse_xmltv_time(start)
-                    end_time = self._parse_xmltv_time(stop)
-                    
-                    if start_time and end_time:
-                        program = EPGProgram(
-                            channel_id=channel_id,
-                            title=title,
-                            description=description,
-                            start_time=start_time,
-                            end_time=end_time,
-                            category=category,
-                            icon=icon
-                        )
-                        
-                        if channel_id not in programs_by_channel:
-                            programs_by_channel[channel_id] = []
-                        programs_by_channel[channel_id].append(program)
-                
-                except Exception as e:
-                    logger.warning(f"Error parsing programme element: {e}")
-                    continue
-            
-            logger.info(f"Parsed EPG data for {len(programs_by_channel)} channels")
-            return programs_by_channel
-            
+            stream = ProgrammeStream(self)
+            stream.feed(content.encode('utf-8') if isinstance(content, str) else content)
+            return stream.close()
         except Exception as e:
             logger.error(f"Error parsing XMLTV content: {e}")
             return {}
     
-    def _parse_xmltv_time(self, time_str: str) -> datetime:
+    def _row_from_element(self, programme, strings: StringTable) -> Optional[Tuple[str, ScheduleRow]]:
+        channel_id = programme.get('channel')
+        if self.id_filter is not None and (channel_id is None or channel_id not in self.id_filter):
+            return None
+        
+        start = programme.get('start')
+        stop = programme.get('stop')
+        
+        if not all([channel_id, start, stop]):
+            return None
+        
+        title_elem = programme.find('title')
+        title = title_elem.text if title_elem is not None and title_elem.text else "Unknown"
+        
+        desc_elem = programme.find('desc')
+        description = desc_elem.text if desc_elem is not None and desc_elem.text else None
+        
+        category_elem = programme.find('category')
+        category = category_elem.text if category_elem is not None and category_elem.text else None
+        
+        icon_elem = programme.find('icon')
+        icon = icon_elem.get('src') if icon_elem is not None else None
+        
+        start_time = self._parse_xmltv_time(start)
+        end_time = self._parse_xmltv_time(stop)
+        
+        if not (start_time and end_time):
+            return None
+        
+        return channel_id, (
+            to_epoch(start_time), to_epoch(end_time), strings.add(title),
+            strings.add(description), strings.add(category), strings.add(icon)
+        )
+    
+    def _parse_xmltv_time(self, time_str: str) -> Optional[datetime]:
         try:
-            if '+' in time_str or '-' in time_str[-5:]:
-                return date_parser.parse(time_str)
-            else:
-                base_time = time_str[:14]
-                return datetime.strptime(base_time, '%Y%m%d%H%M%S')
+            return parse_xmltv_time(time_str)
         except Exception as e:
             logger.warning(f"Error parsing time {time_str}: {e}")
             return None
     
-    async def fetch_and_parse(self, url: str) -> Dict[str, List[EPGProgram]]:
+    async def fetch_and_parse(self, source: str) -> Dict[str, ChannelSchedule]:
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=60)) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        return self.parse_xmltv(content)
-                    else:
-                        logger.error(f"Failed to fetch EPG from {url}: HTTP {response.status}")
-                        return {}
+            return await self.fetch_guide(source)
         except Exception as e:
-            logger.error(f"Error fetching EPG from {url}: {e}")
+            logger.error(f"Error fetching EPG from {source}: {e}")
             return {}
     
-    def get_current_program(self, channel_id: str, now: datetime = None) -> EPGProgram:
-        if now is None:
-            now = datetime.utcnow()
+    async def fetch_guide(self, source: str, timings: Optional[FetchTimings] = None) -> Dict[str, ChannelSchedule]:
+        # Like fetch_and_parse, but failures raise so callers can tell a
+        # broken source from an empty guide
+        timings = timings or FetchTimings()
+        started = time.perf_counter()
+        if is_remote_source(source):
+            chunks = self._fetch_remote(source)
+        else:
+            chunks = read_file_chunks(source)
+        
+        if parse_executor.offloaded:
+            async def downloaded() -> AsyncIterator[bytes]:
+                async for chunk in decompress_chunks(chunks, source):
+                    yield chunk
+                timings.fetch_seconds = time.perf_counter() - started
+            
+            # Pieces are parsed while the rest of the guide downloads; the
+            # parse time reported is what was left after the download ended
+            pieces = iter_xmltv_pieces(downloaded(), settings.parse_chunk_size)
+            results = [result async for result in parse_executor.imap(parse_xmltv_chunk, pieces, self.id_filter)]
+            loop = asyncio.get_running_loop()
+            schedules = await loop.run_in_executor(None, combine_xmltv_chunks, results)
+            timings.parse_seconds = time.perf_counter() - started - timings.fetch_seconds
+            return schedules
         
-        programs = self.epg_data.get(channel_id, [])
-        for program in programs:
-            if program.start_time <= now <= program.end_time:
-                return program
-        return None
+        stream = ProgrammeStream(self)
+        parse_seconds = 0.0
+        async for chunk in decompress_chunks(chunks, source):
+            fed = time.perf_counter()
+            stream.feed(chunk)
+            parse_seconds += time.perf_counter() - fed
+        closed = time.perf_counter()
+        schedules = stream.close()
+        timings.parse_seconds = parse_seconds + time.perf_counter() - closed
+        timings.fetch_seconds = time.perf_counter() - started - timings.parse_seconds
+        return schedules
+    
+    async def _fetch_remote(self, url: str) -> AsyncIterator[bytes]:
+        async with http_client.session.get(
+            url,
+            timeout=aiohttp.ClientTimeout(total=settings.epg_source_timeout)
+        ) as response:
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                yield chunk
+    
+    def get_current_program(self, channel_id: str, now: datetime = None) -> EPGProgram:
+        schedule = self.get_schedule(channel_id)
+        if schedule is None:
+            return None
+        return schedule.current(as_utc(now))
     
     def get_upcoming_programs(self, channel_id: str, limit: int = 5, now: datetime = None) -> List[EPGProgram]:
-        if now is None:
-            now = datetime.utcnow()
-        
-        programs = self.epg_data.get(channel_id, [])
-        upcoming = [p for p in programs if p.start_time > now]
-        upcoming.sort(key=lambda x: x.start_time)
-        return upcoming[:limit]
+        schedule = self.get_schedule(channel_id)
+        if schedule is None:
+            return []
+        return schedule.upcoming(as_utc(now), limit)
     
-    def update_epg_data(self, epg_data: Dict[str, List[EPGProgram]]):
-        self.epg_data = epg_data
+    def get_schedule(self, channel_id: str) -> Optional[ChannelSchedule]:
+        # Exact guide id first, then the same id up to case, suffix and aliases
+        schedule = self.epg_data.get(channel_id)
+        if schedule is None:
+            guide_id = self._keys.get(self.id_matcher.normalize(channel_id))
+            if guide_id is not None:
+                schedule = self.epg_data.get(guide_id)
+        return schedule
+    
+    def update_epg_data(self, epg_data: Dict[str, Sequence[EPGProgram]]):
+        self.epg_data = {
+            channel_id: (
+                programs if isinstance(programs, ChannelSchedule)
+                else ChannelSchedule.from_programs(channel_id, programs)
+            )
+            for channel_id, programs in epg_data.items()
+        }
+        keys = {}
+        for channel_id in self.epg_data:
+            keys.setdefault(self.id_matcher.key(channel_id), channel_id)
+        self._keys = keys
         logger.info(f"Updated EPG data with {len(epg_data)} channels")
+
+
+class ProgrammeStream:
+    # Incremental XMLTV reader: bytes are fed as they arrive, each <programme>
+    # is converted when its end tag is seen and then dropped from the tree, so
+    # memory stays flat however large the guide is.
+    def __init__(self, parser: EPGParser):
+        self.parser = parser
+        self.strings = StringTable()
+        self.rows_by_channel: Dict[str, List[ScheduleRow]] = {}
+        self._pull = etree.XMLPullParser(
+            events=('end',),
+            tag=('programme', 'channel'),
+            resolve_entities=False,
+            huge_tree=True
+        )
+    
+    def feed(self, data: bytes):
+        self._pull.feed(data)
+        self._drain()
+    
+    def finish(self) -> Tuple[List[str], Dict[str, List[ScheduleRow]]]:
+        self._pull.close()
+        self._drain()
+        rows_by_channel, self.rows_by_channel = self.rows_by_channel, {}
+        return self.strings.strings, rows_by_channel
+    
+    def close(self) -> Dict[str, ChannelSchedule]:
+        strings, rows_by_channel = self.finish()
+        schedules = {
+            channel_id: ChannelSchedule(channel_id, rows, strings)
+            for channel_id, rows in rows_by_channel.items()
+        }
+        logger.info(f"Parsed EPG data for {len(schedules)} channels")
+        return schedules
+    
+    def _drain(self):
+        for _, element in self._pull.read_events():
+            if element.tag == 'programme':
+                try:
+                    parsed = self.parser._row_from_element(element, self.strings)
+                    if parsed is not None:
+                        channel_id, row = parsed
+                        self.rows_by_channel.setdefault(channel_id, []).append(row)
+                except Exception as e:
+                    logger.warning(f"Error parsing programme element: {e}")
+            
+            # Drop the finished element and any siblings already handled
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+
+async def iter_xmltv_pieces(chunks: AsyncIterator[bytes], chunk_size: int) -> AsyncIterator[bytes]:
+    # Cuts the guide after </programme> tags into standalone <tv> documents of
+    # roughly chunk_size bytes as it arrives, each keeping the original XML
+    # declaration so the declared encoding still applies
+    buffer = bytearray()
+    prolog = None
+    searched = chunk_size
+    async for chunk in chunks:
+        buffer += chunk
+        if prolog is None:
+            first = buffer.find(b"<programme")
+            if first == -1:
+                continue
+            if buffer.startswith(codecs.BOM_UTF8):
+                del buffer[:len(codecs.BOM_UTF8)]
+                first -= len(codecs.BOM_UTF8)
+            prolog = bytes(buffer[:buffer.index(b"?>") + 2]) if buffer.startswith(b"<?xml") else b""
+            del buffer[:first]
+        while len(buffer) > chunk_size:
+            cut = buffer.find(PROGRAMME_END, searched)
+            if cut == -1:
+                searched = max(chunk_size, len(buffer) - len(PROGRAMME_END))
+                break
+            end = cut + len(PROGRAMME_END)
+            yield b"".join((prolog, b"<tv>", buffer[:end], b"</tv>"))
+            del buffer[:end]
+            searched = chunk_size
+    
+    if prolog is None:
+        # No programmes at all: hand over the document as it is
+        if buffer:
+            yield bytes(buffer)
+        return
+    last = buffer.rfind(b"</tv>")
+    if last == -1:
+        last = len(buffer)
+    if buffer[:last].strip():
+        yield b"".join((prolog, b"<tv>", buffer[:last], b"</tv>"))
+
+
+def parse_xmltv_chunk(
+    piece: bytes,
+    id_filter: Optional[EPGIdFilter] = None
+) -> Tuple[List[str], Dict[str, List[ScheduleRow]]]:
+    # Top-level so process pool workers can unpickle it
+    stream = ProgrammeStream(EPGParser(id_filter))
+    stream.feed(piece)
+    return stream.finish()
+
+
+def combine_xmltv_chunks(results: List[Tuple[List[str], Dict[str, List[ScheduleRow]]]]) -> Dict[str, ChannelSchedule]:
+    if len(results) == 1:
+        strings, rows_by_channel = results[0]
+    else:
+        # Re-intern every chunk's strings into one table for the whole guide
+        table = StringTable()
+        rows_by_channel = {}
+        for chunk_strings, chunk_rows in results:
+            remap = [NO_STRING] + [table.add(value) for value in chunk_strings[1:]]
+            for channel_id, rows in chunk_rows.items():
+                rows_by_channel.setdefault(channel_id, []).extend(
+                    (row[0], row[1], remap[row[2]], remap[row[3]], remap[row[4]], remap[row[5]])
+                    for row in rows
+                )
+        strings = table.strings
+    
+    schedules = {
+        channel_id: ChannelSchedule(channel_id, rows, strings)
+        for channel_id, rows in rows_by_channel.items()
+    }
+    logger.info(f"Parsed EPG data for {len(schedules)} channels from {len(results)} chunks")
+    return schedules
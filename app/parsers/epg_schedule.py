@@ -0,0 +1,259 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from app.models import EPGProgram
+from app.storage.binary import StringTable, NO_STRING
+
+# (start, end, title, description, category, icon): epoch seconds, then
+# indexes into the guide's string table
+ScheduleRow = Tuple[int, int, int, int, int, int]
+
+# The same row with its text fields resolved to strings
+ProgramRow = Tuple[int, int, str, Optional[str], Optional[str], Optional[str]]
+
+COLUMNS = ("starts", "ends", "titles", "descriptions", "categories", "icons")
+
+
+def to_epoch(moment: datetime) -> int:
+    return int(moment.timestamp())
+
+
+def from_epoch(seconds: int) -> datetime:
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+
+class ChannelSchedule(Sequence):
+    # One channel's programmes stored column-wise: epoch-second start/end
+    # arrays plus string-table indexes for the text fields. Rows are sorted
+    # and de-overlapped once when built, so lookups by time are binary
+    # searches over `starts`; EPGProgram objects are only created for the
+    # rows a caller actually reads.
+    __slots__ = ("channel_id", "strings", "_fingerprint") + COLUMNS
+    
+    def __init__(self, channel_id: str, rows: Iterable[ScheduleRow], strings: List[str]):
+        ordered = sorted((row for row in rows if row[1] > row[0]), key=lambda row: row[0])
+        cleaned: List[ScheduleRow] = []
+        for row in ordered:
+            if cleaned:
+                previous = cleaned[-1]
+                if row[0] == previous[0]:
+                    # Duplicate slot: the first listing wins (the sort is stable)
+                    continue
+                if row[0] < previous[1]:
+                    # A later start cuts the running programme short
+                    cleaned[-1] = (previous[0], row[0]) + previous[2:]
+            cleaned.append(row)
+        
+        self.channel_id = channel_id
+        self.strings = strings
+        self._fingerprint = None
+        columns = list(zip(*cleaned)) or [()] * len(COLUMNS)
+        self.starts = array("q", columns[0])
+        self.ends = array("q", columns[1])
+        self.titles = array("I", columns[2])
+        self.descriptions = array("I", columns[3])
+        self.categories = array("I", columns[4])
+        self.icons = array("I", columns[5])
+    
+    @classmethod
+    def from_programs(
+        cls,
+        channel_id: str,
+        programs: Iterable[EPGProgram],
+        strings: Optional[StringTable] = None
+    ) -> "ChannelSchedule":
+        strings = strings or StringTable()
+        rows = [
+            (
+                to_epoch(p.start_time), to_epoch(p.end_time), strings.add(p.title),
+                strings.add(p.description), strings.add(p.category), strings.add(p.icon)
+            )
+            for p in programs
+        ]
+        return cls(channel_id, rows, strings.strings)
+    
+    @classmethod
+    def from_program_rows(cls, channel_id: str, rows: Iterable[ProgramRow]) -> "ChannelSchedule":
+        strings = StringTable()
+        rows = [
+            (start, end, strings.add(title), strings.add(description), strings.add(category), strings.add(icon))
+            for start, end, title, description, category, icon in rows
+        ]
+        return cls(channel_id, rows, strings.strings)
+    
+    @classmethod
+    def from_columns(cls, channel_id: str, strings: List[str], *columns: array) -> "ChannelSchedule":
+        # Trusted path for columns that are already sorted and de-overlapped
+        schedule = cls.__new__(cls)
+        schedule.channel_id = channel_id
+        schedule.strings = strings
+        schedule._fingerprint = None
+        for name, column in zip(COLUMNS, columns):
+            setattr(schedule, name, column)
+        return schedule
+    
+    def _slice(self, first: int, last: int) -> "ChannelSchedule":
+        # Shares the string table; only the column arrays are copied
+        return ChannelSchedule.from_columns(
+            self.channel_id, self.strings, *(getattr(self, name)[first:last] for name in COLUMNS)
+        )
+    
+    def __len__(self) -> int:
+        return len(self.starts)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._program(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("schedule index out of range")
+        return self._program(index)
+    
+    def __iter__(self) -> Iterator[EPGProgram]:
+        return (self._program(i) for i in range(len(self)))
+    
+    def rows(self) -> Iterator[ProgramRow]:
+        text = self._text
+        strings = self.strings
+        for start, end, title, description, category, icon in zip(
+            self.starts, self.ends, self.titles, self.descriptions, self.categories, self.icons
+        ):
+            yield start, end, strings[title], text(description), text(category), text(icon)
+    
+    @property
+    def fingerprint(self) -> int:
+        # Content hash over resolved rows, comparable across string tables
+        if self._fingerprint is None:
+            self._fingerprint = hash(tuple(self.rows()))
+        return self._fingerprint
+    
+    def window(self, start: int, end: int) -> "ChannelSchedule":
+        # Rows still running at `start` through rows starting before `end`;
+        # returns self when nothing falls outside
+        first = bisect_right(self.ends, start)
+        last = bisect_left(self.starts, end)
+        if first == 0 and last == len(self):
+            return self
+        return self._slice(first, max(first, last))
+    
+    def between(self, start: int, end: int) -> List[EPGProgram]:
+        # Programmes overlapping [start, end). Rows never overlap, so `ends`
+        # is sorted too and both bounds are binary searches.
+        first = bisect_right(self.ends, start)
+        last = bisect_left(self.starts, end)
+        return self[first:max(first, last)]
+    
+    def _text(self, index: int) -> Optional[str]:
+        return self.strings[index] if index != NO_STRING else None
+    
+    def _program(self, index: int) -> EPGProgram:
+        return EPGProgram(
+            channel_id=self.channel_id,
+            title=self.strings[self.titles[index]],
+            description=self._text(self.descriptions[index]),
+            start_time=from_epoch(self.starts[index]),
+            end_time=from_epoch(self.ends[index]),
+            category=self._text(self.categories[index]),
+            icon=self._text(self.icons[index])
+        )
+    
+    def current(self, now: datetime) -> Optional[EPGProgram]:
+        moment = now.timestamp()
+        index = bisect_right(self.starts, moment) - 1
+        if index >= 0 and moment < self.ends[index]:
+            return self._program(index)
+        return None
+    
+    def now_next(self, moment: int) -> Tuple[Optional[EPGProgram], Optional[EPGProgram], Optional[int]]:
+        # Current and next programme at `moment`, plus the epoch second at
+        # which that answer changes (None once the schedule has run out)
+        index = bisect_right(self.starts, moment) - 1
+        if index >= 0 and moment < self.ends[index]:
+            current = self._program(index)
+            boundary = self.ends[index]
+        else:
+            current = None
+            boundary = self.starts[index + 1] if index + 1 < len(self) else None
+        following = self._program(index + 1) if index + 1 < len(self) else None
+        return current, following, boundary
+    
+    def upcoming(self, now: datetime, limit: int) -> List[EPGProgram]:
+        index = bisect_right(self.starts, now.timestamp())
+        return self[index:index + limit]
+
+
+def merge_schedules(channel_id: str, schedules: Sequence[ChannelSchedule]) -> ChannelSchedule:
+    # Schedules come in source priority order: a lower-priority programme is
+    # only kept where it fits in a gap left by the higher-priority ones.
+    if len(schedules) == 1:
+        return schedules[0]
+    
+    accepted: List[ProgramRow] = list(schedules[0].rows())
+    for schedule in schedules[1:]:
+        starts = [row[0] for row in accepted]
+        gaps = []
+        for row in schedule.rows():
+            index = bisect_right(starts, row[0])
+            if index and accepted[index - 1][1] > row[0]:
+                continue
+            if index < len(accepted) and accepted[index][0] < row[1]:
+                continue
+            gaps.append(row)
+        if gaps:
+            accepted = sorted(accepted + gaps, key=lambda row: row[0])
+    return ChannelSchedule.from_program_rows(channel_id, accepted)
+
+
+class GuideMerger:
+    # Merges per-source guides into the served guide. Per channel it
+    # remembers which source schedules the merged result was built from, so a
+    # refresh that leaves a channel's content unchanged keeps the existing
+    # schedule objects instead of rebuilding them.
+    def __init__(self):
+        self.origins: Dict[str, Tuple[int, ...]] = {}
+    
+    def absorb(
+        self,
+        previous: Optional[Dict[str, ChannelSchedule]],
+        guide: Dict[str, ChannelSchedule]
+    ) -> Dict[str, ChannelSchedule]:
+        # Swap freshly parsed schedules for the previous objects when equal
+        if not previous:
+            return guide
+        absorbed = {}
+        for channel_id, schedule in guide.items():
+            old = previous.get(channel_id)
+            if old is not None and len(old) == len(schedule) and old.fingerprint == schedule.fingerprint:
+                schedule = old
+            absorbed[channel_id] = schedule
+        return absorbed
+    
+    def merge(
+        self,
+        guides: Sequence[Dict[str, ChannelSchedule]],
+        previous: Dict[str, ChannelSchedule],
+        window_start: int,
+        window_end: int
+    ) -> Dict[str, ChannelSchedule]:
+        channel_ids = dict.fromkeys(channel_id for guide in guides for channel_id in guide)
+        merged = {}
+        origins = {}
+        
+        for channel_id in channel_ids:
+            parts = [guide[channel_id] for guide in guides if channel_id in guide]
+            origin = tuple(part.fingerprint for part in parts)
+            old = previous.get(channel_id)
+            if old is not None and self.origins.get(channel_id) == origin:
+                schedule = old
+            else:
+                schedule = merge_schedules(channel_id, parts)
+            
+            schedule = schedule.window(window_start, window_end)
+            if len(schedule):
+                merged[channel_id] = schedule
+                origins[channel_id] = origin
+        
+        self.origins = origins
+        return merged
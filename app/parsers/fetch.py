@@ -0,0 +1,87 @@
+import os
+import hashlib
+import aiofiles
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional
+from app.models import SourceFetchState
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def is_remote_source(source: str) -> bool:
+    return source.startswith('http://') or source.startswith('https://')
+
+
+async def read_file_chunks(filepath: str, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    async with aiofiles.open(filepath, 'rb') as f:
+        while True:
+            chunk = await f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+class FetchTimings:
+    # Wall time split between waiting on the source and parsing its bytes
+    def __init__(self):
+        self.fetch_seconds = 0.0
+        self.parse_seconds = 0.0
+
+
+class SourceFetch:
+    # Tracks one conditional fetch: carries the validators from the previous
+    # fetch in, and collects the new validators plus a body digest as the
+    # raw bytes stream through.
+    def __init__(self, source: str, previous: Optional[SourceFetchState] = None):
+        self.source = source
+        self.previous = previous
+        self.state = SourceFetchState()
+        self.not_modified = False
+        self.completed = False
+        self._hasher = hashlib.sha256()
+    
+    def request_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.previous is not None:
+            if self.previous.etag:
+                headers['If-None-Match'] = self.previous.etag
+            if self.previous.last_modified:
+                headers['If-Modified-Since'] = self.previous.last_modified
+        return headers
+    
+    def record_response(self, headers) -> None:
+        self.state.etag = headers.get('ETag')
+        self.state.last_modified = headers.get('Last-Modified')
+    
+    def check_local(self, filepath: str) -> None:
+        stat = os.stat(filepath)
+        self.state.mtime = stat.st_mtime
+        self.state.size = stat.st_size
+        if (self.previous is not None and
+                self.previous.mtime == stat.st_mtime and
+                self.previous.size == stat.st_size):
+            self.mark_not_modified()
+    
+    def mark_not_modified(self) -> None:
+        self.not_modified = True
+        self.state = self.previous.model_copy(update={'fetched_at': datetime.utcnow()})
+    
+    def update(self, chunk: bytes) -> None:
+        self._hasher.update(chunk)
+    
+    def finish(self) -> None:
+        if not self.not_modified:
+            self.state.digest = self._hasher.hexdigest()
+            self.state.fetched_at = datetime.utcnow()
+        self.completed = True
+    
+    @property
+    def unchanged(self) -> bool:
+        if self.not_modified:
+            return True
+        return (
+            self.completed and
+            self.previous is not None and
+            self.previous.digest is not None and
+            self.previous.digest == self.state.digest
+        )
@@ -1,12 +1,31 @@
-import re
+import codecs
 import aiohttp
 import hashlib
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from app.models import Channel
-from app.core import get_logger
+from app.parsers.compression import decompress_chunks
+from app.parsers.fetch import STREAM_CHUNK_SIZE, SourceFetch, is_remote_source, read_file_chunks
+from app.core import settings, get_logger, http_client, parse_executor
 
 logger = get_logger(__name__)
 
+def tokenize_extinf(line: str) -> Tuple[Dict[str, str], str]:
+    # One split on '"' leaves `... key=` heads at even indexes and values at
+    # odd ones; the first head containing a comma starts the display name.
+    attributes = {}
+    parts = line.split('"')
+    last = len(parts) - 1
+    index = 0
+    while index < last:
+        head = parts[index]
+        if head[-1:] != '=' or ',' in head:
+            break
+        attributes[head[head.rfind(' ') + 1:-1]] = parts[index + 1]
+        index += 2
+    tail = '"'.join(parts[index:]) if index < last else parts[index]
+    comma = tail.find(',')
+    return attributes, tail[comma + 1:].strip() if comma != -1 else ""
+
 
 class M3U8Parser:
     def __init__(self):
@@ -21,112 +40,186 @@ class M3U8Parser:
         return any(keyword in text for keyword in self.astro_keywords)
     
     def _parse_extinf_line(self, line: str) -> Dict[str, Optional[str]]:
-        metadata = {}
-        
-        tvg_id_match = re.search(r'tvg-id="([^"]*)"', line)
-        metadata['tvg_id'] = tvg_id_match.group(1) if tvg_id_match else None
-        
-        tvg_name_match = re.search(r'tvg-name="([^"]*)"', line)
-        metadata['tvg_name'] = tvg_name_match.group(1) if tvg_name_match else None
-        
-        tvg_logo_match = re.search(r'tvg-logo="([^"]*)"', line)
-        metadata['logo'] = tvg_logo_match.group(1) if tvg_logo_match else None
-        
-        group_title_match = re.search(r'group-title="([^"]*)"', line)
-        metadata['group'] = group_title_match.group(1) if group_title_match else None
+        attributes, name = tokenize_extinf(line)
         
-        radio_match = re.search(r'radio="([^"]*)"', line)
-        metadata['radio'] = radio_match.group(1).lower() == "true" if radio_match else False
+        language = attributes.pop('tvg-language', None)
+        if language is None:
+            language = attributes.get('language')
+        attributes.pop('language', None)
+        radio = attributes.pop('radio', None)
         
-        language_match = re.search(r'tvg-language="([^"]*)"', line)
-        if not language_match:
-            language_match = re.search(r'language="([^"]*)"', line)
-        metadata['language'] = language_match.group(1) if language_match else None
-        
-        country_match = re.search(r'tvg-country="([^"]*)"', line)
-        metadata['country'] = country_match.group(1) if country_match else "MY"
+        return {
+            'tvg_id': attributes.pop('tvg-id', None),
+            'tvg_name': attributes.pop('tvg-name', None),
+            'logo': attributes.pop('tvg-logo', None),
+            'group': attributes.pop('group-title', None),
+            'radio': radio.lower() == "true" if radio is not None else False,
+            'language': language,
+            'country': attributes.pop('tvg-country', "MY"),
+            'name': name or "Unknown",
+            'attributes': attributes
+        }
+    
+    def _build_channel(self, metadata: Dict[str, Optional[str]], url: str) -> Channel:
+        channel_id = self._generate_channel_id(metadata['name'], url)
         
-        name_match = re.search(r',(.+)$', line)
-        metadata['name'] = name_match.group(1).strip() if name_match else "Unknown"
+        is_astro = self._is_astro_channel(
+            metadata['name'],
+            metadata.get('group', '')
+        )
         
-        return metadata
+        channel = Channel.from_trusted({
+            'id': channel_id,
+            'name': metadata['name'],
+            'logo': metadata.get('logo'),
+            'group': metadata.get('group'),
+            'url': url,
+            'epg_id': metadata.get('tvg_id'),
+            'language': metadata.get('language'),
+            'country': metadata.get('country', 'MY'),
+            'tvg_id': metadata.get('tvg_id'),
+            'tvg_name': metadata.get('tvg_name'),
+            'radio': metadata.get('radio', False),
+            'is_astro': is_astro,
+            'attributes': metadata.get('attributes', {})
+        })
+        logger.debug(f"Parsed channel: {channel.name}")
+        return channel
     
     def parse_m3u8_content(self, content: str) -> List[Channel]:
+        assembler = PlaylistAssembler(self)
         channels = []
-        lines = content.strip().split('\n')
         
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            if line.startswith('#EXTINF:'):
-                metadata = self._parse_extinf_line(line)
-                
-                if i + 1 < len(lines):
-                    url_line = lines[i + 1].strip()
-                    
-                    if url_line and not url_line.startswith('#'):
-                        channel_id = self._generate_channel_id(metadata['name'], url_line)
-                        
-                        is_astro = self._is_astro_channel(
-                            metadata['name'],
-                            metadata.get('group', '')
-                        )
-                        
-                        channel = Channel(
-                            id=channel_id,
-                            name=metadata['name'],
-                            logo=metadata.get('logo'),
-                            group=metadata.get('group'),
-                            url=url_line,
-                            epg_id=metadata.get('tvg_id'),
-                            language=metadata.get('language'),
-                            country=metadata.get('country', 'MY'),
-                            tvg_id=metadata.get('tvg_id'),
-                            tvg_name=metadata.get('tvg_name'),
-                            radio=metadata.get('radio', False),
-                            is_astro=is_astro
-                        )
-                        channels.append(channel)
-                        logger.debug(f"Parsed channel: {channel.name}")
-                
-                i += 2
-            else:
-                i += 1
+        for line in content.strip().split('\n'):
+            channel = assembler.feed(line)
+            if channel is not None:
+                channels.append(channel)
         
         logger.info(f"Parsed {len(channels)} channels from M3U8 content")
         return channels
     
-    async def fetch_and_parse(self, source: str) -> List[Channel]:
+    async def stream_channels(self, source: str, fetch: Optional[SourceFetch] = None) -> AsyncIterator[Channel]:
+        if fetch is None:
+            fetch = SourceFetch(source)
+        assembler = PlaylistAssembler(self)
+        count = 0
         try:
-            if source.startswith('http://') or source.startswith('https://'):
-                return await self._fetch_remote(source)
+            if is_remote_source(source):
+                chunks = self._fetch_remote(source, fetch)
+            else:
+                chunks = self._read_local(source, fetch)
+            
+            if parse_executor.offloaded:
+                pieces = iter_playlist_pieces(decompress_chunks(chunks, source), settings.parse_chunk_size)
+                async for channels in parse_executor.imap(parse_playlist_chunk, pieces):
+                    for channel in channels:
+                        count += 1
+                        yield channel
             else:
-                return await self._read_local(source)
+                async for line in iter_text_lines(decompress_chunks(chunks, source)):
+                    channel = assembler.feed(line)
+                    if channel is not None:
+                        count += 1
+                        yield channel
+            fetch.finish()
         except Exception as e:
             logger.error(f"Error parsing M3U8 source {source}: {e}")
-            return []
+            return
+        
+        if fetch.not_modified:
+            logger.info(f"M3U8 source not modified: {source}")
+        else:
+            logger.info(f"Streamed {count} channels from {source}")
     
-    async def _fetch_remote(self, url: str) -> List[Channel]:
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        return self.parse_m3u8_content(content)
-                    else:
-                        logger.error(f"Failed to fetch {url}: HTTP {response.status}")
-                        return []
-        except Exception as e:
-            logger.error(f"Error fetching remote M3U8 {url}: {e}")
+    async def fetch_and_parse(self, source: str) -> List[Channel]:
+        fetch = SourceFetch(source)
+        channels = [channel async for channel in self.stream_channels(source, fetch)]
+        if not fetch.completed:
+            # The stream failed part way; its channels are not the whole source
             return []
+        return channels
     
-    async def _read_local(self, filepath: str) -> List[Channel]:
-        try:
-            import aiofiles
-            async with aiofiles.open(filepath, 'r', encoding='utf-8') as f:
-                content = await f.read()
-                return self.parse_m3u8_content(content)
-        except Exception as e:
-            logger.error(f"Error reading local M3U8 {filepath}: {e}")
-            return []
+    async def _fetch_remote(self, url: str, fetch: SourceFetch) -> AsyncIterator[bytes]:
+        async with http_client.session.get(
+            url,
+            headers=fetch.request_headers(),
+            timeout=aiohttp.ClientTimeout(total=settings.m3u8_source_timeout)
+        ) as response:
+            if response.status == 304 and fetch.previous is not None:
+                fetch.mark_not_modified()
+                return
+            if response.status != 200:
+                raise RuntimeError(f"Failed to fetch {url}: HTTP {response.status}")
+            fetch.record_response(response.headers)
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                fetch.update(chunk)
+                yield chunk
+    
+    async def _read_local(self, filepath: str, fetch: SourceFetch) -> AsyncIterator[bytes]:
+        fetch.check_local(filepath)
+        if fetch.not_modified:
+            return
+        async for chunk in read_file_chunks(filepath):
+            fetch.update(chunk)
+            yield chunk
+
+
+class PlaylistAssembler:
+    # Incremental EXTINF/URL pairing: an #EXTINF line always consumes the line
+    # after it, which becomes the stream URL unless it is blank or a directive.
+    def __init__(self, parser: M3U8Parser):
+        self.parser = parser
+        self.pending: Optional[Dict[str, Optional[str]]] = None
+    
+    def feed(self, line: str) -> Optional[Channel]:
+        line = line.strip()
+        
+        if self.pending is not None:
+            metadata, self.pending = self.pending, None
+            if line and not line.startswith('#'):
+                return self.parser._build_channel(metadata, line)
+            return None
+        
+        if line.startswith('#EXTINF:'):
+            self.pending = self.parser._parse_extinf_line(line)
+        return None
+
+
+async def iter_playlist_pieces(chunks: AsyncIterator[bytes], chunk_size: int) -> AsyncIterator[bytes]:
+    # Cuts the stream as it arrives, only in front of an #EXTINF line so
+    # every entry stays with its URL; at most about one piece is buffered
+    buffer = bytearray()
+    searched = chunk_size
+    async for chunk in chunks:
+        buffer += chunk
+        while len(buffer) > chunk_size:
+            cut = buffer.find(b"\n#EXTINF", searched)
+            if cut == -1:
+                searched = max(chunk_size, len(buffer) - len(b"\n#EXTINF"))
+                break
+            yield bytes(buffer[:cut + 1])
+            del buffer[:cut + 1]
+            searched = chunk_size
+    if buffer:
+        yield bytes(buffer)
+
+
+def parse_playlist_chunk(piece: bytes) -> List[Channel]:
+    # Top-level so process pool workers can unpickle it
+    return M3U8Parser().parse_m3u8_content(piece.decode('utf-8-sig', errors='replace'))
+
+
+async def iter_text_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    remainder = ""
+    
+    async for chunk in chunks:
+        text = remainder + decoder.decode(chunk)
+        lines = text.split('\n')
+        remainder = lines.pop()
+        for line in lines:
+            yield line
+    
+    remainder += decoder.decode(b"", final=True)
+    if remainder:
+        yield remainder
@@ -1,12 +1,17 @@
+from app.services.catalog import ChannelCatalog
 from app.services.channel_service import channel_service, ChannelService
 from app.services.epg_service import epg_service, EPGService
 from app.services.favorite_service import favorite_service, FavoriteService
+from app.services.events import event_broadcaster, EventBroadcaster
 
 __all__ = [
+    "ChannelCatalog",
     "channel_service",
     "ChannelService",
     "epg_service",
     "EPGService",
     "favorite_service",
-    "FavoriteService"
+    "FavoriteService",
+    "event_broadcaster",
+    "EventBroadcaster"
 ]
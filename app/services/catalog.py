@@ -0,0 +1,141 @@
+import threading
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.models import Channel
+from app.services.channel_search import ChannelSearchIndex
+
+FILTER_FIELDS = ("group", "language", "country")
+
+
+class ChannelCatalog:
+    # Immutable view of one loaded channel list. Everything a request reads
+    # lives on a single catalog object, so swapping `ChannelService.catalog`
+    # publishes a new list and its indexes in one reference assignment.
+    __slots__ = (
+        "version", "created_at", "channels", "channels_by_id", "channels_by_source",
+        "groups", "_keys", "_indexes", "_flags", "_search_index", "_search_lock"
+    )
+    
+    def __init__(
+        self,
+        version: int,
+        channels_by_source: Dict[str, List[Channel]],
+        channels_by_id: Optional[Dict[str, Channel]] = None
+    ):
+        channels = tuple(ch for source_channels in channels_by_source.values() for ch in source_channels)
+        if channels_by_id is None:
+            channels_by_id = {ch.id: ch for ch in channels}
+        
+        setattr_ = object.__setattr__
+        setattr_(self, "version", version)
+        setattr_(self, "created_at", datetime.utcnow())
+        setattr_(self, "channels", channels)
+        setattr_(self, "channels_by_id", MappingProxyType(channels_by_id))
+        setattr_(self, "channels_by_source", MappingProxyType({
+            source: tuple(source_channels) for source, source_channels in channels_by_source.items()
+        }))
+        setattr_(self, "_search_index", None)
+        setattr_(self, "_search_lock", threading.Lock())
+        self._build_indexes()
+    
+    def _build_indexes(self):
+        # Case-folded keys per position plus position lists per key, built once
+        # per catalog so filters never rescan or re-lowercase the channel list.
+        keys = {field: [] for field in FILTER_FIELDS}
+        indexes = {field: {} for field in FILTER_FIELDS}
+        groups = set()
+        flags = {("is_astro", True): [], ("is_astro", False): [], ("radio", True): [], ("radio", False): []}
+        
+        for position, channel in enumerate(self.channels):
+            for field in FILTER_FIELDS:
+                value = getattr(channel, field)
+                key = value.casefold() if value else None
+                keys[field].append(key)
+                if key is not None:
+                    indexes[field].setdefault(key, []).append(position)
+            if channel.group:
+                groups.add(channel.group)
+            flags[("is_astro", bool(channel.is_astro))].append(position)
+            flags[("radio", bool(channel.radio))].append(position)
+        
+        setattr_ = object.__setattr__
+        setattr_(self, "groups", tuple(sorted(groups)))
+        setattr_(self, "_keys", keys)
+        setattr_(self, "_indexes", {
+            field: {key: tuple(positions) for key, positions in index.items()}
+            for field, index in indexes.items()
+        })
+        setattr_(self, "_flags", {flag: tuple(positions) for flag, positions in flags.items()})
+    
+    @property
+    def search_index(self) -> ChannelSearchIndex:
+        # Built on first use (or warmed in a worker thread on publish) so
+        # catalog swaps stay cheap for callers that never search.
+        index = self._search_index
+        if index is None:
+            with self._search_lock:
+                index = self._search_index
+                if index is None:
+                    index = ChannelSearchIndex(self.channels)
+                    object.__setattr__(self, "_search_index", index)
+        return index
+    
+    def search(self, query: str, page: int = 1, page_size: int = 50) -> Tuple[List[Channel], int, bool]:
+        start = (page - 1) * page_size
+        positions, total, total_exact = self.search_index.search(query, start + page_size)
+        return self.select(positions[start:]), total, total_exact
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("ChannelCatalog is immutable")
+    
+    def __len__(self) -> int:
+        return len(self.channels)
+    
+    def page(self, page: int, page_size: int) -> Tuple[List[Channel], int]:
+        start = (page - 1) * page_size
+        return list(self.channels[start:start + page_size]), len(self.channels)
+    
+    def filter_positions(
+        self,
+        group: Optional[str] = None,
+        language: Optional[str] = None,
+        country: Optional[str] = None,
+        astro: Optional[bool] = None,
+        radio: Optional[bool] = None
+    ) -> Sequence[int]:
+        criteria = {
+            field: value.casefold()
+            for field, value in (("group", group), ("language", language), ("country", country))
+            if value
+        }
+        candidates = [self._indexes[field].get(key, ()) for field, key in criteria.items()]
+        flag_checks = [(field, value) for field, value in (("is_astro", astro), ("radio", radio)) if value is not None]
+        candidates.extend(self._flags[flag] for flag in flag_checks)
+        
+        if not candidates:
+            return range(len(self.channels))
+        if len(candidates) == 1:
+            return candidates[0]
+        
+        # Verify the other criteria only against the smallest candidate list
+        key_checks = [(self._keys[field], key) for field, key in criteria.items()]
+        channels = self.channels
+        result = []
+        for position in min(candidates, key=len):
+            if any(keys[position] != key for keys, key in key_checks):
+                continue
+            channel = channels[position]
+            if any(bool(getattr(channel, field)) != value for field, value in flag_checks):
+                continue
+            result.append(position)
+        return result
+    
+    def filter(self, page: int = 1, page_size: int = 50, **criteria) -> Tuple[List[Channel], int]:
+        positions = self.filter_positions(**criteria)
+        start = (page - 1) * page_size
+        return [self.channels[position] for position in positions[start:start + page_size]], len(positions)
+    
+    def select(self, positions: Sequence[int]) -> List[Channel]:
+        channels = self.channels
+        return [channels[position] for position in positions]
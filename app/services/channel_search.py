@@ -0,0 +1,209 @@
+import re
+import math
+import heapq
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterator, List, Sequence, Set, Tuple
+from app.models import Channel
+
+_WORD_RE = re.compile(r"\w+")
+# Letter and digit runs inside a word, so "3" finds "TV3" as a word start
+_RUN_RE = re.compile(r"\d+|[^\W\d]+")
+
+# Weight of a match in the name fields vs. the group / language fields
+META_WEIGHT = 0.6
+EXACT_NAME_BONUS = 1.0
+NAME_PREFIX_BONUS = 0.5
+
+# Share of a query word's trigrams a channel must contain; below 1.0 so
+# that a typo in a longer word still matches
+MIN_MATCH_RATIO = 0.5
+
+# Matches are counted exactly up to this many; past it the search stops and
+# reports the count so far as a lower bound
+MAX_COUNTED_HITS = 1000
+
+
+def normalize_text(text: str) -> str:
+    if text.isascii():
+        return text.casefold()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+@lru_cache(maxsize=65536)
+def word_trigrams(word: str) -> FrozenSet[str]:
+    # Words are padded so start and end boundaries get their own trigrams; the
+    # two-character start gram lets single-letter queries use the index too.
+    padded = f" {word} "
+    return frozenset([padded[:2]] + [padded[i:i + 3] for i in range(len(padded) - 2)])
+
+
+@lru_cache(maxsize=4096)
+def prefix_trigrams(word: str) -> FrozenSet[str]:
+    # The last query word may still be being typed, so it gets no end boundary
+    if len(word) == 1:
+        return frozenset([f" {word}"])
+    padded = f" {word}"
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def text_trigrams(text: str) -> Set[str]:
+    grams = set()
+    for word in _WORD_RE.findall(text):
+        grams |= word_trigrams(word)
+        runs = _RUN_RE.findall(word)
+        if len(runs) > 1:
+            for run in runs:
+                grams |= word_trigrams(run)
+    return grams
+
+
+def _add_postings(postings: Dict[str, array], grams, position: int):
+    for gram in grams:
+        entries = postings.get(gram)
+        if entries is None:
+            entries = postings[gram] = array("I")
+        entries.append(position)
+
+
+class ChannelSearchIndex:
+    # Trigram inverted index over one catalog's channel list. Postings hold
+    # catalog positions, so results can be paged straight off the catalog.
+    # Names are also kept sorted, so exact and prefix name matches, which
+    # outrank every other match, are a bisected range.
+    def __init__(self, channels: Sequence[Channel]):
+        self.size = len(channels)
+        self.names: List[str] = []
+        self.meta_ids = array("I")
+        self.meta_grams: List[Set[str]] = []
+        self.name_postings: Dict[str, array] = {}
+        self.meta_postings: Dict[str, array] = {}
+        meta_lookup: Dict[Tuple[str, str], int] = {}
+        
+        for position, channel in enumerate(channels):
+            name = normalize_text(channel.name)
+            name_text = name
+            if channel.tvg_name and channel.tvg_name != channel.name:
+                name_text = f"{name} {normalize_text(channel.tvg_name)}"
+            self.names.append(name)
+            _add_postings(self.name_postings, text_trigrams(name_text), position)
+            
+            meta_key = (channel.group or "", channel.language or "")
+            meta_id = meta_lookup.get(meta_key)
+            if meta_id is None:
+                meta_id = meta_lookup[meta_key] = len(self.meta_grams)
+                self.meta_grams.append(text_trigrams(normalize_text(" ".join(meta_key))))
+            self.meta_ids.append(meta_id)
+            _add_postings(self.meta_postings, self.meta_grams[meta_id], position)
+        
+        self.name_order = array("I", sorted(range(self.size), key=self.names.__getitem__))
+        self.sorted_names = [self.names[position] for position in self.name_order]
+    
+    def _posting_cost(self, grams) -> int:
+        return sum(
+            len(self.name_postings.get(gram, ())) + len(self.meta_postings.get(gram, ()))
+            for gram in grams
+        )
+    
+    def _candidates(self, grams, postings: Dict[str, array]) -> Iterator[int]:
+        # Positions in catalog order holding at least one of the word's
+        # len - required + 1 rarest trigrams; any position with the required
+        # share of its trigrams is among them
+        needed = len(grams) - math.ceil(_required_hits(grams)) + 1
+        lists = sorted((postings.get(gram, ()) for gram in grams), key=len)[:needed]
+        if len(lists) == 1:
+            yield from lists[0]
+            return
+        last = None
+        for position in heapq.merge(*lists):
+            if position != last:
+                last = position
+                yield position
+    
+    def _name_hits(self, grams, position: int) -> int:
+        # Postings are in position order, so membership is a bisect
+        hits = 0
+        for gram in grams:
+            entries = self.name_postings.get(gram)
+            if entries:
+                index = bisect_left(entries, position)
+                if index < len(entries) and entries[index] == position:
+                    hits += 1
+        return hits
+    
+    def _score(self, word_grams, position: int) -> float:
+        # Mean word score, 0.0 unless every word matches
+        meta_grams = self.meta_grams[self.meta_ids[position]]
+        score = 0.0
+        for grams in word_grams:
+            required = _required_hits(grams)
+            name_hits = self._name_hits(grams, position)
+            meta_hits = len(grams & meta_grams)
+            word_score = name_hits / len(grams) if name_hits >= required else 0.0
+            if meta_hits >= required:
+                word_score = max(word_score, META_WEIGHT * meta_hits / len(grams))
+            if not word_score:
+                return 0.0
+            score += word_score
+        return score / len(word_grams)
+    
+    def search(self, query: str, limit: int) -> Tuple[List[int], int, bool]:
+        # Returns the top `limit` positions, the match count and whether that
+        # count is exact
+        words = _WORD_RE.findall(normalize_text(query))
+        if not words:
+            return [], 0, True
+        normalized = " ".join(words)
+        word_grams = [word_trigrams(word) for word in words[:-1]] + [prefix_trigrams(words[-1])]
+        
+        # Exact, then prefix name matches rank first, each in catalog order
+        sorted_names = self.sorted_names
+        first = bisect_left(sorted_names, normalized)
+        middle = bisect_right(sorted_names, normalized, first)
+        last = bisect_left(sorted_names, normalized + "\U0010ffff", middle)
+        leading = self._first_positions(first, middle, limit)
+        leading += self._first_positions(middle, last, limit - len(leading))
+        leading_total = last - first
+        
+        # Everything else is scored in catalog order, channels matching the
+        # rarest word by name before those matching it by group or language,
+        # and the walk stops after a bounded number of matches
+        budget = max(MAX_COUNTED_HITS, limit + 1) - leading_total
+        total_exact = budget > 0
+        scored = []
+        if total_exact:
+            # Rarest word first: it drives the walk and most misses fail on it
+            word_grams.sort(key=self._posting_cost)
+            seen = set(self.name_order[first:last])
+            for postings in (self.name_postings, self.meta_postings):
+                for position in self._candidates(word_grams[0], postings):
+                    if position in seen:
+                        continue
+                    seen.add(position)
+                    score = self._score(word_grams, position)
+                    if score:
+                        scored.append((-score, position))
+                        if len(scored) >= budget:
+                            total_exact = False
+                            break
+                if not total_exact:
+                    break
+        
+        wanted = limit - len(leading)
+        top = heapq.nsmallest(wanted, scored) if wanted < len(scored) else sorted(scored)
+        return leading + [position for _, position in top], leading_total + len(scored), total_exact
+    
+    def _first_positions(self, first: int, last: int, limit: int) -> List[int]:
+        # The lowest catalog positions in a range of the sorted name index
+        if limit <= 0:
+            return []
+        positions = self.name_order[first:last]
+        return heapq.nsmallest(limit, positions) if limit < len(positions) else sorted(positions)
+
+
+def _required_hits(grams) -> float:
+    # One- and two-trigram words are too short to allow a typo
+    return len(grams) if len(grams) <= 2 else len(grams) * MIN_MATCH_RATIO
@@ -1,51 +1,278 @@
+import os
 import json
+import uuid
+import random
+import asyncio
 import aiofiles
-from typing import List, Optional, Dict
-from app.models import Channel
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Callable, Deque, List, Mapping, Optional, Dict, Set, Tuple
+from app.models import Channel, ChannelRefreshJob, RefreshStatus
 from app.parsers import M3U8Parser
-from app.core import settings, get_logger
+from app.parsers.fetch import SourceFetch
+from app.services.catalog import ChannelCatalog
+from app.storage import FetchStateStore, read_channel_snapshot, write_channel_snapshot
+from app.core import settings, get_logger, SingleFlight
 
 logger = get_logger(__name__)
 
+MAX_REFRESH_JOBS = 20
+UNKNOWN_SOURCE = ""
+
 
 class ChannelService:
     def __init__(self):
-        self.channels: List[Channel] = []
-        self.channels_by_id: Dict[str, Channel] = {}
+        self.catalog = ChannelCatalog(0, {})
+        self._recent_catalogs: Deque[ChannelCatalog] = deque(maxlen=max(1, settings.catalog_retained_versions))
         self.parser = M3U8Parser()
         self.cache_file = settings.channels_cache_file
+        self.snapshot_file = settings.channels_snapshot_file
+        self.fetch_state = FetchStateStore(f"{os.path.splitext(self.cache_file)[0]}.sources.json")
+        self.refresh_task: Optional[asyncio.Task] = None
+        self.refresh_jobs: "OrderedDict[str, ChannelRefreshJob]" = OrderedDict()
+        self._job_tasks: Set[asyncio.Task] = set()
+        self._active_job: Optional[ChannelRefreshJob] = None
+        self.refresh_flight = SingleFlight("channels", settings.channel_refresh_min_interval)
+        self._catalog_listeners: List[Callable[[ChannelCatalog], None]] = []
     
-    async def load_channels(self):
+    @property
+    def channels(self) -> Tuple[Channel, ...]:
+        return self.catalog.channels
+    
+    @property
+    def channels_by_id(self) -> Mapping[str, Channel]:
+        return self.catalog.channels_by_id
+    
+    @property
+    def channels_by_source(self) -> Mapping[str, Tuple[Channel, ...]]:
+        return self.catalog.channels_by_source
+    
+    def publish(
+        self,
+        channels_by_source: Dict[str, List[Channel]],
+        channels_by_id: Optional[Dict[str, Channel]] = None
+    ) -> ChannelCatalog:
+        catalog = ChannelCatalog(self.catalog.version + 1, channels_by_source, channels_by_id)
+        self._recent_catalogs.append(catalog)
+        self.catalog = catalog
+        logger.info(f"Published channel catalog version {catalog.version} ({len(catalog)} channels)")
+        self._warm_search_index(catalog)
+        for listener in self._catalog_listeners:
+            try:
+                listener(catalog)
+            except Exception as e:
+                logger.error(f"Error in catalog listener: {e}")
+        return catalog
+    
+    def add_catalog_listener(self, listener: Callable[[ChannelCatalog], None]):
+        self._catalog_listeners.append(listener)
+    
+    def _warm_search_index(self, catalog: ChannelCatalog):
         try:
-            await self._load_from_cache()
-            if not self.channels:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.run_in_executor(None, lambda: catalog.search_index)
+    
+    def get_catalog(self, version: Optional[int] = None) -> Optional[ChannelCatalog]:
+        catalog = self.catalog
+        if version is None or version == catalog.version:
+            return catalog
+        for retained in self._recent_catalogs:
+            if retained.version == version:
+                return retained
+        return None
+    
+    async def load_channels(self):
+        await self._load_from_cache()
+        await self.fetch_state.load()
+        
+        # With auto-refresh on, the cached catalog is served straight away and
+        # the scheduler revalidates it in the background.
+        if not self.channels and not settings.channel_auto_refresh_enabled:
+            try:
                 await self.refresh_channels()
+            except Exception as e:
+                logger.error(f"Error loading channels: {e}")
+    
+    async def start_auto_refresh(self):
+        if settings.channel_auto_refresh_enabled:
+            self.refresh_task = asyncio.create_task(self._auto_refresh_loop())
+            logger.info("Started channel auto-refresh")
+    
+    async def stop_auto_refresh(self):
+        if self.refresh_task:
+            self.refresh_task.cancel()
+            try:
+                await self.refresh_task
+            except asyncio.CancelledError:
+                pass
+            logger.info("Stopped channel auto-refresh")
+        await self.refresh_flight.cancel()
+    
+    async def _auto_refresh_loop(self):
+        failures = 0
+        while True:
+            try:
+                await self.refresh_channels()
+                failures = 0
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                failures += 1
+                logger.error(f"Error in channel auto-refresh (attempt {failures}): {e}")
+            
+            try:
+                await asyncio.sleep(self._next_refresh_delay(failures))
+            except asyncio.CancelledError:
+                break
+    
+    def _next_refresh_delay(self, failures: int) -> float:
+        if failures:
+            backoff = settings.channel_refresh_retry_delay * (2 ** (failures - 1))
+            return min(backoff, settings.channel_refresh_max_backoff)
+        return settings.channel_refresh_interval + random.uniform(0, settings.channel_refresh_jitter)
+    
+    def start_refresh_job(self) -> ChannelRefreshJob:
+        if self._active_job is not None and self._active_job.status == "running":
+            self.refresh_flight.coalesced_callers += 1
+            return self._active_job
+        
+        job = ChannelRefreshJob(
+            job_id=uuid.uuid4().hex[:12],
+            status="running",
+            started_at=datetime.utcnow()
+        )
+        self.refresh_jobs[job.job_id] = job
+        while len(self.refresh_jobs) > MAX_REFRESH_JOBS:
+            self.refresh_jobs.popitem(last=False)
+        
+        self._active_job = job
+        task = asyncio.create_task(self._run_refresh_job(job))
+        self._job_tasks.add(task)
+        task.add_done_callback(self._job_tasks.discard)
+        logger.info(f"Started channel refresh job {job.job_id}")
+        return job
+    
+    async def _run_refresh_job(self, job: ChannelRefreshJob):
+        try:
+            refreshed = await self.refresh_channels()
+            job.status = "succeeded" if refreshed else "skipped"
+            job.total = len(self.channels)
         except Exception as e:
-            logger.error(f"Error loading channels: {e}")
-            await self.refresh_channels()
+            logger.error(f"Channel refresh job {job.job_id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        job.finished_at = datetime.utcnow()
+    
+    def get_refresh_job(self, job_id: str) -> Optional[ChannelRefreshJob]:
+        return self.refresh_jobs.get(job_id)
     
-    async def refresh_channels(self):
+    async def refresh_channels(self) -> bool:
+        return await self.refresh_flight.run(self._refresh_channels)
+    
+    def get_refresh_status(self) -> RefreshStatus:
+        return self.refresh_flight.status()
+    
+    async def _refresh_channels(self):
         logger.info("Refreshing channels from M3U8 sources")
-        all_channels = []
+        sources = list(settings.m3u8_sources)
+        semaphore = asyncio.Semaphore(max(1, settings.m3u8_fetch_concurrency))
+        fetches = []
+        for source in sources:
+            previous_state = self.fetch_state.get(source) if source in self.channels_by_source else None
+            fetches.append(SourceFetch(source, previous_state))
+        
+        results = await asyncio.gather(*(self._fetch_source(fetch, semaphore) for fetch in fetches))
+        
+        channels_by_source = {}
+        channels_by_id = {}
+        changed = set(sources) != set(self.channels_by_source)
+        
+        for fetch, (source_channels, source_index) in zip(fetches, results):
+            source = fetch.source
+            if fetch.unchanged:
+                source_channels = self.channels_by_source[source]
+                logger.info(f"Source unchanged, reusing {len(source_channels)} channels: {source}")
+                source_index = {ch.id: ch for ch in source_channels}
+            elif not fetch.completed:
+                # A failed or cut-off stream may have yielded some channels
+                # already; never publish a truncated source, keep the last good one
+                source_channels = self.channels_by_source.get(source, [])
+                logger.warning(f"Fetch incomplete, keeping {len(source_channels)} previous channels: {source}")
+                source_index = {ch.id: ch for ch in source_channels}
+            else:
+                changed = True
+            
+            if fetch.completed:
+                self.fetch_state.set(source, fetch.state)
+            else:
+                self.fetch_state.discard(source)
+            channels_by_source[source] = source_channels
+            channels_by_id.update(source_index)
+        
+        if sources and not any(fetch.completed for fetch in fetches):
+            # Keep serving the stale catalog rather than swapping in nothing
+            raise RuntimeError("All M3U8 sources failed, keeping the current catalog")
         
-        for source in settings.m3u8_sources:
-            logger.info(f"Fetching channels from: {source}")
-            channels = await self.parser.fetch_and_parse(source)
-            all_channels.extend(channels)
+        for source in list(self.fetch_state.states):
+            if source not in channels_by_source:
+                self.fetch_state.discard(source)
         
-        self.channels = all_channels
-        self.channels_by_id = {ch.id: ch for ch in all_channels}
+        if changed:
+            self.publish(channels_by_source, channels_by_id)
+            await self._save_to_cache()
         
-        await self._save_to_cache()
+        await self.fetch_state.save()
         logger.info(f"Loaded {len(self.channels)} channels")
     
+    async def _fetch_source(self, fetch: SourceFetch, semaphore: asyncio.Semaphore) -> Tuple[List[Channel], Dict[str, Channel]]:
+        source_channels = []
+        source_index = {}
+        
+        async def consume():
+            async for channel in self.parser.stream_channels(fetch.source, fetch):
+                source_channels.append(channel)
+                source_index[channel.id] = channel
+        
+        async with semaphore:
+            logger.info(f"Fetching channels from: {fetch.source}")
+            try:
+                await asyncio.wait_for(consume(), timeout=settings.m3u8_source_timeout)
+            except asyncio.TimeoutError:
+                # Whatever streamed in before the timeout is a partial list
+                logger.error(f"Timed out after {settings.m3u8_source_timeout}s fetching {fetch.source}")
+                return [], {}
+        
+        return source_channels, source_index
+    
     async def _load_from_cache(self):
+        loop = asyncio.get_running_loop()
+        try:
+            channels_by_source = await loop.run_in_executor(None, read_channel_snapshot, self.snapshot_file)
+            self.publish(channels_by_source)
+            logger.info(f"Loaded {len(self.channels)} channels from snapshot")
+            return
+        except FileNotFoundError:
+            logger.info("No channel snapshot found, trying JSON cache")
+        except Exception as e:
+            logger.error(f"Error loading channel snapshot: {e}")
+        
+        await self._load_from_json_cache()
+    
+    async def _load_from_json_cache(self):
         try:
             async with aiofiles.open(self.cache_file, 'r') as f:
                 content = await f.read()
                 data = json.loads(content)
-                self.channels = [Channel(**ch) for ch in data]
-                self.channels_by_id = {ch.id: ch for ch in self.channels}
+                if isinstance(data, list):
+                    # Old caches did not record sources; the next refresh refetches all
+                    self.publish({UNKNOWN_SOURCE: [Channel.from_trusted(ch) for ch in data]})
+                else:
+                    self.publish({
+                        source: [Channel.from_trusted(ch) for ch in channels]
+                        for source, channels in data.get('sources', {}).items()
+                    })
                 logger.info(f"Loaded {len(self.channels)} channels from cache")
         except FileNotFoundError:
             logger.info("No cache file found")
@@ -54,41 +281,59 @@ class ChannelService:
     
     async def _save_to_cache(self):
         try:
-            data = [ch.model_dump() for ch in self.channels]
-            async with aiofiles.open(self.cache_file, 'w') as f:
-                await f.write(json.dumps(data, indent=2, default=str))
-            logger.info("Saved channels to cache")
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, write_channel_snapshot, self.snapshot_file, self.catalog.channels_by_source)
+            logger.info("Saved channel snapshot")
         except Exception as e:
             logger.error(f"Error saving to cache: {e}")
     
-    def get_all_channels(self, page: int = 1, page_size: int = 50) -> tuple[List[Channel], int]:
-        start = (page - 1) * page_size
-        end = start + page_size
-        return self.channels[start:end], len(self.channels)
+    def get_all_channels(
+        self,
+        page: int = 1,
+        page_size: int = 50,
+        catalog: Optional[ChannelCatalog] = None
+    ) -> Tuple[List[Channel], int]:
+        return (catalog or self.catalog).page(page, page_size)
     
     def get_channel_by_id(self, channel_id: str) -> Optional[Channel]:
-        return self.channels_by_id.get(channel_id)
-    
-    def search_channels(self, query: str) -> List[Channel]:
-        query_lower = query.lower()
-        return [
-            ch for ch in self.channels
-            if query_lower in ch.name.lower() or
-               (ch.group and query_lower in ch.group.lower())
-        ]
-    
-    def get_channels_by_group(self, group: str) -> List[Channel]:
-        return [ch for ch in self.channels if ch.group and ch.group.lower() == group.lower()]
-    
-    def get_all_groups(self) -> List[str]:
-        groups = set()
-        for ch in self.channels:
-            if ch.group:
-                groups.add(ch.group)
-        return sorted(list(groups))
-    
-    def get_astro_channels(self) -> List[Channel]:
-        return [ch for ch in self.channels if ch.is_astro]
+        return self.catalog.channels_by_id.get(channel_id)
+    
+    def search_channels(self, query: str, catalog: Optional[ChannelCatalog] = None) -> List[Channel]:
+        catalog = catalog or self.catalog
+        channels, _, _ = catalog.search(query, 1, max(1, len(catalog)))
+        return channels
+    
+    def search_channels_page(
+        self,
+        query: str,
+        page: int = 1,
+        page_size: int = 50,
+        catalog: Optional[ChannelCatalog] = None
+    ) -> Tuple[List[Channel], int, bool]:
+        return (catalog or self.catalog).search(query, page, page_size)
+    
+    def get_channels_by_group(self, group: str, catalog: Optional[ChannelCatalog] = None) -> List[Channel]:
+        catalog = catalog or self.catalog
+        return catalog.select(catalog.filter_positions(group=group))
+    
+    def filter_channels(
+        self,
+        page: int = 1,
+        page_size: int = 50,
+        catalog: Optional[ChannelCatalog] = None,
+        **criteria
+    ) -> Tuple[List[Channel], int]:
+        return (catalog or self.catalog).filter(page, page_size, **criteria)
+    
+    def get_all_groups(self, catalog: Optional[ChannelCatalog] = None) -> List[str]:
+        return list((catalog or self.catalog).groups)
+    
+    def get_group_count(self) -> int:
+        return len(self.catalog.groups)
+    
+    def get_astro_channels(self, catalog: Optional[ChannelCatalog] = None) -> List[Channel]:
+        catalog = catalog or self.catalog
+        return catalog.select(catalog.filter_positions(astro=True))
     
     def validate_stream_url(self, url: str) -> bool:
         return url.startswith('http://') or url.startswith('https://')
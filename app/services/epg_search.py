@@ -0,0 +1,302 @@
+import re
+import heapq
+from array import array
+from bisect import bisect_left
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+from app.models import EPGProgram
+from app.parsers.epg_schedule import ChannelSchedule
+from app.storage.binary import NO_STRING
+from app.services.channel_search import normalize_text
+
+_TOKEN_RE = re.compile(r"\w+")
+_QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+# Score of a query term by the best field it matched in
+TITLE_WEIGHT = 3.0
+CATEGORY_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+EXACT_TITLE_BONUS = 2.0
+
+EMPTY_POSTINGS = array("I")
+
+# Matches are counted exactly up to this many; past it the search stops and
+# reports the count so far as a lower bound
+MAX_COUNTED_HITS = 1000
+
+
+def tokenize(text: Optional[str]) -> Tuple[str, ...]:
+    if not text:
+        return ()
+    return tuple(_TOKEN_RE.findall(normalize_text(text)))
+
+
+class QueryTerm:
+    # One AND-ed part of a query: a word, a `prefix*` or a "quoted phrase"
+    __slots__ = ("tokens", "prefix")
+    
+    def __init__(self, tokens: Tuple[str, ...], prefix: bool = False):
+        self.tokens = tokens
+        self.prefix = prefix
+    
+    def weight(self, title: Tuple[str, ...], category: Tuple[str, ...], description: Tuple[str, ...]) -> float:
+        if self._matches(title):
+            return TITLE_WEIGHT
+        if self._matches(category):
+            return CATEGORY_WEIGHT
+        if self._matches(description):
+            return DESCRIPTION_WEIGHT
+        return 0.0
+    
+    def _matches(self, field: Tuple[str, ...]) -> bool:
+        if self.prefix:
+            prefix = self.tokens[0]
+            return any(token.startswith(prefix) for token in field)
+        tokens = self.tokens
+        if len(tokens) == 1:
+            return tokens[0] in field
+        width = len(tokens)
+        first = tokens[0]
+        return any(
+            field[i] == first and field[i:i + width] == tokens
+            for i in range(len(field) - width + 1)
+        )
+
+
+def parse_query(query: str) -> List[QueryTerm]:
+    terms = []
+    for phrase, word in _QUERY_RE.findall(query):
+        if phrase:
+            tokens = tokenize(phrase)
+            if tokens:
+                terms.append(QueryTerm(tokens))
+            continue
+        tokens = tokenize(word)
+        if tokens:
+            # A word such as "ch-4" tokenizes to, and is matched as, a phrase
+            terms.append(QueryTerm(tokens, prefix=word.endswith("*") and len(tokens) == 1))
+    return terms
+
+
+class EPGSearchIndex:
+    # Word-level inverted index over one guide's programmes. Document ids
+    # follow start time across the whole guide, so postings are walked in the
+    # order equal scores are ranked in, and a time window is a bisect. Postings
+    # only record which documents contain a token, with a second set for title
+    # tokens; phrase, prefix and field scoring are checked against the token
+    # tuples of the documents walked.
+    def __init__(self, guide: Mapping[str, ChannelSchedule]):
+        self.guide = guide
+        self.schedules: List[ChannelSchedule] = [guide[channel_id] for channel_id in sorted(guide)]
+        self.channel_positions: Dict[str, int] = {}
+        self.tokens: Dict[str, Tuple[str, ...]] = {}
+        self.postings: Dict[str, array] = {}
+        self.title_postings: Dict[str, array] = {}
+        
+        positions = array("I")
+        rows = array("I")
+        starts = array("q")
+        ends = array("q")
+        for position, schedule in enumerate(self.schedules):
+            self.channel_positions[schedule.channel_id] = position
+            positions.extend([position] * len(schedule))
+            rows.extend(range(len(schedule)))
+            starts.extend(schedule.starts)
+            ends.extend(schedule.ends)
+        # Stable, so programmes starting together stay in channel order
+        order = sorted(range(len(starts)), key=starts.__getitem__)
+        self.doc_schedules = array("I", [positions[i] for i in order])
+        self.doc_rows = array("I", [rows[i] for i in order])
+        self.starts = array("q", [starts[i] for i in order])
+        self.ends = array("q", [ends[i] for i in order])
+        self.max_duration = max((end - start for start, end in zip(starts, ends)), default=0)
+        self.channel_docs: List[array] = [array("I") for _ in self.schedules]
+        
+        # Repeats of a programme share one pair of token sets
+        token_sets: Dict[Tuple[str, str, str], Tuple[Set[str], Set[str]]] = {}
+        for doc, (position, row) in enumerate(zip(self.doc_schedules, self.doc_rows)):
+            schedule = self.schedules[position]
+            strings = schedule.strings
+            fields = (
+                self._text(strings, schedule.titles[row]),
+                self._text(strings, schedule.descriptions[row]),
+                self._text(strings, schedule.categories[row])
+            )
+            entry = token_sets.get(fields)
+            if entry is None:
+                title_tokens = set(self._tokens(fields[0]))
+                entry = token_sets[fields] = (
+                    title_tokens, title_tokens.union(self._tokens(fields[1]), self._tokens(fields[2]))
+                )
+            title_tokens, tokens = entry
+            for token in tokens:
+                entries = self.postings.get(token)
+                if entries is None:
+                    entries = self.postings[token] = array("I")
+                entries.append(doc)
+            for token in title_tokens:
+                entries = self.title_postings.get(token)
+                if entries is None:
+                    entries = self.title_postings[token] = array("I")
+                entries.append(doc)
+            self.channel_docs[position].append(doc)
+        
+        self.size = len(order)
+        self.vocabulary = sorted(self.postings)
+    
+    @staticmethod
+    def _text(strings: List[str], index: int) -> str:
+        return strings[index] if index != NO_STRING else ""
+    
+    def _tokens(self, text: str) -> Tuple[str, ...]:
+        tokens = self.tokens.get(text)
+        if tokens is None:
+            tokens = self.tokens[text] = tokenize(text)
+        return tokens
+    
+    def _prefix_tokens(self, prefix: str) -> List[str]:
+        vocabulary = self.vocabulary
+        index = bisect_left(vocabulary, prefix)
+        matches = []
+        while index < len(vocabulary) and vocabulary[index].startswith(prefix):
+            matches.append(vocabulary[index])
+            index += 1
+        return matches
+    
+    def _term_cost(self, term: QueryTerm) -> int:
+        if term.prefix:
+            return sum(len(self.postings[token]) for token in self._prefix_tokens(term.tokens[0]))
+        return min(len(self.postings.get(token, EMPTY_POSTINGS)) for token in term.tokens)
+    
+    def _term_postings(self, term: QueryTerm, postings: Dict[str, array]) -> List[array]:
+        # Posting lists whose union holds every document matching the term;
+        # phrases are verified when scored
+        if term.prefix:
+            return [postings[token] for token in self._prefix_tokens(term.tokens[0]) if token in postings]
+        rarest = min(term.tokens, key=lambda token: len(self.postings.get(token, EMPTY_POSTINGS)))
+        return [postings.get(rarest, EMPTY_POSTINGS)]
+    
+    @staticmethod
+    def _walk(lists: List[array], first_doc: int) -> Iterator[int]:
+        # Documents from first_doc on, in id order, each once
+        lists = [islice(entries, bisect_left(entries, first_doc), None) for entries in lists]
+        if len(lists) == 1:
+            yield from lists[0]
+            return
+        last = None
+        for doc in heapq.merge(*lists):
+            if doc != last:
+                last = doc
+                yield doc
+    
+    def _score(
+        self,
+        schedule: ChannelSchedule,
+        row: int,
+        terms: List[QueryTerm],
+        phrase: Tuple[str, ...],
+        category_tokens: Optional[Tuple[str, ...]]
+    ) -> float:
+        # 0.0 when the programme misses a term or the category filter
+        strings = schedule.strings
+        categories = self._tokens(self._text(strings, schedule.categories[row]))
+        if category_tokens is not None and categories != category_tokens:
+            return 0.0
+        title = self._tokens(self._text(strings, schedule.titles[row]))
+        description = self._tokens(self._text(strings, schedule.descriptions[row]))
+        score = 0.0
+        for term in terms:
+            weight = term.weight(title, categories, description)
+            if not weight:
+                return 0.0
+            score += weight
+        if title == phrase:
+            score += EXACT_TITLE_BONUS
+        return score
+    
+    def search(
+        self,
+        query: str,
+        offset: int = 0,
+        limit: int = 50,
+        channel_ids: Optional[Iterable[str]] = None,
+        category: Optional[str] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None
+    ) -> Tuple[List[EPGProgram], int, bool]:
+        # Returns one page of programmes, the match count and whether that
+        # count is exact
+        terms = parse_query(query)
+        if not terms:
+            return [], 0, True
+        # The exact-title bonus compares against the query as typed, so the
+        # phrase is taken before terms are reordered by rarity
+        phrase = tuple(token for term in terms for token in term.tokens)
+        terms.sort(key=self._term_cost)
+        
+        positions = None
+        if channel_ids is not None:
+            positions = {
+                self.channel_positions[channel_id] for channel_id in channel_ids
+                if channel_id in self.channel_positions
+            }
+        
+        # Documents come from the rarest term, those with it in the title
+        # first, or straight from the filtered channels when those are smaller
+        if positions is not None and sum(len(self.channel_docs[p]) for p in positions) <= self._term_cost(terms[0]):
+            sources = [[self.channel_docs[p] for p in positions]]
+            positions = None
+        else:
+            sources = [self._term_postings(terms[0], self.title_postings), self._term_postings(terms[0], self.postings)]
+        
+        # Nothing starting more than the longest programme before `start`
+        # can still be on at `start`
+        first_doc = bisect_left(self.starts, start - self.max_duration) if start is not None else 0
+        category_tokens = tokenize(category) if category else None
+        # Repeats of a programme score the same, so scores are memoized by
+        # string table and text indexes
+        scores: Dict[Tuple[int, int, int, int], float] = {}
+        schedules = self.schedules
+        doc_schedules = self.doc_schedules
+        doc_rows = self.doc_rows
+        starts = self.starts
+        ends = self.ends
+        # The walk stops after a bounded number of matches
+        budget = max(MAX_COUNTED_HITS, offset + limit + 1)
+        total_exact = True
+        seen: Set[int] = set()
+        scored = []
+        for lists in sources:
+            for doc in self._walk(lists, first_doc):
+                if end is not None and starts[doc] >= end:
+                    break
+                if doc in seen:
+                    continue
+                seen.add(doc)
+                if start is not None and ends[doc] <= start:
+                    continue
+                position = doc_schedules[doc]
+                if positions is not None and position not in positions:
+                    continue
+                schedule = schedules[position]
+                row = doc_rows[doc]
+                key = (id(schedule.strings), schedule.titles[row], schedule.categories[row], schedule.descriptions[row])
+                score = scores.get(key)
+                if score is None:
+                    score = scores[key] = self._score(schedule, row, terms, phrase, category_tokens)
+                if score:
+                    # Document ids follow start time, so they break ties
+                    scored.append((-score, doc))
+                    if len(scored) >= budget:
+                        total_exact = False
+                        break
+            if not total_exact:
+                break
+        
+        wanted = offset + limit
+        top = heapq.nsmallest(wanted, scored) if wanted < len(scored) else sorted(scored)
+        programs = []
+        for _, doc in top[offset:wanted]:
+            schedule = schedules[doc_schedules[doc]]
+            programs.append(schedule[doc_rows[doc]])
+        return programs, len(scored), total_exact
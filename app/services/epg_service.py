@@ -1,9 +1,26 @@
+import time
 import asyncio
-from typing import List, Optional, Dict
+import threading
 from datetime import datetime
-from app.models import EPGProgram, EPGChannelPrograms
+from typing import List, Optional, Dict, Tuple
+from app.models import (
+    Channel,
+    EPGProgram,
+    EPGChannelPrograms,
+    EPGGridChannel,
+    RefreshStatus,
+    EPGSourceStatus
+)
 from app.parsers import EPGParser
-from app.core import settings, get_logger
+from app.parsers.epg_parser import as_utc
+from app.parsers.epg_ids import EPGIdFilter
+from app.parsers.epg_schedule import ChannelSchedule, GuideMerger
+from app.parsers.fetch import FetchTimings
+from app.services.catalog import ChannelCatalog
+from app.services.epg_search import EPGSearchIndex
+from app.services.now_next import NowNextTable
+from app.storage import read_epg_snapshot, write_epg_snapshot
+from app.core import settings, get_logger, SingleFlight, CircuitBreaker
 
 logger = get_logger(__name__)
 
@@ -13,18 +30,65 @@ class EPGService:
         self.parser = EPGParser()
         self.refresh_task: Optional[asyncio.Task] = None
         self.epg_urls: List[str] = []
+        self._refreshed_urls: List[str] = []
+        self.source_data: Dict[str, Dict[str, ChannelSchedule]] = {}
+        self.source_fetched_at: Dict[str, float] = {}
+        self.merger = GuideMerger()
+        self.snapshot_file = settings.epg_snapshot_file
+        self.refresh_flight = SingleFlight("epg", settings.epg_refresh_min_interval)
+        self._refilter_task: Optional[asyncio.Task] = None
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.source_status: Dict[str, EPGSourceStatus] = {}
+        self._search_index: Optional[EPGSearchIndex] = None
+        self._search_lock = threading.Lock()
+        self.catalog: Optional[ChannelCatalog] = None
+        self.now_next = NowNextTable()
     
     def add_epg_url(self, url: str):
         if url not in self.epg_urls:
             self.epg_urls.append(url)
             logger.info(f"Added EPG URL: {url}")
     
+    def _breaker(self, url: str) -> CircuitBreaker:
+        breaker = self.breakers.get(url)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                url,
+                failure_threshold=settings.epg_breaker_failure_threshold,
+                reset_timeout=settings.epg_breaker_reset_timeout,
+                max_timeout=settings.epg_breaker_max_timeout
+            )
+            self.breakers[url] = breaker
+        return breaker
+    
+    def _status(self, url: str) -> EPGSourceStatus:
+        status = self.source_status.get(url)
+        if status is None:
+            status = EPGSourceStatus(url=url, priority=0)
+            self.source_status[url] = status
+        return status
+    
+    def get_source_statuses(self) -> List[EPGSourceStatus]:
+        statuses = []
+        for priority, url in enumerate(self.epg_urls):
+            status = self._status(url)
+            breaker = self._breaker(url)
+            status.priority = priority
+            status.state = breaker.state
+            status.consecutive_failures = breaker.consecutive_failures
+            status.trips = breaker.trips
+            status.retry_in = breaker.retry_in
+            statuses.append(status)
+        return statuses
+    
     async def start_auto_refresh(self):
         if settings.epg_cache_enabled:
             self.refresh_task = asyncio.create_task(self._auto_refresh_loop())
             logger.info("Started EPG auto-refresh")
     
     async def stop_auto_refresh(self):
+        if self._refilter_task and not self._refilter_task.done():
+            self._refilter_task.cancel()
         if self.refresh_task:
             self.refresh_task.cancel()
             try:
@@ -32,8 +96,110 @@ class EPGService:
             except asyncio.CancelledError:
                 pass
             logger.info("Stopped EPG auto-refresh")
+        await self.refresh_flight.cancel()
+    
+    def on_catalog_published(self, catalog: ChannelCatalog):
+        self.catalog = catalog
+        if not self._apply_catalog_filter(catalog):
+            self._rebuild_now_next()
+    
+    def _apply_catalog_filter(self, catalog: ChannelCatalog) -> bool:
+        # Returns whether the served guide was re-merged
+        if not settings.epg_filter_to_catalog:
+            return False
+        ids = set()
+        for channel in catalog.channels:
+            ids.add(channel.epg_id or channel.id)
+            if channel.tvg_id:
+                ids.add(channel.tvg_id)
+        
+        previous = self.parser.id_filter
+        id_filter = EPGIdFilter(ids, self.parser.id_matcher) if ids else None
+        if (previous.keys if previous else None) == (id_filter.keys if id_filter else None):
+            return False
+        
+        self.parser.id_filter = id_filter
+        logger.info(f"EPG ingestion filtered to {len(id_filter) if id_filter else 'all'} catalog ids")
+        
+        if id_filter is not None:
+            # Channels that left the catalog are dropped without refetching
+            self._drop_unreferenced()
+            self.apply_retention()
+        
+        # Ids the previous filter skipped can only come from a new fetch
+        gained = previous is not None and (id_filter is None or not id_filter.keys <= previous.keys)
+        if gained and self.epg_urls and (self._refilter_task is None or self._refilter_task.done()):
+            self._refilter_task = asyncio.create_task(self._refilter_refresh())
+        return id_filter is not None
+    
+    def _drop_unreferenced(self):
+        id_filter = self.parser.id_filter
+        if id_filter is None:
+            return
+        for url, guide in self.source_data.items():
+            self.source_data[url] = {
+                channel_id: schedule for channel_id, schedule in guide.items() if channel_id in id_filter
+            }
+    
+    async def _refilter_refresh(self):
+        try:
+            if self.refresh_flight.running:
+                # The refresh in flight started with the previous filter
+                await self.refresh_flight.run(self._refresh_epg)
+            await self.refresh_flight.run(self._refresh_epg, force=True)
+        except Exception as e:
+            logger.error(f"Error refreshing EPG after catalog change: {e}")
+    
+    async def load_snapshot(self):
+        if not settings.epg_cache_enabled:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+            strings, sources = await loop.run_in_executor(None, read_epg_snapshot, self.snapshot_file)
+            for url, (fetched_at, columns_by_channel) in sources.items():
+                self.add_epg_url(url)
+                self.source_fetched_at[url] = fetched_at
+                self.source_data[url] = {
+                    channel_id: ChannelSchedule.from_columns(channel_id, strings, *columns)
+                    for channel_id, columns in columns_by_channel.items()
+                }
+            self._drop_unreferenced()
+            self.apply_retention()
+            logger.info(f"Loaded EPG snapshot for {len(self.parser.epg_data)} channels from {len(sources)} sources")
+        except FileNotFoundError:
+            logger.info("No EPG snapshot found")
+        except Exception as e:
+            logger.error(f"Error loading EPG snapshot: {e}")
+    
+    async def _save_snapshot(self):
+        try:
+            sources = {
+                url: (self.source_fetched_at.get(url, 0.0), self.source_data[url])
+                for url in self.epg_urls if url in self.source_data
+            }
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, write_epg_snapshot, self.snapshot_file, sources)
+            logger.info("Saved EPG snapshot")
+        except Exception as e:
+            logger.error(f"Error saving EPG snapshot: {e}")
+    
+    def _initial_refresh_delay(self) -> float:
+        # A restart shortly after a refresh serves the snapshot and waits for
+        # the stalest source to come due instead of refetching everything
+        if not self.epg_urls or any(url not in self.source_fetched_at for url in self.epg_urls):
+            return 0.0
+        age = time.time() - min(self.source_fetched_at[url] for url in self.epg_urls)
+        return max(0.0, settings.epg_refresh_interval - age)
     
     async def _auto_refresh_loop(self):
+        try:
+            delay = self._initial_refresh_delay()
+            if delay > 0:
+                logger.info(f"EPG snapshot is fresh, next refresh in {delay:.0f}s")
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            return
+        
         while True:
             try:
                 await self.refresh_epg()
@@ -44,22 +210,99 @@ class EPGService:
                 logger.error(f"Error in EPG auto-refresh: {e}")
                 await asyncio.sleep(60)
     
-    async def refresh_epg(self):
+    async def refresh_epg(self) -> bool:
+        refreshed = await self.refresh_flight.run(self._refresh_epg)
+        if self.epg_urls != self._refreshed_urls:
+            # Sources added since the last run have never been fetched, so the
+            # min-interval does not apply to them
+            refreshed = await self.refresh_flight.run(self._refresh_epg, force=True)
+        return refreshed
+    
+    def get_refresh_status(self) -> RefreshStatus:
+        return self.refresh_flight.status()
+    
+    async def _refresh_epg(self):
         logger.info("Refreshing EPG data")
-        all_epg_data = {}
         
-        for url in self.epg_urls:
-            try:
-                epg_data = await self.parser.fetch_and_parse(url)
-                all_epg_data.update(epg_data)
-            except Exception as e:
-                logger.error(f"Error fetching EPG from {url}: {e}")
+        # Sources are fetched concurrently; the merge below still applies
+        # them in priority order, so completion order does not matter
+        urls = self._refreshed_urls = list(self.epg_urls)
+        semaphore = asyncio.Semaphore(max(1, settings.epg_fetch_concurrency))
+        results = await asyncio.gather(*(self._fetch_source(url, semaphore) for url in urls))
+        refreshed = any(results)
+        
+        self.apply_retention()
+        logger.info(f"Refreshed EPG data for {len(self.parser.epg_data)} channels")
+        
+        if refreshed and settings.epg_cache_enabled:
+            await self._save_snapshot()
+    
+    async def _fetch_source(self, url: str, semaphore: asyncio.Semaphore) -> bool:
+        breaker = self._breaker(url)
+        status = self._status(url)
+        if not breaker.allow():
+            status.skipped += 1
+            logger.info(f"Skipping EPG source {url}, circuit open for {breaker.retry_in:.0f}s")
+            return False
+        
+        timings = FetchTimings()
+        try:
+            async with semaphore:
+                epg_data = await asyncio.wait_for(
+                    self.parser.fetch_guide(url, timings),
+                    timeout=settings.epg_source_timeout
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            if isinstance(e, asyncio.TimeoutError):
+                error = f"Timed out after {settings.epg_source_timeout:g}s"
+            logger.error(f"Error fetching EPG from {url}: {error}")
+            breaker.record_failure()
+            status.last_failure_at = datetime.utcnow()
+            status.last_error = error
+            status.fetch_seconds = timings.fetch_seconds
+            status.parse_seconds = timings.parse_seconds
+            return False
         
-        self.parser.update_epg_data(all_epg_data)
-        logger.info(f"Refreshed EPG data for {len(all_epg_data)} channels")
+        # An empty guide is a healthy source with nothing to offer right now
+        breaker.record_success()
+        status.last_success_at = datetime.utcnow()
+        status.last_error = None
+        status.fetch_seconds = timings.fetch_seconds
+        status.parse_seconds = timings.parse_seconds
+        if not epg_data:
+            logger.warning(f"No EPG data from {url}, keeping the previous guide for this source")
+            return False
+        
+        self.source_data[url] = self.merger.absorb(self.source_data.get(url), epg_data)
+        self.source_fetched_at[url] = time.time()
+        status.channels = len(epg_data)
+        status.programmes = sum(len(schedule) for schedule in epg_data.values())
+        return True
+    
+    def apply_retention(self):
+        # Re-merges the per-source guides in priority order (the order the
+        # sources were added) and drops programmes outside the retention window
+        now = int(as_utc().timestamp())
+        guides = [self.source_data[url] for url in self.epg_urls if url in self.source_data]
+        merged = self.merger.merge(
+            guides,
+            self.parser.epg_data,
+            now - settings.epg_retention_past,
+            now + settings.epg_retention_future
+        )
+        self.parser.update_epg_data(merged)
+        self._warm_search_index()
+        self._rebuild_now_next()
+    
+    def _rebuild_now_next(self):
+        channels = self.catalog.channels if self.catalog is not None else ()
+        self.now_next.rebuild(channels, self.parser.get_schedule)
     
     def get_channel_programs(self, channel_id: str, channel_name: str = None) -> EPGChannelPrograms:
-        now = datetime.utcnow()
+        now = as_utc()
         current = self.parser.get_current_program(channel_id, now)
         upcoming = self.parser.get_upcoming_programs(channel_id, limit=10, now=now)
         
@@ -72,21 +315,74 @@ class EPGService:
     
     def get_all_programs(self, channel_id: Optional[str] = None) -> List[EPGProgram]:
         if channel_id:
-            return self.parser.epg_data.get(channel_id, [])
+            return list(self.parser.get_schedule(channel_id) or ())
         
         all_programs = []
         for programs in self.parser.epg_data.values():
             all_programs.extend(programs)
         return all_programs
     
-    def search_programs(self, query: str) -> List[EPGProgram]:
-        query_lower = query.lower()
-        all_programs = self.get_all_programs()
-        return [
-            p for p in all_programs
-            if query_lower in p.title.lower() or
-               (p.description and query_lower in p.description.lower())
-        ]
+    def get_grid(self, channels: List[Channel], start: datetime, end: datetime) -> List[EPGGridChannel]:
+        # One bisected slice per channel, so the cost follows the window
+        # rather than the size of the guide
+        start_epoch = int(as_utc(start).timestamp())
+        end_epoch = int(as_utc(end).timestamp())
+        grid = []
+        for channel in channels:
+            schedule = self.parser.get_schedule(channel.epg_id or channel.id)
+            grid.append(EPGGridChannel(
+                channel_id=channel.id,
+                channel_name=channel.name,
+                logo=channel.logo,
+                programs=schedule.between(start_epoch, end_epoch) if schedule is not None else []
+            ))
+        return grid
+    
+    @property
+    def search_index(self) -> EPGSearchIndex:
+        # Rebuilt whenever the served guide is replaced; the build is normally
+        # warmed in a worker thread right after each refresh
+        guide = self.parser.epg_data
+        index = self._search_index
+        if index is None or index.guide is not guide:
+            with self._search_lock:
+                index = self._search_index
+                if index is None or index.guide is not guide:
+                    index = EPGSearchIndex(guide)
+                    self._search_index = index
+        return index
+    
+    def _warm_search_index(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.run_in_executor(None, lambda: self.search_index)
+    
+    def search_programs(
+        self,
+        query: str,
+        page: int = 1,
+        page_size: int = 50,
+        channel_id: Optional[str] = None,
+        category: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Tuple[List[EPGProgram], int, bool]:
+        channel_ids = None
+        if channel_id:
+            schedule = self.parser.get_schedule(channel_id)
+            channel_ids = [schedule.channel_id] if schedule is not None else []
+        
+        return self.search_index.search(
+            query,
+            offset=(page - 1) * page_size,
+            limit=page_size,
+            channel_ids=channel_ids,
+            category=category,
+            start=int(as_utc(start).timestamp()) if start else None,
+            end=int(as_utc(end).timestamp()) if end else None
+        )
 
 
 epg_service = EPGService()
@@ -0,0 +1,99 @@
+import json
+import asyncio
+from typing import List, Optional, Set
+from app.services.catalog import ChannelCatalog
+from app.services.now_next import NowNextTable
+from app.core import settings, get_logger
+
+logger = get_logger(__name__)
+
+# Sent in place of the backlog of a subscriber that fell behind; the client
+# refetches the state it cares about instead of replaying missed events
+RESYNC_MESSAGE = b"event: resync\ndata: {}\n\n"
+KEEPALIVE_MESSAGE = b": keepalive\n\n"
+
+
+class EventSubscription:
+    __slots__ = ("queue", "lagged")
+    
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.lagged = 0
+    
+    def offer(self, message: bytes):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow consumer: its backlog is replaced by one resync event, so
+            # memory per subscriber stays bounded by the queue size
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_MESSAGE)
+            self.lagged += 1
+
+
+class EventBroadcaster:
+    # Server-Sent Events fan-out. Each event is encoded to its wire format
+    # once and the same bytes are queued for every subscriber.
+    def __init__(self):
+        self.subscribers: Set[EventSubscription] = set()
+        self.sequence = 0
+        self.catalog_version = 0
+        self.now_next_version = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    @property
+    def full(self) -> bool:
+        return len(self.subscribers) >= settings.sse_max_subscribers
+    
+    def subscribe(self) -> EventSubscription:
+        self._loop = asyncio.get_running_loop()
+        subscription = EventSubscription(max(1, settings.sse_queue_size))
+        self.subscribers.add(subscription)
+        logger.debug(f"Event subscriber added ({len(self.subscribers)} connected)")
+        return subscription
+    
+    def unsubscribe(self, subscription: EventSubscription):
+        self.subscribers.discard(subscription)
+        if subscription.lagged:
+            logger.info(f"Event subscriber left after falling behind {subscription.lagged} times")
+    
+    def hello(self) -> bytes:
+        data = json.dumps({"catalog_version": self.catalog_version, "now_next_version": self.now_next_version})
+        return f"retry: 5000\nevent: hello\ndata: {data}\n\n".encode()
+    
+    def publish(self, event: str, data: bytes):
+        if not self.subscribers:
+            return
+        self.sequence += 1
+        message = b"id: %d\nevent: %s\ndata: %s\n\n" % (self.sequence, event.encode(), data)
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._fan_out(message)
+        elif self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._fan_out, message)
+    
+    def _fan_out(self, message: bytes):
+        for subscription in list(self.subscribers):
+            subscription.offer(message)
+    
+    def on_catalog_published(self, catalog: ChannelCatalog):
+        self.catalog_version = catalog.version
+        self.publish("catalog", json.dumps({"version": catalog.version, "total": len(catalog)}).encode())
+    
+    def on_now_next_changed(self, table: NowNextTable, changed: Optional[List[str]]):
+        self.now_next_version = table.version
+        if changed is None:
+            # Full rebuild: clients refetch /api/epg/now-next
+            self.publish("now-next-reset", json.dumps({"version": table.version}).encode())
+        else:
+            self.publish(
+                "now-next",
+                b'{"version":%d,"channels":%s}' % (table.version, table.encode_entries(changed))
+            )
+
+
+event_broadcaster = EventBroadcaster()
@@ -0,0 +1,161 @@
+import json
+import time
+import zlib
+import heapq
+import asyncio
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from app.models import Channel, NowNext
+from app.parsers.epg_schedule import ChannelSchedule
+from app.core import get_logger
+
+logger = get_logger(__name__)
+
+ScheduleLookup = Callable[[str], Optional[ChannelSchedule]]
+
+# Called with the table and the changed channel ids, or None after a rebuild
+NowNextListener = Callable[["NowNextTable", Optional[List[str]]], None]
+
+
+class NowNextTable:
+    # Current and next programme for every catalog channel, kept as a dict
+    # plus a pre-serialised JSON payload of the whole table. A min-heap of
+    # programme boundaries acts as the timer: the loop sleeps until the
+    # earliest boundary and only recomputes the channels whose programme
+    # changed at it.
+    def __init__(self):
+        self.entries: Dict[str, NowNext] = {}
+        self.payload = b'{"channels":[],"total":0,"updated_at":null,"next_change":null}'
+        self.version = 0
+        self.etag = '"0"'
+        self._channels: Dict[str, Channel] = {}
+        self._order: List[str] = []
+        self._encoded: Dict[str, bytes] = {}
+        self._boundaries: List[Tuple[int, str]] = []
+        self._lookup: Optional[ScheduleLookup] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._listeners: List[NowNextListener] = []
+    
+    def add_listener(self, listener: NowNextListener):
+        self._listeners.append(listener)
+    
+    def _notify(self, changed: Optional[List[str]]):
+        for listener in self._listeners:
+            try:
+                listener(self, changed)
+            except Exception as e:
+                logger.error(f"Error in now/next listener: {e}")
+    
+    def encode_entries(self, channel_ids: Sequence[str]) -> bytes:
+        # JSON array of already-serialised entries
+        encoded = self._encoded
+        return b"[" + b",".join(encoded[channel_id] for channel_id in channel_ids if channel_id in encoded) + b"]"
+    
+    def get(self, channel_id: str) -> Optional[NowNext]:
+        return self.entries.get(channel_id)
+    
+    @property
+    def next_change(self) -> Optional[int]:
+        return self._boundaries[0][0] if self._boundaries else None
+    
+    def rebuild(self, channels: Sequence[Channel], lookup: ScheduleLookup, now: Optional[float] = None):
+        # Full recompute, for a new catalog or a new guide
+        now = time.time() if now is None else now
+        self._channels = {channel.id: channel for channel in channels}
+        self._order = list(self._channels)
+        self._lookup = lookup
+        self.entries = {}
+        self._encoded = {}
+        self._boundaries = []
+        for channel_id in self._order:
+            boundary = self._compute(channel_id, int(now))
+            if boundary is not None:
+                self._boundaries.append((boundary, channel_id))
+        heapq.heapify(self._boundaries)
+        self._publish(now)
+        self._notify(None)
+        if self._wakeup is not None:
+            self._wakeup.set()
+    
+    def advance(self, now: Optional[float] = None) -> List[NowNext]:
+        # Recomputes the channels whose boundary has passed; returns the
+        # entries that actually changed
+        now = time.time() if now is None else now
+        due = []
+        while self._boundaries and self._boundaries[0][0] <= now:
+            due.append(heapq.heappop(self._boundaries)[1])
+        
+        changed = []
+        for channel_id in due:
+            previous = self._encoded.get(channel_id)
+            boundary = self._compute(channel_id, int(now))
+            if boundary is not None:
+                heapq.heappush(self._boundaries, (boundary, channel_id))
+            if self._encoded[channel_id] != previous:
+                changed.append(self.entries[channel_id])
+        if changed:
+            self._publish(now)
+            self._notify([entry.channel_id for entry in changed])
+        return changed
+    
+    def _compute(self, channel_id: str, moment: int) -> Optional[int]:
+        channel = self._channels[channel_id]
+        schedule = self._lookup(channel.epg_id or channel.id) if self._lookup else None
+        current, following, boundary = schedule.now_next(moment) if schedule is not None else (None, None, None)
+        entry = NowNext(
+            channel_id=channel_id,
+            channel_name=channel.name,
+            current_program=current,
+            next_program=following
+        )
+        self.entries[channel_id] = entry
+        self._encoded[channel_id] = entry.model_dump_json().encode()
+        return boundary
+    
+    def _publish(self, now: float):
+        # Serialised once per change and served as-is to every reader
+        next_change = self.next_change
+        tail = json.dumps({
+            "total": len(self._order),
+            "updated_at": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            "next_change": datetime.fromtimestamp(next_change, timezone.utc).isoformat() if next_change else None
+        }).encode()
+        self.payload = b'{"channels":' + self.encode_entries(self._order) + b"," + tail[1:]
+        self.version += 1
+        self.etag = f'"{zlib.crc32(self.payload):08x}"'
+    
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            logger.info("Started now/next timer")
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Stopped now/next timer")
+    
+    async def _run(self):
+        while True:
+            try:
+                self._wakeup.clear()
+                next_change = self.next_change
+                delay = None if next_change is None else max(0.0, next_change - time.time())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                changed = self.advance()
+                if changed:
+                    logger.debug(f"Now/next changed for {len(changed)} channels")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in now/next timer: {e}")
+                await asyncio.sleep(60)
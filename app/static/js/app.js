@@ -10,6 +10,8 @@ class IPTVApp {
         this.currentFilter = null;
         this.currentSearch = '';
         this.player = null;
+        this.currentChannelId = null;
+        this.catalogVersion = null;
         
         this.init();
     }
@@ -19,6 +21,49 @@ class IPTVApp {
         await this.loadGroups();
         await this.loadChannels();
         this.setupEventListeners();
+        this.subscribeEvents();
+    }
+    
+    subscribeEvents() {
+        // Server pushes replace polling: the guide is refetched only when the
+        // playing channel's programme changes or the server asks for a resync
+        if (!window.EventSource) return;
+        
+        const source = new EventSource(`${API_BASE}/events`);
+        const refreshEPG = () => {
+            if (this.currentChannelId) {
+                this.loadEPG(this.currentChannelId);
+            }
+        };
+        const catalogChanged = (version) => {
+            if (this.catalogVersion !== null && version !== this.catalogVersion) {
+                this.catalogVersion = version;
+                this.reloadCurrentPage();
+            }
+        };
+        
+        source.addEventListener('hello', (e) => {
+            // Sent on every (re)connect; catches up on anything missed meanwhile
+            catalogChanged(JSON.parse(e.data).catalog_version);
+            refreshEPG();
+        });
+        source.addEventListener('catalog', (e) => catalogChanged(JSON.parse(e.data).version));
+        source.addEventListener('now-next', (e) => {
+            const data = JSON.parse(e.data);
+            if (data.channels.some(entry => entry.channel_id === this.currentChannelId)) {
+                refreshEPG();
+            }
+        });
+        source.addEventListener('now-next-reset', refreshEPG);
+        source.addEventListener('resync', refreshEPG);
+    }
+    
+    reloadCurrentPage() {
+        if (this.currentSearch) {
+            this.searchChannels(this.currentSearch);
+        } else {
+            this.loadChannels();
+        }
     }
     
     setupEventListeners() {
@@ -123,6 +168,8 @@ class IPTVApp {
             
             this.channels = data.channels;
             this.totalChannels = data.total;
+            this.totalExact = data.total_exact !== false;
+            this.catalogVersion = data.catalog_version;
             this.renderChannels();
             this.updatePagination();
         } catch (error) {
@@ -139,6 +186,7 @@ class IPTVApp {
             
             this.channels = data.channels;
             this.totalChannels = data.total;
+            this.totalExact = data.total_exact !== false;
             this.renderChannels();
             this.updatePagination();
         } catch (error) {
@@ -227,6 +275,7 @@ class IPTVApp {
                 alert('Your browser does not support HLS playback');
             }
             
+            this.currentChannelId = channel.id;
             await this.loadEPG(channel.id);
         } catch (error) {
             console.error('Error playing channel:', error);
@@ -288,6 +337,7 @@ class IPTVApp {
         const player = document.getElementById('videoPlayer');
         
         modal.classList.remove('active');
+        this.currentChannelId = null;
         player.pause();
         player.src = '';
         
@@ -381,7 +431,9 @@ class IPTVApp {
         
         if (pageInfo) {
             const totalPages = Math.ceil(this.totalChannels / this.pageSize);
-            pageInfo.textContent = `Page ${this.currentPage} of ${totalPages} (${this.totalChannels} channels)`;
+            // A search that stopped counting reports a lower bound
+            const more = this.totalExact === false ? '+' : '';
+            pageInfo.textContent = `Page ${this.currentPage} of ${totalPages}${more} (${this.totalChannels}${more} channels)`;
         }
     }
     
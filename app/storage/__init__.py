@@ -0,0 +1,12 @@
+from app.storage.fetch_state import FetchStateStore, atomic_write_text
+from app.storage.channel_snapshot import write_channel_snapshot, read_channel_snapshot
+from app.storage.epg_snapshot import write_epg_snapshot, read_epg_snapshot
+
+__all__ = [
+    "FetchStateStore",
+    "atomic_write_text",
+    "write_channel_snapshot",
+    "read_channel_snapshot",
+    "write_epg_snapshot",
+    "read_epg_snapshot"
+]
@@ -0,0 +1,55 @@
+import os
+import mmap
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Slot 0 of every string table stands for None
+NO_STRING = 0
+
+
+class StringTable:
+    # Interns strings for a snapshot and encodes them as one NUL-separated
+    # UTF-8 blob, so the reader can decode the whole table with one split.
+    def __init__(self):
+        self.strings: List[str] = [""]
+        self.index: Dict[str, int] = {}
+    
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        position = self.index.get(value)
+        if position is None:
+            position = len(self.strings)
+            self.strings.append(value.replace('\0', ''))
+            self.index[value] = position
+        return position
+    
+    def encode(self) -> bytes:
+        return '\0'.join(self.strings).encode('utf-8')
+
+
+def decode_string_table(blob) -> List[Optional[str]]:
+    strings = str(blob, 'utf-8').split('\0')
+    strings[NO_STRING] = None
+    return strings
+
+
+def atomic_write_bytes(path: str, chunks: Iterable[bytes]):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def open_mmap(path: str) -> Iterator[memoryview]:
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                yield view
+            finally:
+                view.release()
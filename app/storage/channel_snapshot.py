@@ -0,0 +1,89 @@
+import json
+import struct
+from typing import Dict, List
+from app.models import Channel
+from app.storage.binary import StringTable, NO_STRING, decode_string_table, atomic_write_bytes, open_mmap
+
+# Layout (little endian):
+#   magic, header (version, source count, channel count, string count, blob size)
+#   string blob, source table (name, channel count), channel records
+MAGIC = b"IPTVCHS\0"
+VERSION = 1
+HEADER = struct.Struct("<IIIII")
+SOURCE_RECORD = struct.Struct("<II")
+
+STRING_FIELDS = (
+    "id", "name", "logo", "group", "url", "epg_id",
+    "language", "country", "tvg_id", "tvg_name"
+)
+CHANNEL_RECORD = struct.Struct(f"<{len(STRING_FIELDS) + 1}IB")
+
+FLAG_RADIO = 0x01
+FLAG_ASTRO = 0x02
+
+
+def write_channel_snapshot(path: str, channels_by_source: Dict[str, List[Channel]]):
+    strings = StringTable()
+    sources = []
+    records = []
+    
+    for source, channels in channels_by_source.items():
+        sources.append(SOURCE_RECORD.pack(strings.add(source), len(channels)))
+        for channel in channels:
+            fields = channel.__dict__
+            indexes = [strings.add(fields[name]) for name in STRING_FIELDS]
+            attributes = fields["attributes"]
+            indexes.append(strings.add(json.dumps(attributes)) if attributes else NO_STRING)
+            flags = (FLAG_RADIO if fields["radio"] else 0) | (FLAG_ASTRO if fields["is_astro"] else 0)
+            records.append(CHANNEL_RECORD.pack(*indexes, flags))
+    
+    blob = strings.encode()
+    header = HEADER.pack(VERSION, len(sources), len(records), len(strings.strings), len(blob))
+    atomic_write_bytes(path, [MAGIC, header, blob, b"".join(sources), b"".join(records)])
+
+
+def read_channel_snapshot(path: str) -> Dict[str, List[Channel]]:
+    with open_mmap(path) as view:
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a channel snapshot")
+        offset = len(MAGIC)
+        version, source_count, channel_count, string_count, blob_size = HEADER.unpack_from(view, offset)
+        if version != VERSION:
+            raise ValueError(f"Unsupported channel snapshot version {version}")
+        offset += HEADER.size
+        
+        strings = decode_string_table(view[offset:offset + blob_size])
+        if len(strings) != string_count:
+            raise ValueError(f"Corrupt string table in {path}")
+        offset += blob_size
+        
+        sources = []
+        for _ in range(source_count):
+            name_index, count = SOURCE_RECORD.unpack_from(view, offset)
+            sources.append((strings[name_index], count))
+            offset += SOURCE_RECORD.size
+        
+        records_view = view[offset:offset + channel_count * CHANNEL_RECORD.size]
+        try:
+            records = CHANNEL_RECORD.iter_unpack(records_view)
+            lookup = strings.__getitem__
+            decoded_attributes = {NO_STRING: {}}
+            channels_by_source = {}
+            for source, count in sources:
+                channels = []
+                for _ in range(count):
+                    record = next(records)
+                    data = dict(zip(STRING_FIELDS, map(lookup, record)))
+                    attributes = decoded_attributes.get(record[-2])
+                    if attributes is None:
+                        attributes = decoded_attributes[record[-2]] = json.loads(strings[record[-2]])
+                    data["attributes"] = dict(attributes)
+                    data["radio"] = bool(record[-1] & FLAG_RADIO)
+                    data["is_astro"] = bool(record[-1] & FLAG_ASTRO)
+                    channels.append(Channel.from_trusted(data))
+                channels_by_source[source] = channels
+        finally:
+            records = None
+            records_view.release()
+    
+    return channels_by_source
@@ -0,0 +1,100 @@
+import sys
+import struct
+from array import array
+from typing import Dict, List, Tuple
+from app.storage.binary import StringTable, NO_STRING, decode_string_table, atomic_write_bytes, open_mmap
+
+# Layout (little endian):
+#   magic, header (version, source count, string count, blob size)
+#   string blob, then per source: source record (name, fetched_at, channel
+#   count) followed by its channels, each a channel record (id, programme
+#   count) and the six schedule columns stored back to back
+MAGIC = b"IPTVEPG\0"
+VERSION = 1
+HEADER = struct.Struct("<IIII")
+SOURCE_RECORD = struct.Struct("<IdI")
+CHANNEL_RECORD = struct.Struct("<II")
+
+# Same column order as ChannelSchedule; the text columns are string indexes
+COLUMNS = ("starts", "ends", "titles", "descriptions", "categories", "icons")
+COLUMN_TYPES = ("q", "q", "I", "I", "I", "I")
+ROW_SIZE = sum(array(code).itemsize for code in COLUMN_TYPES)
+
+# source -> (fetched_at epoch seconds, channel id -> schedule columns)
+EPGSnapshotSources = Dict[str, Tuple[float, Dict[str, Tuple[array, ...]]]]
+
+
+def _little_endian(column: array) -> bytes:
+    if sys.byteorder != "little":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def write_epg_snapshot(path: str, sources: Dict[str, Tuple[float, Dict]]):
+    # Takes ChannelSchedule-like objects: a `strings` table plus the columns
+    strings = StringTable()
+    remaps: Dict[int, List[int]] = {}
+    body = []
+    
+    for source, (fetched_at, schedules) in sources.items():
+        body.append(SOURCE_RECORD.pack(strings.add(source), fetched_at, len(schedules)))
+        for channel_id, schedule in schedules.items():
+            # Schedules from one parse share a string table; map it into the
+            # snapshot's table once, not once per channel
+            remap = remaps.get(id(schedule.strings))
+            if remap is None:
+                remap = [NO_STRING] + [strings.add(value) for value in schedule.strings[1:]]
+                remaps[id(schedule.strings)] = remap
+            
+            body.append(CHANNEL_RECORD.pack(strings.add(channel_id), len(schedule)))
+            body.append(_little_endian(schedule.starts))
+            body.append(_little_endian(schedule.ends))
+            for name in COLUMNS[2:]:
+                body.append(_little_endian(array("I", map(remap.__getitem__, getattr(schedule, name)))))
+    
+    blob = strings.encode()
+    header = HEADER.pack(VERSION, len(sources), len(strings.strings), len(blob))
+    atomic_write_bytes(path, [MAGIC, header, blob] + body)
+
+
+def read_epg_snapshot(path: str) -> Tuple[List[str], EPGSnapshotSources]:
+    with open_mmap(path) as view:
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not an EPG snapshot")
+        offset = len(MAGIC)
+        version, source_count, string_count, blob_size = HEADER.unpack_from(view, offset)
+        if version != VERSION:
+            raise ValueError(f"Unsupported EPG snapshot version {version}")
+        offset += HEADER.size
+        
+        strings = decode_string_table(view[offset:offset + blob_size])
+        if len(strings) != string_count:
+            raise ValueError(f"Corrupt string table in {path}")
+        # Schedules resolve NO_STRING themselves; keep slot 0 a str like StringTable
+        strings[NO_STRING] = ""
+        offset += blob_size
+        
+        sources: EPGSnapshotSources = {}
+        for _ in range(source_count):
+            name_index, fetched_at, channel_count = SOURCE_RECORD.unpack_from(view, offset)
+            offset += SOURCE_RECORD.size
+            schedules = {}
+            for _ in range(channel_count):
+                channel_index, count = CHANNEL_RECORD.unpack_from(view, offset)
+                offset += CHANNEL_RECORD.size
+                if offset + count * ROW_SIZE > len(view):
+                    raise ValueError(f"Truncated EPG snapshot {path}")
+                columns = []
+                for code in COLUMN_TYPES:
+                    column = array(code)
+                    size = count * column.itemsize
+                    column.frombytes(view[offset:offset + size])
+                    if sys.byteorder != "little":
+                        column.byteswap()
+                    columns.append(column)
+                    offset += size
+                schedules[strings[channel_index]] = tuple(columns)
+            sources[strings[name_index]] = (fetched_at, schedules)
+    
+    return strings, sources
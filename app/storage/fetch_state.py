@@ -0,0 +1,49 @@
+import os
+import json
+import aiofiles
+from typing import Dict, Optional
+from app.models import SourceFetchState
+from app.core import get_logger
+
+logger = get_logger(__name__)
+
+
+async def atomic_write_text(path: str, content: str):
+    tmp_path = f"{path}.tmp"
+    async with aiofiles.open(tmp_path, 'w') as f:
+        await f.write(content)
+    os.replace(tmp_path, path)
+
+
+class FetchStateStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.states: Dict[str, SourceFetchState] = {}
+    
+    def get(self, source: str) -> Optional[SourceFetchState]:
+        return self.states.get(source)
+    
+    def set(self, source: str, state: SourceFetchState):
+        self.states[source] = state
+    
+    def discard(self, source: str):
+        self.states.pop(source, None)
+    
+    async def load(self):
+        try:
+            async with aiofiles.open(self.path, 'r') as f:
+                data = json.loads(await f.read())
+            self.states = {source: SourceFetchState(**state) for source, state in data.items()}
+            logger.info(f"Loaded fetch state for {len(self.states)} sources")
+        except FileNotFoundError:
+            self.states = {}
+        except Exception as e:
+            logger.error(f"Error loading fetch state: {e}")
+            self.states = {}
+    
+    async def save(self):
+        try:
+            data = {source: state.model_dump(mode='json') for source, state in self.states.items()}
+            await atomic_write_text(self.path, json.dumps(data, indent=2))
+        except Exception as e:
+            logger.error(f"Error saving fetch state: {e}")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark for Channel construction on the parser and cache-load paths
+Compares validated pydantic construction with the trusted Channel.from_trusted path
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import Channel
+from app.parsers.m3u8_parser import M3U8Parser
+from app.storage import read_channel_snapshot, write_channel_snapshot
+from bench_m3u8_parser import build_playlist, best_of
+
+ENTRIES = 100_000
+
+
+class ValidatingM3U8Parser(M3U8Parser):
+    def _build_channel(self, metadata, url):
+        return Channel(
+            id=self._generate_channel_id(metadata['name'], url),
+            name=metadata['name'],
+            logo=metadata.get('logo'),
+            group=metadata.get('group'),
+            url=url,
+            epg_id=metadata.get('tvg_id'),
+            language=metadata.get('language'),
+            country=metadata.get('country', 'MY'),
+            tvg_id=metadata.get('tvg_id'),
+            tvg_name=metadata.get('tvg_name'),
+            radio=metadata.get('radio', False),
+            is_astro=self._is_astro_channel(metadata['name'], metadata.get('group', '')),
+            attributes=metadata.get('attributes', {})
+        )
+
+
+def main():
+    content = build_playlist(ENTRIES)
+    print(f"Synthetic playlist: {ENTRIES} entries")
+    
+    validated = best_of(lambda: ValidatingM3U8Parser().parse_m3u8_content(content))
+    trusted = best_of(lambda: M3U8Parser().parse_m3u8_content(content))
+    print(f"Parse (validated Channel):      {validated * 1000:8.1f} ms")
+    print(f"Parse (trusted):                {trusted * 1000:8.1f} ms  ({validated / trusted:.2f}x)")
+    
+    channels = M3U8Parser().parse_m3u8_content(content)
+    cache = json.dumps({'sources': {'bench': [ch.model_dump() for ch in channels]}})
+    
+    decode = best_of(lambda: json.loads(cache))
+    print(f"Cache json.loads only:          {decode * 1000:8.1f} ms")
+    
+    rows = json.loads(cache)['sources']['bench']
+    validated = best_of(lambda: [Channel.model_validate(dict(row)) for row in rows])
+    trusted = best_of(lambda: [Channel.from_trusted(dict(row)) for row in rows])
+    print(f"Cache rows (validated Channel): {validated * 1000:8.1f} ms")
+    print(f"Cache rows (trusted):           {trusted * 1000:8.1f} ms  ({validated / trusted:.2f}x)")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_file = os.path.join(tmp_dir, "channels_cache.json")
+        snapshot_file = os.path.join(tmp_dir, "channels_cache.bin")
+        with open(json_file, "w") as f:
+            f.write(json.dumps({'sources': {'bench': [ch.model_dump() for ch in channels]}}, indent=2))
+        write_channel_snapshot(snapshot_file, {'bench': channels})
+        
+        def load_json():
+            with open(json_file) as f:
+                data = json.loads(f.read())
+            return [Channel.from_trusted(ch) for ch in data['sources']['bench']]
+        
+        json_load = best_of(load_json)
+        snapshot_load = best_of(lambda: read_channel_snapshot(snapshot_file))
+        print(f"Cold start (JSON cache):        {json_load * 1000:8.1f} ms  {os.path.getsize(json_file) / 1024 / 1024:6.1f} MiB")
+        print(f"Cold start (binary snapshot):   {snapshot_load * 1000:8.1f} ms  {os.path.getsize(snapshot_file) / 1024 / 1024:6.1f} MiB")
+
+if __name__ == "__main__":
+    main()
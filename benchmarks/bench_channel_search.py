@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark for channel search on a large catalog
+Compares the legacy lowercase substring scan with the trigram search index
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.parsers.m3u8_parser import M3U8Parser
+from app.services.catalog import ChannelCatalog
+from bench_m3u8_parser import build_playlist, best_of
+
+ENTRIES = 100_000
+PAGE_SIZE = 50
+QUERIES = ["channel 4242", "chanel 4242", "chanel", "news", "astro", "9", "c"]
+
+
+def legacy_search(channels, query):
+    query_lower = query.lower()
+    results = [
+        ch for ch in channels
+        if query_lower in ch.name.lower() or
+           (ch.group and query_lower in ch.group.lower())
+    ]
+    return results[:PAGE_SIZE], len(results)
+
+
+def main():
+    channels = M3U8Parser().parse_m3u8_content(build_playlist(ENTRIES))
+    catalog = ChannelCatalog(1, {"bench": channels})
+    print(f"Synthetic catalog: {len(catalog)} channels")
+    
+    start = time.perf_counter()
+    catalog.search_index
+    print(f"Index build:                    {(time.perf_counter() - start) * 1000:8.1f} ms")
+    
+    for query in QUERIES:
+        legacy = best_of(lambda: legacy_search(catalog.channels, query))
+        indexed = best_of(lambda: catalog.search(query, 1, PAGE_SIZE))
+        _, legacy_total = legacy_search(catalog.channels, query)
+        _, total, total_exact = catalog.search(query, 1, PAGE_SIZE)
+        hits = f"{total:6}" if total_exact else f">={total}"
+        print(
+            f"{query!r:16} scan {legacy * 1000:7.1f} ms ({legacy_total:6} hits)  "
+            f"index {indexed * 1000:7.1f} ms ({hits:>6} hits)  {legacy / indexed:6.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
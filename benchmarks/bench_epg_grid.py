@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the EPG grid
+Compares filtering each channel's full programme list against the window
+with the bisected ChannelSchedule.between slices the grid endpoint uses
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.parsers.epg_parser import EPGParser
+from bench_m3u8_parser import best_of
+from bench_epg_memory import build_guide
+
+CHANNELS_PER_PAGE = 50
+WINDOW_HOURS = [3, 24]
+
+
+def legacy_grid(schedules, start, end):
+    return [[p for p in schedule if p.end_time > start and p.start_time < end] for schedule in schedules]
+
+
+def indexed_grid(schedules, start, end):
+    start_epoch, end_epoch = int(start.timestamp()), int(end.timestamp())
+    return [schedule.between(start_epoch, end_epoch) for schedule in schedules]
+
+
+def main():
+    guide = EPGParser().parse_xmltv(build_guide())
+    schedules = [guide[channel_id] for channel_id in sorted(guide)][:CHANNELS_PER_PAGE]
+    print(f"Synthetic guide: {len(guide)} channels, {sum(len(s) for s in guide.values())} programmes")
+    
+    start = datetime(2024, 1, 3, 12, tzinfo=timezone.utc)
+    for hours in WINDOW_HOURS:
+        end = start + timedelta(hours=hours)
+        legacy = best_of(lambda: legacy_grid(schedules, start, end))
+        indexed = best_of(lambda: indexed_grid(schedules, start, end))
+        cells = sum(len(row) for row in indexed_grid(schedules, start, end))
+        print(
+            f"{CHANNELS_PER_PAGE} channels x {hours:2}h ({cells:5} programmes): "
+            f"filter {legacy * 1000:8.1f} ms  bisect {indexed * 1000:7.2f} ms  {legacy / indexed:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark for resident EPG memory
+Compares one pydantic EPGProgram per programme (the previous store) with the
+columnar, string-interned ChannelSchedule store, in bytes per programme
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lxml import etree
+from app.models import EPGProgram
+from app.parsers.epg_parser import EPGParser, parse_xmltv_time
+
+CHANNELS = 500
+PROGRAMMES_PER_CHANNEL = 200
+TITLES = 400
+CATEGORIES = ["News", "Sports", "Movies", "Kids", "Music", "Drama"]
+
+
+def build_guide():
+    base = datetime(2024, 1, 1)
+    parts = ['<?xml version="1.0" encoding="UTF-8"?><tv>']
+    for channel in range(CHANNELS):
+        for slot in range(PROGRAMMES_PER_CHANNEL):
+            start = base + timedelta(minutes=45 * slot)
+            stop = start + timedelta(minutes=45)
+            title = (channel * 7 + slot) % TITLES
+            parts.append(
+                f'<programme start="{start:%Y%m%d%H%M%S} +0800" stop="{stop:%Y%m%d%H%M%S} +0800" '
+                f'channel="ch{channel}.my"><title>Programme {title}</title>'
+                f'<desc>Description of programme {title}, episode {slot % 20}.</desc>'
+                f'<category>{CATEGORIES[title % len(CATEGORIES)]}</category>'
+                f'<icon src="https://img.example.com/programme/{title}.jpg"/></programme>'
+            )
+    parts.append('</tv>')
+    return ''.join(parts).encode('utf-8')
+
+
+def legacy_store(content):
+    root = etree.fromstring(content)
+    programs_by_channel = {}
+    for programme in root.xpath('//programme'):
+        icon = programme.find('icon')
+        program = EPGProgram(
+            channel_id=programme.get('channel'),
+            title=programme.findtext('title'),
+            description=programme.findtext('desc'),
+            start_time=parse_xmltv_time(programme.get('start')),
+            end_time=parse_xmltv_time(programme.get('stop')),
+            category=programme.findtext('category'),
+            icon=icon.get('src') if icon is not None else None
+        )
+        programs_by_channel.setdefault(program.channel_id, []).append(program)
+    return programs_by_channel
+
+
+def columnar_store(content):
+    return EPGParser().parse_xmltv(content)
+
+
+def retained_bytes(build, content):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = build(content)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return store, after - before
+
+
+def main():
+    content = build_guide()
+    programmes = CHANNELS * PROGRAMMES_PER_CHANNEL
+    print(f"Synthetic guide: {programmes} programmes, {len(content) / 1e6:.1f} MB of XMLTV")
+    
+    legacy, legacy_bytes = retained_bytes(legacy_store, content)
+    del legacy
+    columnar, columnar_bytes = retained_bytes(columnar_store, content)
+    
+    print(f"EPGProgram per programme: {legacy_bytes / programmes:8.1f} bytes/programme")
+    print(f"Columnar ChannelSchedule: {columnar_bytes / programmes:8.1f} bytes/programme "
+          f"({legacy_bytes / columnar_bytes:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
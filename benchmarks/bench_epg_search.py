@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark for EPG programme search on a large guide
+Compares the legacy flatten-and-lowercase scan with the inverted index
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.parsers.epg_parser import EPGParser
+from app.services.epg_search import EPGSearchIndex
+from bench_m3u8_parser import best_of
+from bench_epg_memory import build_guide
+
+PAGE_SIZE = 50
+QUERIES = ["programme 123", '"episode 7"', "news", "prog*", "news programme 42"]
+
+
+def legacy_search(guide, query):
+    query_lower = query.lower()
+    all_programs = []
+    for programs in guide.values():
+        all_programs.extend(programs)
+    results = [
+        p for p in all_programs
+        if query_lower in p.title.lower() or
+           (p.description and query_lower in p.description.lower())
+    ]
+    return results[:PAGE_SIZE], len(results)
+
+
+def main():
+    guide = EPGParser().parse_xmltv(build_guide())
+    print(f"Synthetic guide: {len(guide)} channels, {sum(len(s) for s in guide.values())} programmes")
+    
+    start = time.perf_counter()
+    index = EPGSearchIndex(guide)
+    print(f"Index build:                          {(time.perf_counter() - start) * 1000:8.1f} ms")
+    
+    legacy = best_of(lambda: legacy_search(guide, "programme 123"))
+    _, legacy_total = legacy_search(guide, "programme 123")
+    print(f"{'legacy scan':26} {legacy * 1000:9.1f} ms ({legacy_total:6} hits)")
+    
+    for query in QUERIES:
+        indexed = best_of(lambda: index.search(query, 0, PAGE_SIZE))
+        _, total, total_exact = index.search(query, 0, PAGE_SIZE)
+        hits = f"{total:6}" if total_exact else f">={total}"
+        print(f"{query!r:26} {indexed * 1000:9.1f} ms ({hits:>6} hits)  {legacy / indexed:7.1f}x")
+    
+    channel = sorted(guide)[0]
+    filtered = best_of(lambda: index.search("programme", 0, PAGE_SIZE, channel_ids=[channel]))
+    _, total, _ = index.search("programme", 0, PAGE_SIZE, channel_ids=[channel])
+    print(f"{'programme @ one channel':26} {filtered * 1000:9.1f} ms ({total:6} hits)  {legacy / filtered:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark for Server-Sent Events fan-out
+Compares serialising a now/next change per subscriber with encoding it once
+and queueing the same bytes for every subscriber
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import settings
+from app.models import Channel
+from app.parsers.epg_parser import EPGParser
+from app.services.events import EventBroadcaster
+from app.services.now_next import NowNextTable
+from bench_m3u8_parser import best_of
+from bench_epg_memory import build_guide
+
+SUBSCRIBERS = 2000
+CHANGED_CHANNELS = 50
+
+
+def drain(broadcaster):
+    for subscription in broadcaster.subscribers:
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+
+
+async def run():
+    guide = EPGParser().parse_xmltv(build_guide())
+    channels = [
+        Channel(id=f"c{i}", name=f"Channel {i}", url=f"https://example.com/{i}.m3u8", epg_id=channel_id)
+        for i, channel_id in enumerate(sorted(guide))
+    ]
+    table = NowNextTable()
+    table.rebuild(channels, guide.get, now=datetime(2024, 1, 3, 12, 10, tzinfo=timezone.utc).timestamp())
+    changed = [channel.id for channel in channels[:CHANGED_CHANNELS]]
+    
+    settings.sse_queue_size = 1024
+    broadcaster = EventBroadcaster()
+    for _ in range(SUBSCRIBERS):
+        broadcaster.subscribe()
+    
+    def per_subscriber():
+        for subscription in broadcaster.subscribers:
+            data = b"[" + b",".join(table.get(channel_id).model_dump_json().encode() for channel_id in changed) + b"]"
+            subscription.offer(b"event: now-next\ndata: %s\n\n" % data)
+        drain(broadcaster)
+    
+    def shared():
+        broadcaster.on_now_next_changed(table, changed)
+        drain(broadcaster)
+    
+    print(f"{SUBSCRIBERS} subscribers, {CHANGED_CHANNELS} channels changed")
+    legacy = best_of(per_subscriber)
+    once = best_of(shared)
+    print(f"Serialise per subscriber: {legacy * 1000:8.2f} ms")
+    print(f"Serialise once, fan out:  {once * 1000:8.2f} ms  {legacy / once:6.1f}x")
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
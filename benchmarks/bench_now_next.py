@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the now/next table
+Compares computing and serialising now/next for every channel per request
+with reading the table's prebuilt payload, plus the cost of a rebuild and of
+a boundary tick
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import Channel, NowNext
+from app.parsers.epg_parser import EPGParser
+from app.services.now_next import NowNextTable
+from bench_m3u8_parser import best_of
+from bench_epg_memory import build_guide
+
+
+def per_request(channels, guide, now):
+    entries = []
+    for channel in channels:
+        schedule = guide.get(channel.epg_id)
+        current = schedule.current(now)
+        upcoming = schedule.upcoming(now, 1)
+        entries.append(NowNext(
+            channel_id=channel.id,
+            channel_name=channel.name,
+            current_program=current,
+            next_program=upcoming[0] if upcoming else None
+        ))
+    return b"[" + b",".join(entry.model_dump_json().encode() for entry in entries) + b"]"
+
+
+def main():
+    guide = EPGParser().parse_xmltv(build_guide())
+    channels = [
+        Channel(id=f"c{i}", name=f"Channel {i}", url=f"https://example.com/{i}.m3u8", epg_id=channel_id)
+        for i, channel_id in enumerate(sorted(guide))
+    ]
+    now = datetime(2024, 1, 3, 12, 10, tzinfo=timezone.utc)
+    print(f"Synthetic guide: {len(channels)} channels, {sum(len(s) for s in guide.values())} programmes")
+    
+    table = NowNextTable()
+    rebuild = best_of(lambda: table.rebuild(channels, guide.get, now=now.timestamp()))
+    computed = best_of(lambda: per_request(channels, guide, now))
+    served = best_of(lambda: table.payload)
+    lookup = best_of(lambda: table.get("c250"))
+    print(f"Per-request compute + serialise: {computed * 1000:8.2f} ms")
+    print(f"Prebuilt payload read:           {served * 1e6:8.2f} us ({len(table.payload) / 1024:.0f} KiB)")
+    print(f"Single channel lookup:           {lookup * 1e6:8.2f} us")
+    print(f"Full rebuild (new guide):        {rebuild * 1000:8.2f} ms")
+    
+    table.rebuild(channels, guide.get, now=now.timestamp())
+    started = time.perf_counter()
+    changed = table.advance(table.next_change)
+    tick = time.perf_counter() - started
+    print(f"Boundary tick ({len(changed)} channels changed): {tick * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
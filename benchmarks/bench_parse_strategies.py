@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark for event loop responsiveness while a large XMLTV guide is parsed
+Runs EPGParser.fetch_and_parse under each parse strategy and records the
+worst delay seen by a coroutine that wakes every 10 ms
+"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import settings, parse_executor
+from app.parsers.epg_parser import EPGParser
+from bench_epg_memory import build_guide
+
+TICK = 0.01
+
+
+async def measure_lag(stop: asyncio.Event) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        worst = max(worst, time.perf_counter() - start - TICK)
+    return worst
+
+
+async def run(strategy: str, path: str):
+    settings.parse_strategy = strategy
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_lag(stop))
+    start = time.perf_counter()
+    epg_data = await EPGParser().fetch_and_parse(path)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worst = await ticker
+    programmes = sum(len(schedule) for schedule in epg_data.values())
+    print(f"{strategy:8} {elapsed * 1000:8.0f} ms total, worst loop stall {worst * 1000:7.1f} ms ({programmes} programmes)")
+
+
+async def main():
+    content = build_guide()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "guide.xml")
+        with open(path, "wb") as f:
+            f.write(content)
+        print(f"Synthetic guide: {len(content) / 1e6:.1f} MB, chunk size {settings.parse_chunk_size // 1024} KiB, "
+              f"{settings.parse_workers or os.cpu_count()} workers")
+        
+        # Warm the process pool so worker start-up is not counted
+        settings.parse_strategy = "process"
+        await parse_executor.run(len, b"")
+        for strategy in ("inline", "thread", "process"):
+            await run(strategy, path)
+        parse_executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
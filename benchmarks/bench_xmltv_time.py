@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark for XMLTV timestamp decoding
+Compares the fixed-format decoder with the previous dateutil-based path on
+the start/stop attributes of a synthetic 500k-programme guide
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dateutil import parser as date_parser
+from app.parsers.epg_parser import parse_xmltv_time
+from bench_m3u8_parser import best_of
+
+CHANNELS = 500
+SLOTS_PER_CHANNEL = 1000
+OFFSETS = ["+0800", "+0000", "-0500", "+0530"]
+
+
+def legacy_parse_xmltv_time(time_str):
+    if '+' in time_str or '-' in time_str[-5:]:
+        return date_parser.parse(time_str)
+    base_time = time_str[:14]
+    return datetime.strptime(base_time, '%Y%m%d%H%M%S')
+
+
+def build_timestamps():
+    base = datetime(2024, 1, 1)
+    timestamps = []
+    for channel in range(CHANNELS):
+        offset = OFFSETS[channel % len(OFFSETS)]
+        # Stagger channels so slot boundaries are not all identical
+        start = base + timedelta(minutes=5 * (channel % 6))
+        for slot in range(SLOTS_PER_CHANNEL):
+            stop = start + timedelta(minutes=30)
+            timestamps.append(f"{start:%Y%m%d%H%M%S} {offset}")
+            timestamps.append(f"{stop:%Y%m%d%H%M%S} {offset}")
+            start = stop
+    return timestamps
+
+
+def decode_all(timestamps):
+    parse_xmltv_time.cache_clear()
+    return [parse_xmltv_time(value) for value in timestamps]
+
+
+def main():
+    timestamps = build_timestamps()
+    print(f"Synthetic guide: {CHANNELS * SLOTS_PER_CHANNEL} programmes, "
+          f"{len(timestamps)} timestamps ({len(set(timestamps))} distinct)")
+    
+    start = time.perf_counter()
+    legacy = [legacy_parse_xmltv_time(value) for value in timestamps]
+    legacy_time = time.perf_counter() - start
+    fast_time = best_of(lambda: decode_all(timestamps))
+    uncached_time = best_of(lambda: [parse_xmltv_time.__wrapped__(value) for value in timestamps])
+    
+    same = all(a == b for a, b in zip(legacy, decode_all(timestamps)))
+    print(f"dateutil path:       {legacy_time * 1000:9.1f} ms")
+    print(f"decoder, no cache:   {uncached_time * 1000:9.1f} ms  ({legacy_time / uncached_time:.1f}x)")
+    print(f"decoder, cached:     {fast_time * 1000:9.1f} ms  ({legacy_time / fast_time:.1f}x)")
+    print(f"Same instants as dateutil: {same}")
+
+
+if __name__ == "__main__":
+    main()
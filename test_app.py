@@ -4,19 +4,42 @@ Test script for Malaysian IPTV application
 Verifies core functionality without requiring external services
 """
 
+import os
 import sys
+import gzip
+import json
+import lzma
+import time
+import shutil
 import asyncio
-from app.parsers.m3u8_parser import M3U8Parser
-from app.parsers.epg_parser import EPGParser
+import tempfile
+from datetime import datetime, timedelta, timezone
+from app.parsers.m3u8_parser import M3U8Parser, PlaylistAssembler, iter_text_lines
+from app.parsers.epg_parser import EPGParser, ProgrammeStream
+from app.parsers.epg_schedule import ChannelSchedule
+from app.models import Channel, EPGProgram
+from app.parsers.fetch import SourceFetch
 from app.services.channel_service import ChannelService
 from app.services.favorite_service import FavoriteService
+from app.services.epg_service import EPGService
+from app.storage import FetchStateStore, read_channel_snapshot, write_channel_snapshot
 from app.core.config import settings
+from app.core.singleflight import SingleFlight
 
 def print_header(text):
     print(f"\n{'='*60}")
     print(f"  {text}")
     print(f"{'='*60}\n")
 
+def make_isolated_service(tmp_dir):
+    # Channel service whose cache, snapshot and fetch state live in tmp_dir
+    service = ChannelService()
+    service.cache_file = os.path.join(tmp_dir, "channels_cache.json")
+    service.snapshot_file = os.path.join(tmp_dir, "channels_cache.bin")
+    service.fetch_state = FetchStateStore(os.path.join(tmp_dir, "channels_cache.sources.json"))
+    service.refresh_flight.min_interval = 0
+    return service
+
 async def test_m3u8_parser():
     print_header("Testing M3U8 Parser")
     parser = M3U8Parser()
@@ -38,6 +61,67 @@ http://example.com/astro.m3u8
     
     return len(channels) == 2
 
+async def test_extinf_tokenizer():
+    print_header("Testing EXTINF Tokenizer")
+    parser = M3U8Parser()
+    
+    line = ('#EXTINF:-1 tvg-id="TV3.my" tvg-shift="+1" catchup="default" '
+            'user-agent="VLC/3.0" group-title="News, Sports",TV3, Live')
+    metadata = parser._parse_extinf_line(line)
+    print(f"✓ Name: {metadata['name']}")
+    print(f"✓ Group: {metadata['group']}")
+    print(f"✓ Extra attributes: {metadata['attributes']}")
+    
+    return (
+        metadata['name'] == "TV3, Live" and
+        metadata['group'] == "News, Sports" and
+        metadata['tvg_id'] == "TV3.my" and
+        metadata['attributes'] == {"tvg-shift": "+1", "catchup": "default", "user-agent": "VLC/3.0"}
+    )
+
+async def test_m3u8_streaming():
+    print_header("Testing M3U8 Streaming")
+    parser = M3U8Parser()
+    
+    with open("./data/example_channels.m3u8", "rb") as f:
+        raw = f.read()
+    expected = parser.parse_m3u8_content(raw.decode("utf-8"))
+    
+    async def tiny_chunks():
+        for offset in range(0, len(raw), 7):
+            yield raw[offset:offset + 7]
+    
+    assembler = PlaylistAssembler(parser)
+    streamed = []
+    async for line in iter_text_lines(tiny_chunks()):
+        channel = assembler.feed(line)
+        if channel is not None:
+            streamed.append(channel)
+    print(f"✓ Streamed {len(streamed)} channels from 7-byte chunks")
+    
+    from_file = [ch async for ch in parser.stream_channels("./data/example_channels.m3u8")]
+    print(f"✓ Streamed {len(from_file)} channels from local file")
+    
+    # A connection dropped mid-stream: channels already streamed are not
+    # returned as if they were the whole source
+    async def dropped(source, fetch):
+        yield raw[:len(raw) // 2]
+        raise ConnectionResetError("connection reset by peer")
+    
+    cut_parser = M3U8Parser()
+    cut_parser._read_local = dropped
+    cut_fetch = SourceFetch("./data/example_channels.m3u8")
+    cut_stream = [ch async for ch in cut_parser.stream_channels("./data/example_channels.m3u8", cut_fetch)]
+    cut_parsed = await cut_parser.fetch_and_parse("./data/example_channels.m3u8")
+    print(f"✓ Cut-off source streamed {len(cut_stream)} channels (completed: {cut_fetch.completed}); "
+          f"fetch_and_parse returned {len(cut_parsed)}")
+    
+    return (
+        0 < len(cut_stream) < len(expected) and not cut_fetch.completed and cut_parsed == [] and
+        [ch.id for ch in streamed] == [ch.id for ch in expected] and
+        [ch.id for ch in from_file] == [ch.id for ch in expected]
+    )
+
 async def test_epg_parser():
     print_header("Testing EPG Parser")
     parser = EPGParser()
@@ -60,7 +144,563 @@ async def test_epg_parser():
         for program in programs:
             print(f"    • {program.title} ({program.category})")
     
-    return len(epg_data) > 0
+    # Same instant published from two sources with different offsets
+    utc_start = parser._parse_xmltv_time("20240101200000 +0800")
+    same_instant = utc_start == parser._parse_xmltv_time("20240101070000 -0500")
+    print(f"✓ Offsets normalised to UTC: {utc_start.isoformat()} (cross-offset match: {same_instant})")
+    
+    parser.update_epg_data(epg_data)
+    current = parser.get_current_program("TV3.my", datetime(2024, 1, 1, 12, 30))
+    print(f"✓ Current programme at 12:30 UTC: {current.title if current else None}")
+    
+    return len(epg_data) > 0 and same_instant and utc_start.utcoffset() == timedelta(0) and current is not None
+
+async def test_epg_streaming():
+    print_header("Testing EPG Streaming")
+    parser = EPGParser()
+    
+    base = datetime(2024, 1, 1)
+    programmes = "".join(
+        f'<programme start="{base + timedelta(minutes=30 * i):%Y%m%d%H%M%S} +0800" '
+        f'stop="{base + timedelta(minutes=30 * i + 30):%Y%m%d%H%M%S} +0800" channel="ch{i % 3}.my">'
+        f'<title>Show {i}</title><desc>Épisode {i}</desc><icon src="https://img.example.com/{i}.png"/></programme>'
+        for i in range(200)
+    )
+    content = f'<?xml version="1.0" encoding="UTF-8"?><tv><channel id="ch0.my"/>{programmes}</tv>'.encode("utf-8")
+    
+    expected = parser.parse_xmltv(content)
+    stream = ProgrammeStream(parser)
+    for offset in range(0, len(content), 37):
+        stream.feed(content[offset:offset + 37])
+    streamed = stream.close()
+    
+    same = {
+        channel_id: [p.model_dump() for p in programs] for channel_id, programs in streamed.items()
+    } == {
+        channel_id: [p.model_dump() for p in programs] for channel_id, programs in expected.items()
+    }
+    count = sum(len(programs) for programs in streamed.values())
+    print(f"✓ Streamed {count} programmes in 37-byte chunks, same as one-shot parse: {same}")
+    return same and count == 200
+
+async def test_epg_schedule():
+    print_header("Testing EPG Schedule")
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    
+    def program(title, start_hour, end_hour):
+        return EPGProgram(
+            channel_id="TV3.my", title=title,
+            start_time=base + timedelta(hours=start_hour), end_time=base + timedelta(hours=end_hour)
+        )
+    
+    schedule = ChannelSchedule.from_programs("TV3.my", [
+        program("Late Movie", 22, 24),
+        program("Morning", 6, 9),
+        program("Breakfast", 8, 10),
+        program("Morning Repeat", 6, 7),
+        program("Broken", 12, 12),
+        program("News", 20, 21),
+    ])
+    titles = [p.title for p in schedule]
+    print(f"✓ Sorted and de-overlapped: {titles}")
+    
+    trimmed = schedule[0].end_time == base + timedelta(hours=8)
+    current = schedule.current(base + timedelta(hours=8))
+    gap = schedule.current(base + timedelta(hours=15))
+    upcoming = [p.title for p in schedule.upcoming(base + timedelta(hours=9), 2)]
+    print(f"✓ Current at 08:00: {current.title}, at 15:00: {gap}, upcoming after 09:00: {upcoming}")
+    
+    return (
+        titles == ["Morning", "Breakfast", "News", "Late Movie"] and trimmed and
+        current.title == "Breakfast" and gap is None and upcoming == ["News", "Late Movie"]
+    )
+
+async def test_epg_merge():
+    print_header("Testing EPG Merge")
+    service = EPGService()
+    hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    
+    def guide(*programmes):
+        body = "".join(
+            f'<programme start="{hour + timedelta(hours=start):%Y%m%d%H%M%S} +0000" '
+            f'stop="{hour + timedelta(hours=end):%Y%m%d%H%M%S} +0000" channel="{channel}"><title>{title}</title></programme>'
+            for channel, title, start, end in programmes
+        )
+        return f'<?xml version="1.0" encoding="UTF-8"?><tv>{body}</tv>'
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        primary = os.path.join(tmp_dir, "primary.xml")
+        secondary = os.path.join(tmp_dir, "secondary.xml")
+        with open(primary, "w") as f:
+            f.write(guide(("TV3.my", "Primary News", 0, 2), ("TV3.my", "Primary Drama", 4, 5)))
+        with open(secondary, "w") as f:
+            f.write(guide(
+                ("TV3.my", "Expired", -30, -29), ("TV3.my", "Secondary News", 1, 3),
+                ("TV3.my", "Secondary Filler", 2, 4), ("ntv7.my", "Only Secondary", 0, 1)
+            ))
+        service.snapshot_file = os.path.join(tmp_dir, "epg_cache.bin")
+        service.add_epg_url(primary)
+        service.add_epg_url(secondary)
+        
+        await service._refresh_epg()
+        titles = [p.title for p in service.parser.epg_data["TV3.my"]]
+        print(f"✓ Merged TV3 schedule: {titles}")
+        
+        tv3 = service.parser.epg_data["TV3.my"]
+        ntv7 = service.parser.epg_data["ntv7.my"]
+        with open(primary, "w") as f:
+            f.write(guide(("TV3.my", "Primary News", 0, 2), ("TV3.my", "Primary Drama", 4, 6)))
+        await service._refresh_epg()
+        reused = service.parser.epg_data["ntv7.my"] is ntv7
+        rebuilt = service.parser.epg_data["TV3.my"] is not tv3
+        print(f"✓ Unchanged channel kept its schedule: {reused}, changed channel rebuilt: {rebuilt}")
+    
+    return titles == ["Primary News", "Secondary Filler", "Primary Drama"] and reused and rebuilt
+
+async def test_epg_snapshot():
+    print_header("Testing EPG Snapshot")
+    hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    body = "".join(
+        f'<programme start="{hour + timedelta(hours=i):%Y%m%d%H%M%S} +0000" '
+        f'stop="{hour + timedelta(hours=i + 1):%Y%m%d%H%M%S} +0000" channel="ch{i % 2}.my">'
+        f'<title>Show {i}</title>{"<desc>Rerun</desc>" if i % 3 else ""}<category>News</category></programme>'
+        for i in range(24)
+    )
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        guide = os.path.join(tmp_dir, "guide.xml")
+        with open(guide, "w") as f:
+            f.write(f'<?xml version="1.0" encoding="UTF-8"?><tv>{body}</tv>')
+        
+        service = EPGService()
+        service.snapshot_file = os.path.join(tmp_dir, "epg_cache.bin")
+        service.add_epg_url(guide)
+        await service._refresh_epg()
+        saved = os.path.exists(service.snapshot_file)
+        print(f"✓ Snapshot written after refresh: {saved}")
+        
+        restarted = EPGService()
+        restarted.snapshot_file = service.snapshot_file
+        await restarted.load_snapshot()
+        same = {
+            channel_id: [p.model_dump() for p in schedule]
+            for channel_id, schedule in restarted.parser.epg_data.items()
+        } == {
+            channel_id: [p.model_dump() for p in schedule]
+            for channel_id, schedule in service.parser.epg_data.items()
+        }
+        delay = restarted._initial_refresh_delay()
+        print(f"✓ Restart restored {restarted.epg_urls} with identical guide: {same}")
+        print(f"✓ Fresh snapshot defers the first refresh by {delay:.0f}s")
+    
+    return saved and same and restarted.epg_urls == [guide] and delay > 0
+
+async def test_epg_catalog_filter():
+    print_header("Testing EPG Catalog Filter")
+    hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    body = "".join(
+        f'<programme start="{hour:%Y%m%d%H%M%S} +0000" stop="{hour + timedelta(hours=1):%Y%m%d%H%M%S} +0000" '
+        f'channel="{channel_id}"><title>{channel_id} live</title></programme>'
+        for channel_id in ("TV3.my", "tv9", "Foreign.uk", "Other.uk")
+    )
+    
+    def catalog(*epg_ids):
+        channel_service = ChannelService()
+        channels = [
+            Channel(id=f"c{i}", name=epg_id, url=f"https://example.com/{i}.m3u8", epg_id=epg_id, tvg_id=epg_id)
+            for i, epg_id in enumerate(epg_ids)
+        ]
+        return channel_service.publish({"test": channels})
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        guide = os.path.join(tmp_dir, "guide.xml")
+        with open(guide, "w") as f:
+            f.write(f'<?xml version="1.0" encoding="UTF-8"?><tv>{body}</tv>')
+        
+        service = EPGService()
+        service.snapshot_file = os.path.join(tmp_dir, "epg_cache.bin")
+        service.refresh_flight.min_interval = 0
+        service.on_catalog_published(catalog("TV3.my", "TV9.my"))
+        service.add_epg_url(guide)
+        await service._refresh_epg()
+        kept = sorted(service.parser.epg_data)
+        alias = service.parser.get_current_program("TV9.my")
+        print(f"✓ Ingested only catalog channels: {kept}; 'TV9.my' resolves to: {alias.title if alias else None}")
+        
+        service.on_catalog_published(catalog("TV3.my", "TV9.my", "Foreign.uk"))
+        await service._refilter_task
+        added = sorted(service.parser.epg_data)
+        print(f"✓ New catalog id refetched: {added}")
+        
+        service.on_catalog_published(catalog("Foreign.uk"))
+        removed = sorted(service.parser.epg_data)
+        print(f"✓ Removed ids dropped without a fetch: {removed} (runs: {service.refresh_flight.runs})")
+        
+        # Ids from requests are matched without being remembered
+        memo = len(service.parser.id_matcher._keys)
+        for i in range(1000):
+            service.parser.get_schedule(f"made-up-{i}.my")
+        grown = len(service.parser.id_matcher._keys) - memo
+        print(f"✓ Unknown request ids added {grown} memo entries")
+    
+    return (
+        grown == 0 and
+        kept == ["TV3.my", "tv9"] and alias is not None and
+        added == ["Foreign.uk", "TV3.my", "tv9"] and removed == ["Foreign.uk"] and
+        service.refresh_flight.runs == 1
+    )
+
+async def test_epg_source_health():
+    print_header("Testing EPG Source Health")
+    hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    xml = (
+        f'<?xml version="1.0" encoding="UTF-8"?><tv><programme start="{hour:%Y%m%d%H%M%S} +0000" '
+        f'stop="{hour + timedelta(hours=1):%Y%m%d%H%M%S} +0000" channel="tv3.my"><title>News</title></programme></tv>'
+    )
+    
+    original = (settings.epg_breaker_failure_threshold, settings.epg_breaker_reset_timeout)
+    settings.epg_breaker_failure_threshold = 2
+    settings.epg_breaker_reset_timeout = 0.05
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            good = os.path.join(tmp_dir, "good.xml")
+            missing = os.path.join(tmp_dir, "missing.xml")
+            with open(good, "w") as f:
+                f.write(xml)
+            
+            service = EPGService()
+            service.snapshot_file = os.path.join(tmp_dir, "epg_cache.bin")
+            service.add_epg_url(missing)
+            service.add_epg_url(good)
+            for _ in range(3):
+                await service._refresh_epg()
+            
+            broken, healthy = service.get_source_statuses()
+            print(f"✓ Failing source: state={broken.state}, failures={broken.consecutive_failures}, skipped={broken.skipped}")
+            print(f"✓ Healthy source: state={healthy.state}, programmes={healthy.programmes}, "
+                  f"fetch={healthy.fetch_seconds:.4f}s, parse={healthy.parse_seconds:.4f}s")
+            tripped = broken.state == "open" and broken.skipped == 1 and broken.last_error is not None
+            
+            with open(missing, "w") as f:
+                f.write(xml)
+            await asyncio.sleep(0.1)
+            await service._refresh_epg()
+            recovered = service.get_source_statuses()[0]
+            print(f"✓ Half-open probe succeeded: state={recovered.state}, trips={recovered.trips}")
+    finally:
+        settings.epg_breaker_failure_threshold, settings.epg_breaker_reset_timeout = original
+    
+    return (
+        tripped and healthy.state == "closed" and healthy.programmes == 1 and
+        healthy.parse_seconds is not None and recovered.state == "closed" and
+        recovered.consecutive_failures == 0 and recovered.trips == 1
+    )
+
+async def test_epg_search():
+    print_header("Testing EPG Search")
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    listings = {
+        "tv3.my": [("Buletin Utama", "Evening news bulletin", "News"), ("Football Live", "Premier League match", "Sports")],
+        "tv9.my": [("Morning News", "Breaking news and weather", "News"), ("Cooking Show", "Football pie recipes", "Lifestyle")],
+        "hbo.my": [("The News Room", "Drama series", "Drama"), ("Movie Night", "Feature film", "Movies")]
+    }
+    service = EPGService()
+    service.parser.update_epg_data({
+        channel_id: [
+            EPGProgram(
+                channel_id=channel_id, title=title, description=description, category=category,
+                start_time=base + timedelta(hours=slot), end_time=base + timedelta(hours=slot + 1)
+            )
+            for slot, (title, description, category) in enumerate(programmes)
+        ]
+        for channel_id, programmes in listings.items()
+    })
+    
+    def titles(query, **filters):
+        programs, total, _ = service.search_programs(query, **filters)
+        return [p.title for p in programs], total
+    
+    news, _ = titles("news")
+    print(f"✓ 'news' ranked by field: {news}")
+    phrase, _ = titles('"news room"')
+    prefix, _ = titles("foot*")
+    print(f"✓ Phrase: {phrase}; prefix 'foot*': {prefix}")
+    channel, _ = titles("news", channel_id="TV9")
+    category, _ = titles("football", category="sports")
+    timed, _ = titles("news", start=base + timedelta(minutes=90))
+    print(f"✓ Channel filter: {channel}; category filter: {category}; time filter: {timed}")
+    page, total = titles("news", page=2, page_size=2)
+    print(f"✓ Page 2 of {total} results: {page}")
+    
+    # "news" is the rarer word, so the terms get reordered internally;
+    # the bonus must still go to the title typed, not "News Evening"
+    ranking = EPGService()
+    ranking.parser.update_epg_data({
+        "rtm.my": [
+            EPGProgram(
+                channel_id="rtm.my", title=title, description="Tonight", category="Entertainment",
+                start_time=base + timedelta(hours=slot), end_time=base + timedelta(hours=slot + 1)
+            )
+            for slot, title in enumerate(["News Evening", "Evening News", "Evening Movie", "Evening Drama"])
+        ]
+    })
+    exact = [p.title for p in ranking.search_programs("evening news")[0]]
+    print(f"✓ Exact multi-word title ranks first: {exact}")
+    
+    # A broad query stops counting after a bounded number of matches; title
+    # matches are walked first, so a late one still ranks above them
+    broad = EPGService()
+    broad.parser.update_epg_data({
+        "talk.my": [
+            EPGProgram(
+                channel_id="talk.my", title=f"Talk {slot}", description="Latest news", category="Talk",
+                start_time=base + timedelta(hours=slot), end_time=base + timedelta(hours=slot + 1)
+            )
+            for slot in range(3000)
+        ] + [
+            EPGProgram(
+                channel_id="talk.my", title="World News", category="News",
+                start_time=base + timedelta(hours=3000), end_time=base + timedelta(hours=3001)
+            )
+        ]
+    })
+    broad_page, broad_total, broad_exact = broad.search_programs("news", page_size=2)
+    broad_titles = [p.title for p in broad_page]
+    print(f"✓ Broad 'news' page: {broad_titles}; total {broad_total} (exact: {broad_exact})")
+    
+    return (
+        broad_titles == ["World News", "Talk 0"] and not broad_exact and broad_total < 3001 and
+        exact == ["Evening News", "News Evening"] and
+        news == ["The News Room", "Morning News", "Buletin Utama"] and
+        phrase == ["The News Room"] and prefix == ["Football Live", "Cooking Show"] and
+        channel == ["Morning News"] and category == ["Football Live"] and timed == [] and
+        total == 3 and page == news[2:]
+    )
+
+async def test_epg_grid():
+    print_header("Testing EPG Grid")
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    service = EPGService()
+    service.parser.update_epg_data({
+        f"ch{i}.my": [
+            EPGProgram(
+                channel_id=f"ch{i}.my", title=f"Show {i}-{slot}",
+                start_time=base + timedelta(minutes=30 * slot), end_time=base + timedelta(minutes=30 * slot + 30)
+            )
+            for slot in range(48)
+        ]
+        for i in range(3)
+    })
+    channels = [
+        Channel(id=f"c{i}", name=f"Channel {i}", url=f"https://example.com/{i}.m3u8", epg_id=f"CH{i}")
+        for i in range(4)
+    ]
+    
+    grid = service.get_grid(channels, base + timedelta(minutes=45), base + timedelta(hours=2))
+    rows = {row.channel_id: [p.title for p in row.programs] for row in grid}
+    print(f"✓ Grid 00:45-02:00 for c0: {rows['c0']}")
+    print(f"✓ Channel without guide data has {len(rows['c3'])} programmes")
+    edge = service.get_grid(channels[:1], base + timedelta(minutes=30), base + timedelta(minutes=60))
+    print(f"✓ Boundary window [00:30, 01:00): {[p.title for p in edge[0].programs]}")
+    
+    return (
+        rows["c0"] == ["Show 0-1", "Show 0-2", "Show 0-3"] and rows["c2"][0] == "Show 2-1" and
+        rows["c3"] == [] and [p.title for p in edge[0].programs] == ["Show 0-1"]
+    )
+
+async def test_now_next():
+    print_header("Testing Now/Next Table")
+    from app.services.now_next import NowNextTable
+    
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    guide = {
+        "tv3.my": ChannelSchedule.from_programs("tv3.my", [
+            EPGProgram(channel_id="tv3.my", title=f"Show {slot}",
+                       start_time=base + timedelta(minutes=30 * slot), end_time=base + timedelta(minutes=30 * slot + 30))
+            for slot in range(4)
+        ]),
+        "tv9.my": ChannelSchedule.from_programs("tv9.my", [
+            EPGProgram(channel_id="tv9.my", title="Movie", start_time=base, end_time=base + timedelta(hours=2))
+        ])
+    }
+    channels = [
+        Channel(id="c3", name="TV3", url="https://example.com/3.m3u8", epg_id="tv3.my"),
+        Channel(id="c9", name="TV9", url="https://example.com/9.m3u8", epg_id="tv9.my"),
+        Channel(id="cx", name="No Guide", url="https://example.com/x.m3u8")
+    ]
+    
+    table = NowNextTable()
+    start = base.timestamp() + 600
+    table.rebuild(channels, guide.get, now=start)
+    first = table.get("c3")
+    print(f"✓ c3 now: {first.current_program.title}, next: {first.next_program.title}")
+    print(f"✓ Next boundary in {table.next_change - start:.0f}s")
+    
+    early = table.advance(now=start + 60)
+    changed = table.advance(now=base.timestamp() + 1800)
+    print(f"✓ Before boundary {len(early)} changes; at boundary changed: {[entry.channel_id for entry in changed]}")
+    
+    payload = json.loads(table.payload)
+    print(f"✓ Pre-serialised payload: {payload['total']} channels, c3 now '{payload['channels'][0]['current_program']['title']}'")
+    
+    return (
+        first.current_program.title == "Show 0" and first.next_program.title == "Show 1" and
+        table.get("cx").current_program is None and early == [] and
+        [entry.channel_id for entry in changed] == ["c3"] and table.get("c3").current_program.title == "Show 1" and
+        payload["total"] == 3 and payload["channels"][0]["current_program"]["title"] == "Show 1" and
+        table.next_change == int(base.timestamp()) + 3600
+    )
+
+async def test_event_broadcast():
+    print_header("Testing Event Broadcast")
+    from app.services.events import EventBroadcaster, RESYNC_MESSAGE
+    from app.services.now_next import NowNextTable
+    
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    guide = {"tv3.my": ChannelSchedule.from_programs("tv3.my", [
+        EPGProgram(channel_id="tv3.my", title=f"Show {slot}",
+                   start_time=base + timedelta(hours=slot), end_time=base + timedelta(hours=slot + 1))
+        for slot in range(3)
+    ])}
+    channels = [Channel(id="c3", name="TV3", url="https://example.com/3.m3u8", epg_id="tv3.my")]
+    
+    original = settings.sse_queue_size
+    settings.sse_queue_size = 4
+    try:
+        broadcaster = EventBroadcaster()
+        table = NowNextTable()
+        table.add_listener(broadcaster.on_now_next_changed)
+        fast, slow = broadcaster.subscribe(), broadcaster.subscribe()
+        
+        table.rebuild(channels, guide.get, now=base.timestamp())
+        table.advance(now=base.timestamp() + 3600)
+        first, second = fast.queue.get_nowait(), fast.queue.get_nowait()
+        shared = first is slow.queue.get_nowait()
+        events = [message.splitlines()[1].decode() for message in (first, second)]
+        print(f"✓ Events: {events}; same bytes for all subscribers: {shared}")
+        now_playing = json.loads(second.split(b"data: ")[1])["channels"][0]["current_program"]["title"]
+        print(f"✓ now-next event carries the new programme: {now_playing}")
+        
+        for version in range(10):
+            broadcaster.publish("catalog", json.dumps({"version": version}).encode())
+        backlog = [slow.queue.get_nowait() for _ in range(slow.queue.qsize())]
+        print(f"✓ Slow subscriber bounded to {len(backlog)} queued events after falling behind {slow.lagged} times")
+        
+        broadcaster.unsubscribe(fast)
+        broadcaster.unsubscribe(slow)
+    finally:
+        settings.sse_queue_size = original
+    
+    return (
+        b"event: now-next-reset" in first and b"event: now-next\n" in second and shared and
+        now_playing == "Show 1" and len(backlog) <= 4 and RESYNC_MESSAGE in backlog and
+        not broadcaster.subscribers
+    )
+
+async def test_parse_strategies():
+    print_header("Testing Parse Strategies")
+    from app.core.executor import parse_executor
+    
+    base = datetime(2024, 1, 1)
+    programmes = "".join(
+        f'<programme start="{base + timedelta(minutes=30 * i):%Y%m%d%H%M%S} +0800" '
+        f'stop="{base + timedelta(minutes=30 * i + 30):%Y%m%d%H%M%S} +0800" channel="ch{i % 7}.my">'
+        f'<title>Show {i % 40}</title><category>News</category></programme>'
+        for i in range(2000)
+    )
+    
+    original = (settings.parse_strategy, settings.parse_chunk_size)
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            playlist = os.path.join(tmp_dir, "playlist.m3u8")
+            guide = os.path.join(tmp_dir, "guide.xml")
+            with open(playlist, "w") as f:
+                f.write("#EXTM3U\n" + "".join(
+                    f'#EXTINF:-1 tvg-id="ch{i}.my" group-title="Group {i % 5}",Channel {i}\n'
+                    f'https://stream.example.com/ch{i}/index.m3u8\n'
+                    for i in range(500)
+                ))
+            with open(guide, "w") as f:
+                f.write(f'<?xml version="1.0" encoding="UTF-8"?><tv><channel id="ch0.my"/>{programmes}</tv>')
+            
+            settings.parse_chunk_size = 16 * 1024
+            for strategy in ("inline", "thread", "process"):
+                settings.parse_strategy = strategy
+                channels = await M3U8Parser().fetch_and_parse(playlist)
+                epg_data = await EPGParser().fetch_and_parse(guide)
+                results[strategy] = (
+                    [ch.model_dump() for ch in channels],
+                    {channel_id: [p.model_dump() for p in schedule] for channel_id, schedule in epg_data.items()}
+                )
+                programme_count = sum(len(schedule) for schedule in epg_data.values())
+                print(f"✓ {strategy}: {len(channels)} channels, {programme_count} programmes")
+    finally:
+        settings.parse_strategy, settings.parse_chunk_size = original
+        parse_executor.shutdown()
+    
+    same = results["thread"] == results["inline"] and results["process"] == results["inline"]
+    print(f"✓ Chunked thread/process results match inline parsing: {same}")
+    
+    from app.parsers.m3u8_parser import iter_playlist_pieces
+    
+    async def trickle(data, size):
+        for i in range(0, len(data), size):
+            yield data[i:i + size]
+    
+    body = "#EXTM3U\n".encode() + b"".join(
+        f'#EXTINF:-1,Channel {i}\nhttps://example.com/{i}.m3u8\n'.encode() for i in range(300)
+    )
+    pieces = [piece async for piece in iter_playlist_pieces(trickle(body, 100), 1024)]
+    cut_cleanly = b"".join(pieces) == body and all(piece.startswith(b"#EXTINF") for piece in pieces[1:])
+    print(f"✓ Playlist cut into {len(pieces)} pieces as it streams in, at entry boundaries: {cut_cleanly}")
+    return same and len(results["inline"][0]) == 500 and len(pieces) > 1 and cut_cleanly
+
+async def test_compressed_sources():
+    print_header("Testing Compressed Sources")
+    parser = M3U8Parser()
+    epg_parser = EPGParser()
+    plain = await parser.fetch_and_parse("./data/example_channels.m3u8")
+    with open("./data/example_channels.m3u8", "rb") as f:
+        playlist = f.read()
+    xmltv = (
+        b'<?xml version="1.0" encoding="UTF-8"?><tv>' +
+        b''.join(
+            f'<programme start="20240101{i:02d}0000 +0800" stop="20240101{i:02d}3000 +0800" channel="TV3.my">'
+            f'<title>Show {i}</title></programme>'.encode()
+            for i in range(24)
+        ) +
+        b'</tv>'
+    )
+    
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        variants = [
+            ("playlist.m3u8.gz", gzip.compress(playlist)),
+            ("playlist.m3u8.xz", lzma.compress(playlist)),
+            ("playlist.m3u8.gz", gzip.compress(playlist[:500]) + gzip.compress(playlist[500:])),
+            ("playlist.dat", lzma.compress(playlist)),
+            ("playlist.m3u8.gz", playlist),
+        ]
+        for index, (name, data) in enumerate(variants):
+            path = os.path.join(tmp_dir, f"{index}-{name}")
+            with open(path, "wb") as f:
+                f.write(data)
+            channels = await parser.fetch_and_parse(path)
+            same = [ch.model_dump() for ch in channels] == [ch.model_dump() for ch in plain]
+            print(f"✓ {name} ({len(data)} bytes): {len(channels)} channels, same as plain: {same}")
+            ok = ok and same
+        
+        for name, data in (("guide.xml.gz", gzip.compress(xmltv)), ("guide.xml.xz", lzma.compress(xmltv))):
+            path = os.path.join(tmp_dir, name)
+            with open(path, "wb") as f:
+                f.write(data)
+            epg_data = await epg_parser.fetch_and_parse(path)
+            count = len(epg_data.get("TV3.my", []))
+            print(f"✓ {name}: {count} programmes")
+            ok = ok and count == 24
+    
+    return ok
 
 async def test_channel_service():
     print_header("Testing Channel Service")
@@ -76,8 +716,8 @@ async def test_channel_service():
             for channel in channels[:5]:
                 print(f"  - {channel.name}")
         
-        service.channels = channels
-        service.channels_by_id = {ch.id: ch for ch in channels}
+        catalog = service.publish({test_m3u8: channels})
+        print(f"✓ Published catalog version {catalog.version}")
         
         groups = service.get_all_groups()
         print(f"\n✓ Found {len(groups)} channel groups:")
@@ -93,6 +733,351 @@ async def test_channel_service():
         print(f"✗ Error: {e}")
         return False
 
+async def test_conditional_refresh():
+    print_header("Testing Conditional Source Refresh")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        playlist = os.path.join(tmp_dir, "playlist.m3u8")
+        shutil.copy("./data/example_channels.m3u8", playlist)
+        
+        original_sources = settings.m3u8_sources
+        settings.m3u8_sources = [playlist]
+        try:
+            service = make_isolated_service(tmp_dir)
+            
+            await service.refresh_channels()
+            first = service.channels
+            print(f"✓ Initial refresh loaded {len(first)} channels")
+            
+            await service.refresh_channels()
+            unchanged = service.channels is first
+            print(f"✓ Unchanged file reused existing catalog: {unchanged}")
+            
+            stat = os.stat(playlist)
+            os.utime(playlist, (stat.st_atime, stat.st_mtime + 10))
+            await service.refresh_channels()
+            digest_match = service.channels is first
+            print(f"✓ Touched file matched previous digest: {digest_match}")
+            
+            restarted = make_isolated_service(tmp_dir)
+            await restarted.load_channels()
+            fetch = SourceFetch(playlist, restarted.fetch_state.get(playlist))
+            fetch.check_local(playlist)
+            print(f"✓ Restart skips unchanged source: {fetch.not_modified}")
+        finally:
+            settings.m3u8_sources = original_sources
+    
+    return len(first) > 0 and unchanged and digest_match and fetch.not_modified
+
+async def test_truncated_source():
+    print_header("Testing Truncated Source")
+    playlist = ("#EXTM3U\n" + "".join(
+        f'#EXTINF:-1 tvg-id="ch{i}.my" group-title="Group {i % 5}",Channel {i}\nhttps://example.com/{i}.m3u8\n'
+        for i in range(400)
+    )).encode()
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        plain = os.path.join(tmp_dir, "playlist.m3u8")
+        compressed = os.path.join(tmp_dir, "extra.m3u8.gz")
+        shutil.copy("./data/example_channels.m3u8", plain)
+        with open(compressed, "wb") as f:
+            f.write(gzip.compress(playlist))
+        
+        original = (settings.m3u8_sources, settings.parse_strategy)
+        settings.m3u8_sources = [plain, compressed]
+        settings.parse_strategy = "inline"
+        try:
+            service = make_isolated_service(tmp_dir)
+            
+            await service.refresh_channels()
+            before = (len(service.channels), service.catalog.version)
+            print(f"✓ Initial refresh: {before[0]} channels, catalog version {before[1]}")
+            
+            # Cut the compressed stream in half: the parser yields channels
+            # before the decompressor hits the truncated end
+            data = gzip.compress(playlist)
+            with open(compressed, "wb") as f:
+                f.write(data[:len(data) // 2])
+            partial = [ch async for ch in M3U8Parser().stream_channels(compressed)]
+            await service.refresh_channels()
+            after = (len(service.channels), service.catalog.version)
+            print(f"✓ Truncated stream yielded {len(partial)} channels; catalog kept {after[0]} channels, version {after[1]}")
+        finally:
+            settings.m3u8_sources, settings.parse_strategy = original
+    
+    return 0 < len(partial) < 400 and before[0] == after[0] and before[1] == after[1]
+
+async def test_concurrent_sources():
+    print_header("Testing Concurrent Source Fetching")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sources = []
+        for i in range(3):
+            path = os.path.join(tmp_dir, f"playlist{i}.m3u8")
+            shutil.copy("./data/example_channels.m3u8", path)
+            sources.append(path)
+        
+        original = (settings.m3u8_sources, settings.m3u8_fetch_concurrency, settings.m3u8_source_timeout)
+        settings.m3u8_sources = sources
+        settings.m3u8_source_timeout = 0.5
+        try:
+            async def timed_refresh(concurrency):
+                settings.m3u8_fetch_concurrency = concurrency
+                run_dir = os.path.join(tmp_dir, f"run{concurrency}")
+                os.makedirs(run_dir)
+                service = make_isolated_service(run_dir)
+                stream_channels = service.parser.stream_channels
+                
+                async def slow(source, fetch=None):
+                    # Every source takes 0.3s to answer
+                    await asyncio.sleep(0.3)
+                    async for channel in stream_channels(source, fetch):
+                        yield channel
+                
+                service.parser.stream_channels = slow
+                started = time.perf_counter()
+                await service.refresh_channels()
+                return time.perf_counter() - started, len(service.channels)
+            
+            parallel, parallel_total = await timed_refresh(4)
+            print(f"✓ 3 sources at concurrency 4: {parallel:.2f}s, {parallel_total} channels")
+            # One at a time the refresh takes 0.9s, longer than the 0.5s
+            # deadline, but the deadline is per source
+            serial, serial_total = await timed_refresh(1)
+            print(f"✓ 3 sources at concurrency 1: {serial:.2f}s, {serial_total} channels")
+        finally:
+            settings.m3u8_sources, settings.m3u8_fetch_concurrency, settings.m3u8_source_timeout = original
+    
+    return parallel < 0.6 and serial >= 0.9 and parallel_total == serial_total > 0
+
+async def test_stalled_source():
+    print_header("Testing Stalled Source")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        plain = os.path.join(tmp_dir, "playlist.m3u8")
+        slow = os.path.join(tmp_dir, "slow.m3u8")
+        shutil.copy("./data/example_channels.m3u8", plain)
+        shutil.copy("./data/example_channels.m3u8", slow)
+        
+        original = (settings.m3u8_sources, settings.m3u8_source_timeout)
+        settings.m3u8_sources = [plain, slow]
+        settings.m3u8_source_timeout = 0.2
+        try:
+            service = make_isolated_service(tmp_dir)
+            
+            await service.refresh_channels()
+            before = (len(service.channels), service.catalog.version)
+            print(f"✓ Initial refresh: {before[0]} channels, catalog version {before[1]}")
+            
+            stream_channels = service.parser.stream_channels
+            
+            async def stalling(source, fetch=None):
+                # The slow source sends 5 entries and then stops responding
+                count = 0
+                async for channel in stream_channels(source, fetch):
+                    if source == slow and count == 5:
+                        await asyncio.sleep(10)
+                    count += 1
+                    yield channel
+            
+            service.parser.stream_channels = stalling
+            for path in (plain, slow):
+                stat = os.stat(path)
+                os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+            
+            await service.refresh_channels()
+            after = (len(service.channels), service.catalog.version)
+            print(f"✓ After a stalled refresh: {after[0]} channels, catalog version {after[1]}")
+        finally:
+            settings.m3u8_sources, settings.m3u8_source_timeout = original
+    
+    return before[0] > 0 and before == after
+
+async def test_channel_refresh_job():
+    print_header("Testing Background Channel Refresh")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        original_sources = settings.m3u8_sources
+        settings.m3u8_sources = ["./data/example_channels.m3u8"]
+        try:
+            service = make_isolated_service(tmp_dir)
+            
+            job = service.start_refresh_job()
+            print(f"✓ Refresh job {job.job_id} returned with status '{job.status}'")
+            started_running = job.status == "running"
+            
+            while job.status == "running":
+                await asyncio.sleep(0.01)
+            print(f"✓ Job finished with status '{job.status}' and {job.total} channels")
+            
+            delays = [service._next_refresh_delay(failures) for failures in (1, 2, 3, 20)]
+            print(f"✓ Backoff delays after failures: {delays}")
+            backoff_ok = delays[0] < delays[1] < delays[2] <= delays[3] == settings.channel_refresh_max_backoff
+        finally:
+            settings.m3u8_sources = original_sources
+    
+    return started_running and job.status == "succeeded" and job.total > 0 and backoff_ok
+
+async def test_refresh_coalescing():
+    print_header("Testing Refresh Coalescing")
+    calls = 0
+    
+    async def slow_refresh():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+    
+    flight = SingleFlight("test", min_interval=60)
+    results = await asyncio.gather(*(flight.run(slow_refresh) for _ in range(5)))
+    print(f"✓ 5 concurrent callers ran {calls} refresh(es)")
+    
+    skipped = not await flight.run(slow_refresh)
+    status = flight.status()
+    print(f"✓ Refresh within min interval skipped: {skipped}")
+    print(f"✓ Status: runs={status.runs} coalesced={status.coalesced_callers} "
+          f"duration={status.last_duration:.3f}s error={status.last_error}")
+    
+    # A source added right after a run is fetched despite the min interval
+    hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        guide = os.path.join(tmp_dir, "guide.xml")
+        with open(guide, "w") as f:
+            f.write(
+                f'<?xml version="1.0" encoding="UTF-8"?><tv><programme start="{hour:%Y%m%d%H%M%S} +0000" '
+                f'stop="{hour + timedelta(hours=1):%Y%m%d%H%M%S} +0000" channel="tv3"><title>News</title></programme></tv>'
+            )
+        epg_service = EPGService()
+        epg_service.snapshot_file = os.path.join(tmp_dir, "epg_cache.bin")
+        epg_service.refresh_flight.min_interval = 60
+        await epg_service.refresh_epg()
+        epg_service.add_epg_url(guide)
+        added = await epg_service.refresh_epg()
+        channels = len(epg_service.parser.epg_data)
+        again = await epg_service.refresh_epg()
+        print(f"✓ Refresh after adding a source ran: {added} ({channels} channels); repeat skipped: {not again}")
+    
+    return (
+        calls == 1 and all(results) and skipped and status.coalesced_callers == 4 and
+        added and channels == 1 and not again
+    )
+
+async def test_catalog_versions():
+    print_header("Testing Catalog Versions")
+    service = ChannelService()
+    channels = await service.parser.fetch_and_parse("./data/example_channels.m3u8")
+    
+    first = service.publish({"example": channels})
+    second = service.publish({"example": channels[:3]})
+    print(f"✓ Published versions {first.version} and {second.version}")
+    
+    pinned = service.get_catalog(first.version)
+    pinned_ok = pinned is first
+    page, total = service.get_all_channels(1, 5, pinned)
+    print(f"✓ Pinned version {first.version} still pages {total} channels")
+    
+    for _ in range(settings.catalog_retained_versions):
+        service.publish({"example": channels})
+    evicted = service.get_catalog(first.version) is None
+    print(f"✓ Old version evicted after newer publishes: {evicted}")
+    
+    try:
+        second.channels = ()
+        immutable = False
+    except AttributeError:
+        immutable = True
+    print(f"✓ Catalog is immutable: {immutable}")
+    
+    return pinned_ok and total == len(channels) and len(service.channels) == len(channels) and evicted and immutable
+
+async def test_catalog_indexes():
+    print_header("Testing Catalog Indexes")
+    service = ChannelService()
+    channels = await service.parser.fetch_and_parse("./data/example_channels.m3u8")
+    catalog = service.publish({"example": channels})
+    
+    checks = [
+        ("group", lambda ch: ch.group and ch.group.lower() == "astro", dict(group="ASTRO")),
+        ("astro", lambda ch: ch.is_astro, dict(astro=True)),
+        ("non-astro", lambda ch: not ch.is_astro, dict(astro=False)),
+        ("group+astro", lambda ch: ch.group == "General" and not ch.is_astro, dict(group="general", astro=False)),
+        ("country", lambda ch: ch.country == "MY", dict(country="my")),
+    ]
+    ok = True
+    for label, predicate, criteria in checks:
+        expected = [ch.id for ch in channels if predicate(ch)]
+        page, total = catalog.filter(1, 200, **criteria)
+        matches = [ch.id for ch in page] == expected and total == len(expected)
+        print(f"✓ {label}: {total} channels, matches scan: {matches}")
+        ok = ok and matches
+    
+    groups = service.get_all_groups()
+    print(f"✓ {len(groups)} precomputed groups")
+    return ok and groups == sorted({ch.group for ch in channels if ch.group})
+
+async def test_channel_search():
+    print_header("Testing Channel Search")
+    service = ChannelService()
+    channels = await service.parser.fetch_and_parse("./data/example_channels.m3u8")
+    channels[1].name = "Télé Café"
+    service.publish({"example": channels})
+    
+    typo = [ch.name for ch in service.search_channels("astor awani")]
+    print(f"✓ Typo 'astor awani' ranks first: {typo[:1]}")
+    
+    accent = [ch.name for ch in service.search_channels("tele cafe")]
+    print(f"✓ Accent-insensitive 'tele cafe': {accent[:1]}")
+    
+    short = [ch.name for ch in service.search_channels("3")]
+    print(f"✓ Short query '3' matches: {short}")
+    
+    first, total, _ = service.search_channels_page("astro", 1, 2)
+    second, _, _ = service.search_channels_page("astro", 2, 2)
+    ranked = [ch.name for ch in service.search_channels("astro")]
+    paged = [ch.name for ch in first + second] == ranked[:4]
+    print(f"✓ Paged {total} results for 'astro' consistently: {paged}")
+    
+    # A broad query stops counting after a bounded number of matches, but
+    # name matches late in the catalog still outrank group-only matches
+    broad = [
+        Channel(id=f"b{i}", name=f"Channel {i}", url=f"https://example.com/{i}.m3u8", group="News")
+        for i in range(3000)
+    ]
+    broad[2500].name = "BBC News"
+    broad[2900].name = "News 24"
+    service.publish({"broad": broad})
+    top, broad_total, broad_exact = service.search_channels_page("news", 1, 3)
+    top_names = [ch.name for ch in top]
+    print(f"✓ Broad 'news' top 3: {top_names}; total {broad_total} (exact: {broad_exact})")
+    
+    return (
+        typo[:1] == ["Astro Awani"] and accent[:1] == ["Télé Café"] and
+        short == ["TV3"] and total == len(ranked) and paged and
+        top_names == ["News 24", "BBC News", "Channel 0"] and not broad_exact and broad_total < 3000
+    )
+
+async def test_channel_snapshot():
+    print_header("Testing Channel Snapshot")
+    parser = M3U8Parser()
+    channels = await parser.fetch_and_parse("./data/example_channels.m3u8")
+    channels[0].attributes["catchup"] = "default"
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot_file = os.path.join(tmp_dir, "channels_cache.bin")
+        write_channel_snapshot(snapshot_file, {"example": channels})
+        loaded = read_channel_snapshot(snapshot_file)["example"]
+        round_trip = [ch.model_dump() for ch in loaded] == [ch.model_dump() for ch in channels]
+        print(f"✓ Snapshot round trip of {len(loaded)} channels: {round_trip}")
+        
+        legacy = ChannelService()
+        legacy.snapshot_file = snapshot_file + ".missing"
+        legacy.cache_file = os.path.join(tmp_dir, "channels_cache.json")
+        with open(legacy.cache_file, "w") as f:
+            json.dump([ch.model_dump() for ch in channels], f)
+        await legacy._load_from_cache()
+        print(f"✓ Fallback to legacy JSON cache loaded {len(legacy.channels)} channels")
+    
+    return round_trip and len(legacy.channels) == len(channels)
+
 async def test_favorite_service():
     print_header("Testing Favorite Service")
     service = FavoriteService()
@@ -144,18 +1129,162 @@ async def main():
         print(f"✗ M3U8 Parser test failed: {e}")
         results.append(("M3U8 Parser", False))
     
+    try:
+        results.append(("EXTINF Tokenizer", await test_extinf_tokenizer()))
+    except Exception as e:
+        print(f"✗ EXTINF Tokenizer test failed: {e}")
+        results.append(("EXTINF Tokenizer", False))
+    
+    try:
+        results.append(("M3U8 Streaming", await test_m3u8_streaming()))
+    except Exception as e:
+        print(f"✗ M3U8 Streaming test failed: {e}")
+        results.append(("M3U8 Streaming", False))
+    
     try:
         results.append(("EPG Parser", await test_epg_parser()))
     except Exception as e:
         print(f"✗ EPG Parser test failed: {e}")
         results.append(("EPG Parser", False))
     
+    try:
+        results.append(("EPG Streaming", await test_epg_streaming()))
+    except Exception as e:
+        print(f"✗ EPG Streaming test failed: {e}")
+        results.append(("EPG Streaming", False))
+    
+    try:
+        results.append(("EPG Schedule", await test_epg_schedule()))
+    except Exception as e:
+        print(f"✗ EPG Schedule test failed: {e}")
+        results.append(("EPG Schedule", False))
+    
+    try:
+        results.append(("EPG Merge", await test_epg_merge()))
+    except Exception as e:
+        print(f"✗ EPG Merge test failed: {e}")
+        results.append(("EPG Merge", False))
+    
+    try:
+        results.append(("EPG Snapshot", await test_epg_snapshot()))
+    except Exception as e:
+        print(f"✗ EPG Snapshot test failed: {e}")
+        results.append(("EPG Snapshot", False))
+    
+    try:
+        results.append(("EPG Catalog Filter", await test_epg_catalog_filter()))
+    except Exception as e:
+        print(f"✗ EPG Catalog Filter test failed: {e}")
+        results.append(("EPG Catalog Filter", False))
+    
+    try:
+        results.append(("EPG Source Health", await test_epg_source_health()))
+    except Exception as e:
+        print(f"✗ EPG Source Health test failed: {e}")
+        results.append(("EPG Source Health", False))
+    
+    try:
+        results.append(("EPG Search", await test_epg_search()))
+    except Exception as e:
+        print(f"✗ EPG Search test failed: {e}")
+        results.append(("EPG Search", False))
+    
+    try:
+        results.append(("EPG Grid", await test_epg_grid()))
+    except Exception as e:
+        print(f"✗ EPG Grid test failed: {e}")
+        results.append(("EPG Grid", False))
+    
+    try:
+        results.append(("Now/Next Table", await test_now_next()))
+    except Exception as e:
+        print(f"✗ Now/Next Table test failed: {e}")
+        results.append(("Now/Next Table", False))
+    
+    try:
+        results.append(("Event Broadcast", await test_event_broadcast()))
+    except Exception as e:
+        print(f"✗ Event Broadcast test failed: {e}")
+        results.append(("Event Broadcast", False))
+    
+    try:
+        results.append(("Parse Strategies", await test_parse_strategies()))
+    except Exception as e:
+        print(f"✗ Parse Strategies test failed: {e}")
+        results.append(("Parse Strategies", False))
+    
+    try:
+        results.append(("Compressed Sources", await test_compressed_sources()))
+    except Exception as e:
+        print(f"✗ Compressed Sources test failed: {e}")
+        results.append(("Compressed Sources", False))
+    
     try:
         results.append(("Channel Service", await test_channel_service()))
     except Exception as e:
         print(f"✗ Channel Service test failed: {e}")
         results.append(("Channel Service", False))
     
+    try:
+        results.append(("Truncated Source", await test_truncated_source()))
+    except Exception as e:
+        print(f"✗ Truncated Source test failed: {e}")
+        results.append(("Truncated Source", False))
+    
+    try:
+        results.append(("Concurrent Sources", await test_concurrent_sources()))
+    except Exception as e:
+        print(f"✗ Concurrent Sources test failed: {e}")
+        results.append(("Concurrent Sources", False))
+    
+    try:
+        results.append(("Stalled Source", await test_stalled_source()))
+    except Exception as e:
+        print(f"✗ Stalled Source test failed: {e}")
+        results.append(("Stalled Source", False))
+    
+    try:
+        results.append(("Conditional Refresh", await test_conditional_refresh()))
+    except Exception as e:
+        print(f"✗ Conditional Refresh test failed: {e}")
+        results.append(("Conditional Refresh", False))
+    
+    try:
+        results.append(("Background Refresh", await test_channel_refresh_job()))
+    except Exception as e:
+        print(f"✗ Background Refresh test failed: {e}")
+        results.append(("Background Refresh", False))
+    
+    try:
+        results.append(("Refresh Coalescing", await test_refresh_coalescing()))
+    except Exception as e:
+        print(f"✗ Refresh Coalescing test failed: {e}")
+        results.append(("Refresh Coalescing", False))
+    
+    try:
+        results.append(("Catalog Versions", await test_catalog_versions()))
+    except Exception as e:
+        print(f"✗ Catalog Versions test failed: {e}")
+        results.append(("Catalog Versions", False))
+    
+    try:
+        results.append(("Catalog Indexes", await test_catalog_indexes()))
+    except Exception as e:
+        print(f"✗ Catalog Indexes test failed: {e}")
+        results.append(("Catalog Indexes", False))
+    
+    try:
+        results.append(("Channel Search", await test_channel_search()))
+    except Exception as e:
+        print(f"✗ Channel Search test failed: {e}")
+        results.append(("Channel Search", False))
+    
+    try:
+        results.append(("Channel Snapshot", await test_channel_snapshot()))
+    except Exception as e:
+        print(f"✗ Channel Snapshot test failed: {e}")
+        results.append(("Channel Snapshot", False))
+    
     try:
         results.append(("Favorite Service", await test_favorite_service()))
     except Exception as e: